@@ -1,35 +1,41 @@
-<<<<<<< HEAD
-import json
-from datetime import date, time, timedelta
-from io import StringIO
-import textwrap
-=======
 import os
-import json
 import base64
+import tracemalloc
 import mimetypes
 from datetime import date, time, timedelta
-from io import StringIO
-import textwrap
-import requests
 import pandas as pd
 import urllib.parse
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
 
 import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from dotenv import load_dotenv
 
 # ---- Your planner ----
 from src.Core.planner import TravelPlanner
+from src.Core.multi_city import MULTI_CITY_TRANSFER_MODE, MultiCityPlanner, parse_legs
+from src.Core.speculative import SPECULATOR
+from src.Chains.renderer import SECTION_KEYS, itinerary_markdown, is_agent_itinerary, template
+from src.Chains.language import LANGUAGE_DETECT, SUPPORTED, detect_language, language_name
+from src.Core.ics import ics_bytes, itinerary_version
+from src.Core.trip_store import TRIP_STORE, EditConflict
+from src.Core import collab
+from src.Core.budget import compute_budget, cost_frame, day_items, select_pois_within_budget
+from src.Core.images import place_image, resolve_place_images
+from src.Core.thumbnails import (THUMB_CARD_WIDTH, THUMB_TABLE_WIDTH, start_thumbnail_server,
+                                  thumbnail_url, thumbnail_urls)
+from src.Utils.metrics import start_metrics_server
+from src.Utils.logger import request_context
+from src.Utils import memprof
+from src.Utils.bounded_cache import BoundedCache, cache_from_env, cache_stats
+from src.Utils.tracing import span
+from src.Utils.serializer import export_json
 
-<<<<<<< HEAD
-=======
 # ---------------------- Config signature dev ----------------------
 SIGNATURE_NAME = "RIDA BAYi"
 # Mets ici le chemin local de ta photo (ex: "assets/rida.jpg") ou une URL
 SIGNATURE_PHOTO = "assets/rida.jpg"
 
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
 # ---------------------- Page / theme ----------------------
 st.set_page_config(
     page_title="AI Travel Planner",
@@ -38,39 +44,6 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-<<<<<<< HEAD
-# ---------------------- Helpers ----------------------
-def ensure_itinerary_dict(itin):
-    """
-    Normalize whatever TravelPlanner returns into a standard dict:
-    {
-      "city": str,
-      "days": [
-        {
-          "date": "YYYY-MM-DD",
-          "summary": "text",
-          "stops": [
-            {
-              "time": "09:00",
-              "name": "Louvre",
-              "category": "museum",
-              "lat": 48.8606,
-              "lon": 2.3376,
-              "duration_min": 90,
-              "cost_est": 20.0,
-              "notes": "Pre-book tickets"
-            }, ...
-          ]
-        }, ...
-      ]
-    }
-    """
-    if isinstance(itin, dict):
-        # Assume already structured
-        return itin
-
-    # Fallback: convert plain text to a one-day, single-note plan
-=======
 # ---------- Compact UI CSS ----------
 st.markdown("""
 <style>
@@ -109,7 +82,6 @@ def ensure_itinerary_dict(itin):
     """Normalise la sortie du planner."""
     if isinstance(itin, dict):
         return itin
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
     today = date.today().isoformat()
     return {
         "city": "Unknown",
@@ -133,80 +105,18 @@ def ensure_itinerary_dict(itin):
         ],
     }
 
-<<<<<<< HEAD
-def itinerary_to_markdown(itin: dict) -> str:
-=======
-def itinerary_to_markdown_legacy(itin: dict) -> str:
-    """Markdown si on a l'ancien format days/stops."""
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
-    lines = [f"# ✈️ Itinerary: {itin.get('city','')}\n"]
-    for d in itin.get("days", []):
-        lines.append(f"## {d.get('date','')}")
-        if d.get("summary"):
-            lines.append(d["summary"])
-        stops = d.get("stops", [])
-        for s in stops:
-            t = s.get("time", "--:--")
-            nm = s.get("name", "Stop")
-            cat = s.get("category") or ""
-            dur = s.get("duration_min")
-            cost = s.get("cost_est")
-            notes = s.get("notes") or ""
-            meta = []
-            if cat: meta.append(cat)
-            if dur: meta.append(f"{dur} min")
-<<<<<<< HEAD
-            if cost is not None: meta.append(f"€{cost:.2f}")
-=======
-            if isinstance(cost, (int, float)): meta.append(f"€{cost:.2f}")
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
-            meta_txt = f" _({' • '.join(meta)})_" if meta else ""
-            lines.append(f"- **{t}** — **{nm}**{meta_txt}")
-            if notes:
-                lines.append(f"  - {notes}")
-        lines.append("")
-    return "\n".join(lines)
-
-def itinerary_to_json(itin: dict) -> str:
-    return json.dumps(itin, ensure_ascii=False, indent=2)
-
-def itinerary_to_ics(itin: dict, default_start="09:00"):
-<<<<<<< HEAD
-    # Minimal iCalendar export (one VEVENT per stop with time if available)
-=======
-    # Minimal iCalendar export
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
-    def yyyymmdd(d): return d.replace("-", "")
-    buf = StringIO()
-    buf.write("BEGIN:VCALENDAR\nVERSION:2.0\nPRODID:-//AI Travel Planner//EN\n")
-    for d in itin.get("days", []):
-        day_str = d.get("date")
-        if not day_str:
-            continue
-        for s in d.get("stops", []):
-            name = s.get("name", "Visit")
-            notes = s.get("notes", "")
-            t = s.get("time") or default_start
-<<<<<<< HEAD
-            # Convert HH:MM to HHMMSS
-            tclean = t.replace(":", "") + "00"
-=======
-            tclean = (t if ":" in t else default_start).replace(":", "") + "00"
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
-            buf.write("BEGIN:VEVENT\n")
-            buf.write(f"DTSTART:{yyyymmdd(day_str)}T{tclean}\n")
-            buf.write(f"SUMMARY:{name}\n")
-            if notes:
-<<<<<<< HEAD
-                # ICS lines must be folded at 75 chars; keep it simple:
-=======
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
-                note = " ".join(notes.split())
-                note_wrapped = textwrap.fill(note, width=70)
-                buf.write(f"DESCRIPTION:{note_wrapped}\n")
-            buf.write("END:VEVENT\n")
-    buf.write("END:VCALENDAR\n")
-    return buf.getvalue()
+@st.cache_resource(show_spinner=False)
+def _export_cache() -> BoundedCache:
+    """Exports par version d'itinéraire, bornés en entrées et en octets (un cache par process)."""
+    return cache_from_env("exports", max_entries=64, max_bytes=8 * 1024 * 1024, ttl_s=3600)
+
+def itinerary_to_json(version: str, itin: dict) -> bytes:
+    return _export_cache().get_or_set(("json", version), lambda: export_json(itin))
+
+def ics_export(version: str, default_start: str, itin: dict) -> bytes:
+    """ICS mis en cache par version d'itinéraire (pas reconstruit à chaque rerun)."""
+    return _export_cache().get_or_set(("ics", version, default_start),
+                                      lambda: ics_bytes(itin, default_start=default_start))
 
 def extract_points_for_map(itin: dict):
     pts = []
@@ -217,10 +127,14 @@ def extract_points_for_map(itin: dict):
                 pts.append({"lat": float(lat), "lon": float(lon), "name": s.get("name",""), "time": s.get("time","")})
     return pts
 
-<<<<<<< HEAD
-=======
-def has_agent_markdown(itin: dict) -> bool:
-    return isinstance(itin, dict) and "markdown" in itin and isinstance(itin["markdown"], str) and itin["markdown"].strip() != ""
+def editor_key() -> str:
+    """Clé du tableau d'édition, renouvelée à chaque nouvelle version (positions des lignes changées)."""
+    return f"all_stops_editor_{st.session_state.get('editor_rev', 0)}"
+
+def adopt_version(itin: dict, version: int):
+    st.session_state["itinerary"] = itin
+    st.session_state["trip_version"] = version
+    st.session_state["editor_rev"] = st.session_state.get("editor_rev", 0) + 1
 
 def get_agent_day_maps(itin: dict, day_idx: int):
     try:
@@ -234,131 +148,14 @@ def get_agent_day_pois(itin: dict, day_idx: int):
     except Exception:
         return []
 
-# ---------- Image fetchers (Wikipedia + Wikidata) ----------
-WIKI_LANGS_ORDER = ["fr", "en", "ar", "es"]
-
-def _wiki_search_image_candidates(query: str, lang: str, limit: int = 5):
-    """Retourne des candidats (thumbnail_url, title, pageid) depuis Wikipedia(lang)."""
-    try:
-        r = requests.get(
-            f"https://{lang}.wikipedia.org/w/api.php",
-            params={
-                "action": "query",
-                "format": "json",
-                "generator": "search",
-                "gsrsearch": query,
-                "gsrlimit": limit,
-                "prop": "pageimages|pageterms|categories",
-                "piprop": "thumbnail",
-                "pithumbsize": 800,
-            },
-            timeout=6,
-        )
-        pages = (r.json().get("query") or {}).get("pages") or {}
-        out = []
-        for _, pg in pages.items():
-            cats = [c.get("title","") for c in pg.get("categories", [])] if "categories" in pg else []
-            if any("disambiguation" in c.lower() or "homonymie" in c.lower() for c in cats):
-                continue
-            thumb = (pg.get("thumbnail") or {}).get("source")
-            if thumb:
-                out.append((thumb, pg.get("title",""), pg.get("pageid")))
-        return out
-    except Exception:
-        return []
-
-def _wikidata_image_filename(label: str, city: str, lang: str):
-    """Utilise Wikidata pour chercher P18 (fichier image Commons)."""
-    try:
-        term = f"{label} ({city})"
-        r = requests.get(
-            "https://www.wikidata.org/w/api.php",
-            params={
-                "action": "wbsearchentities",
-                "format": "json",
-                "language": lang,
-                "type": "item",
-                "search": term,
-                "limit": 3,
-            },
-            timeout=6,
-        )
-        search = r.json().get("search") or []
-        if not search:
-            r = requests.get(
-                "https://www.wikidata.org/w/api.php",
-                params={
-                    "action": "wbsearchentities",
-                    "format": "json",
-                    "language": lang,
-                    "type": "item",
-                    "search": label,
-                    "limit": 3,
-                },
-                timeout=6,
-            )
-            search = r.json().get("search") or []
-        if not search:
-            return None
-
-        qid = search[0]["id"]
-        r2 = requests.get(
-            "https://www.wikidata.org/w/api.php",
-            params={
-                "action": "wbgetentities",
-                "format": "json",
-                "ids": qid,
-                "props": "claims",
-            },
-            timeout=6,
-        )
-        claims = (r2.json().get("entities") or {}).get(qid, {}).get("claims") or {}
-        p18 = claims.get("P18")
-        if not p18:
-            return None
-        filename = p18[0]["mainsnak"]["datavalue"]["value"]
-        return filename
-    except Exception:
-        return None
-
-def _commons_thumb_from_filename(filename: str, width: int = 800):
-    return f"https://commons.wikimedia.org/w/thumb.php?f={urllib.parse.quote(filename)}&w={width}"
-
-@st.cache_data(show_spinner=False, ttl=60*60)
-def fetch_place_image(label: str, city: str) -> str | None:
-    """Image simple (peut servir de fallback)."""
-    # 1) Wikipedia multi-lang
-    query_variants = [f"{label}, {city}", f"{label} {city}", label]
-    for lang in WIKI_LANGS_ORDER:
-        for q in query_variants:
-            cands = _wiki_search_image_candidates(q, lang=lang, limit=5)
-            if cands:
-                return cands[0][0]
-    # 2) Wikidata P18
-    for lang in WIKI_LANGS_ORDER:
-        fn = _wikidata_image_filename(label, city, lang)
-        if fn:
-            return _commons_thumb_from_filename(fn, width=800)
-    return None
+# ---------- Images (Wikipedia + Wikidata, asynchrones : src/Core/images.py) ----------
+def place_thumbs(images: dict, width: int) -> dict:
+    """Vignettes locales de toutes les images du voyage, créées en une passe (src/Core/thumbnails.py)."""
+    return thumbnail_urls(images.values(), width)
 
-def get_unique_place_image(label: str, city: str, used_urls: set) -> str | None:
-    """Assure une image non déjà utilisée (dé-duplication)."""
-    query_variants = [f"{label}, {city}", f"{label} {city}", f"{label} in {city}", f"{label} (landmark)", label]
-    for lang in WIKI_LANGS_ORDER:
-        for q in query_variants:
-            cands = _wiki_search_image_candidates(q, lang=lang, limit=8)
-            for url, _, _ in cands:
-                if url not in used_urls:
-                    used_urls.add(url)
-                    return url
-    for lang in WIKI_LANGS_ORDER:
-        fn = _wikidata_image_filename(label, city, lang)
-        if fn:
-            url = _commons_thumb_from_filename(fn, width=800)
-            if url not in used_urls:
-                used_urls.add(url)
-                return url
-    return None
+def place_thumb(itin: dict, images: dict, label: str, thumbs: dict, width: int) -> str | None:
+    img = place_image(itin, label, images)
+    return thumbs.get(img) or thumbnail_url(img, width)
 
 # ---------- Helpers Table view ----------
 def _maps_search_url(label: str, address: str = "") -> str:
@@ -366,6 +163,8 @@ def _maps_search_url(label: str, address: str = "") -> str:
     return f"https://www.google.com/maps/search/?api=1&query={urllib.parse.quote_plus(q)}"
 
 def _get_poi_link(day: dict, idx: int, name: str, addr: str) -> str:
+    if day.get("transfer") and (day.get("maps") or {}).get("dir_link"):
+        return day["maps"]["dir_link"]
     pois = day.get("pois") or []
     if idx < len(pois):
         link = pois[idx].get("map_link")
@@ -373,15 +172,17 @@ def _get_poi_link(day: dict, idx: int, name: str, addr: str) -> str:
             return link
     return _maps_search_url(name, addr)
 
-def day_to_dataframe(day: dict, city: str) -> pd.DataFrame:
-    """DataFrame lisible pour un 'day' (stops synthétisés si agent)."""
+def day_to_dataframe(day: dict, itin: dict, images: dict, thumbs: dict) -> pd.DataFrame:
+    """
+    DataFrame lisible pour un 'day' (stops synthétisés si agent) ;
+    `images` : resolve_place_images(), `thumbs` : place_thumbs().
+    """
     rows = []
     stops = day.get("stops", [])
-    used_urls = set()
     for i, s in enumerate(stops):
         name = s.get("name", "") or "POI"
         addr = s.get("notes", "") or ""
-        img_url = get_unique_place_image(name, city, used_urls)
+        img_url = place_thumb(itin, images, name, thumbs, THUMB_TABLE_WIDTH)
         rows.append({
             "Time": s.get("time", ""),
             "Place": name,
@@ -394,7 +195,38 @@ def day_to_dataframe(day: dict, city: str) -> pd.DataFrame:
         })
     return pd.DataFrame(rows)
 
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
+# ---------------------- Session (ordonnanceur LLM) ----------------------
+def _session_id() -> str | None:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+def _session_alive(session_id: str | None) -> bool:
+    """Faux quand l'onglet est fermé : les jours encore en file ne sont pas générés."""
+    if not session_id or not runtime.exists():
+        return True
+    return runtime.get_instance().is_active_session(session_id)
+
+# ---------------------- Metrics endpoint ----------------------
+@st.cache_resource(show_spinner=False)
+def _metrics_server():
+    """Un seul serveur /metrics par process (Streamlit ré-exécute le script)."""
+    try:
+        return start_metrics_server()
+    except OSError:
+        return None
+
+_metrics_server()
+
+@st.cache_resource(show_spinner=False)
+def _thumbnail_server():
+    """Serveur des vignettes locales (/thumbs/<sha>.webp, cache navigateur d'un an)."""
+    try:
+        return start_thumbnail_server()
+    except OSError:
+        return None
+
+_thumbnail_server()
+
 # ---------------------- Load env ----------------------
 load_dotenv()
 
@@ -406,7 +238,20 @@ st.caption("Plan smarter trips with AI. Enter your city, choose interests & pref
 with st.sidebar:
     st.header("⚙️ Trip Preferences")
     city = st.text_input("City", placeholder="e.g., Paris")
+    legs_raw = st.text_area("Multi-city legs (optional)", placeholder="Paris:3\nLyon:2\nNice:2", height=90,
+                            help="One city:days per line (or Paris:3 -> Lyon:2). Two legs or more replace "
+                                 "City and Number of days; legs are planned in parallel.")
+    legs = parse_legs(legs_raw)
+    multi_city = len(legs) > 1
     interests_raw = st.text_input("Interests (comma-separated)", placeholder="museums, coffee, parks")
+    # Langue détectée localement (src/Chains/language.py) : prompt, cache et titres fixés avant l'appel
+    detected_lang = detect_language(city, legs_raw, interests_raw) if LANGUAGE_DETECT else None
+    language_choice = st.selectbox(
+        "Itinerary language", ["auto", *SUPPORTED],
+        format_func=lambda c: language_name(c) if c != "auto"
+        else (f"Auto — {language_name(detected_lang)}" if detected_lang else "Auto — detected by the model"),
+    )
+    language = detected_lang if language_choice == "auto" else language_choice
     trip_days = st.number_input("Number of days", min_value=1, max_value=14, value=1)
     start_date = st.date_input("Start date", value=date.today())
     pace = st.selectbox("Pace", ["Relaxed", "Balanced", "Packed"], index=1)
@@ -416,49 +261,87 @@ with st.sidebar:
     include_food = st.toggle("Include food stops", value=True)
     include_kids = st.toggle("Family-friendly focus", value=False)
     include_outdoors = st.toggle("Prefer outdoor activities", value=False)
-<<<<<<< HEAD
-=======
     transport_mode = st.selectbox("Transport mode (for Google Maps)", ["walking", "bicycling", "driving", "transit"], index=0)
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
+    if multi_city:
+        transfer_modes = ["transit", "driving", "bicycling", "walking"]
+        transfer_mode = st.selectbox("Between cities", transfer_modes,
+                                     index=transfer_modes.index(MULTI_CITY_TRANSFER_MODE)
+                                     if MULTI_CITY_TRANSFER_MODE in transfer_modes else 0)
+        transfer_days = st.toggle("Add transfer days", value=True)
 
     st.divider()
     st.subheader("Actions")
+    refine = st.toggle("Refine with the large model", value=False,
+                       help="Slower; skips cached drafts and regenerates every day with the 70B model")
     gen_btn = st.button("✨ Generate Itinerary", type="primary")
     reset_btn = st.button("↺ Reset")
 
+    if TRIP_STORE.enabled:
+        st.divider()
+        st.subheader("💾 Saved trips")
+        user_id = st.text_input("Traveler ID (optional)", key="user_id", help="Groups your saved trips")
+        for t in TRIP_STORE.list_trips(user_id=user_id or None, city=city or None, limit=10):
+            st.markdown(f"- [{t['city']} — {t['start_date']} ({t['days']}d)](?trip={t['id']})")
+    else:
+        user_id = ""
+
 if reset_btn:
+    SPECULATOR.discard(_session_id())
     st.session_state.clear()
+    st.query_params.clear()
     st.rerun()
 
-<<<<<<< HEAD
-# Maintain session state
-=======
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
 if "itinerary" not in st.session_state:
     st.session_state["itinerary"] = None
 
+# ---------------------- Shared trip (?trip=<id>) ----------------------
+shared_id = st.query_params.get("trip")
+if shared_id and shared_id != st.session_state.get("trip_id") and not gen_btn:
+    record = TRIP_STORE.load(shared_id)
+    if record is None:
+        st.warning(f"Trip `{shared_id}` not found.")
+    else:
+        st.session_state["itinerary"] = record["itinerary"]
+        st.session_state["trip_id"] = shared_id
+        st.session_state["trip_version"] = record["meta"].get("version", 0)
+
+# ---------------------- Speculative prefetch ----------------------
+if SPECULATOR.enabled and not gen_btn and not multi_city and city and interests_raw:
+    # Jour 1 en basse priorité dès que la saisie est stable ; ✨ Generate le réutilise
+    spec_sid = _session_id()
+    spec_planner = TravelPlanner()
+    spec_planner.set_city(city)
+    spec_planner.set_interests(interests_raw)
+    spec_planner.set_transport_mode(transport_mode)
+    spec_planner.set_session(user_id, spec_sid, alive=lambda: _session_alive(spec_sid))
+    spec_planner.set_refine(refine)
+    spec_planner.set_language(language)
+    spec_planner.speculate_first_day()
+
 # ---------------------- Generation ----------------------
 if gen_btn:
-    if not city or not interests_raw:
+    if not (city or multi_city) or not interests_raw:
         st.warning("Please provide both a city and at least one interest.")
     else:
         interests = [i.strip() for i in interests_raw.split(",") if i.strip()]
-        with st.spinner("Planning your trip…"):
-            planner = TravelPlanner()
-<<<<<<< HEAD
-            # Core fields you already had
-            planner.set_city(city)
-            planner.set_interests(", ".join(interests))
-
-            # Optional advanced parameters — only if your planner supports them
-            # Use try/except so UI never breaks if methods are missing.
-=======
-            planner.set_city(city)
+        with st.spinner("Planning your trip…"), request_context(city=city, days=int(trip_days)):
+            if multi_city:
+                # Étapes générées en parallèle (src/Core/multi_city.py), jours de transfert entre elles
+                planner = MultiCityPlanner()
+                try:
+                    planner.set_legs(legs)
+                    planner.set_transfer_mode(transfer_mode)
+                    planner.set_transfer_days(transfer_days)
+                except Exception as e:
+                    st.error(f"Invalid legs: {e}")
+                    st.stop()
+            else:
+                planner = TravelPlanner()
+                planner.set_city(city)
+                try: planner.set_days(int(trip_days))
+                except Exception: pass
             planner.set_interests(", ".join(interests))
 
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
-            try: planner.set_days(int(trip_days))
-            except Exception: pass
             try: planner.set_start_date(start_date.isoformat())
             except Exception: pass
             try: planner.set_preferences({
@@ -471,43 +354,23 @@ if gen_btn:
                 "prefer_outdoors": bool(include_outdoors),
             })
             except Exception: pass
-<<<<<<< HEAD
-
-            # Call your generator
-            try:
-                raw_itinerary = planner.create_itineary()  # keep your original method name
-=======
             try: planner.set_transport_mode(transport_mode)
             except Exception: pass
+            session_id = _session_id()
+            planner.set_session(user_id, session_id, alive=lambda: _session_alive(session_id))
+            planner.set_refine(refine)
+            planner.set_language(language)
 
             try:
                 raw_itinerary = planner.create_itinerary()
             except AttributeError:
                 raw_itinerary = planner.create_itineary()
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
             except Exception as e:
                 st.error(f"Planner error: {e}")
                 raw_itinerary = "Unable to generate itinerary. Please adjust inputs and try again."
 
             itinerary = ensure_itinerary_dict(raw_itinerary)
-<<<<<<< HEAD
-            itinerary["city"] = city  # enforce
-            # If multiple days requested and only one day returned, stretch dates
-            if len(itinerary.get("days", [])) == 1 and trip_days > 1:
-                # Add a day for each day of the trip
-                base_day = itinerary["days"][0]
-                itinerary["days"] = []
-                for d in range(trip_days):
-                    this_date = (start_date + timedelta(days=d)).isoformat()
-                    clone = {
-                        "date": this_date,
-                        "summary": base_day.get("summary", ""),
-                        "stops": base_day.get("stops", []),
-                    }
-                    itinerary["days"].append(clone)
-
-=======
-            itinerary["city"] = city
+            itinerary["city"] = planner.city or city
 
             # ---------- Synthesize stops from POIs if needed ----------
             def _synthesize_stops_from_agent(itin: dict, default_start="09:00"):
@@ -518,6 +381,15 @@ if gen_btn:
                 if has_stops or not has_agent:
                     return itin
                 for d in days:
+                    if d.get("transfer"):
+                        tr = d["transfer"]
+                        d["stops"] = [{
+                            "time": default_start, "name": f"{tr.get('from', '')} → {tr.get('to', '')}",
+                            "category": "transfer", "lat": None, "lon": None,
+                            "duration_min": tr.get("duration_min"), "cost_est": None,
+                            "notes": tr.get("to", "")
+                        }]
+                        continue
                     pois = d.get("pois", [])
                     t_h, t_m = map(int, default_start.split(":")) if ":" in default_start else (9,0)
                     stops = []
@@ -542,8 +414,42 @@ if gen_btn:
                 return itin
 
             itinerary = _synthesize_stops_from_agent(itinerary, default_start=start_time.strftime("%H:%M"))
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
             st.session_state["itinerary"] = itinerary
+            st.session_state["trip_id"] = TRIP_STORE.save(itinerary, user_id=user_id)
+            st.session_state["trip_version"] = 0
+            if st.session_state["trip_id"]:
+                st.query_params["trip"] = st.session_state["trip_id"]
+
+# ---------------------- Memory (MEMORY_PROFILE=on) ----------------------
+if memprof.MEMORY_PROFILE:
+    memprof.start_tracing()
+    with st.sidebar, st.expander("🧠 Memory"):
+        ctx = get_script_run_ctx()
+        foot = memprof.session_footprint(st.session_state.to_dict(), whole=ctx.session_state if ctx else None)
+        st.markdown("**This session**")
+        st.dataframe([{"part": k, "size": memprof.fmt_bytes(v)} for k, v in foot.items()],
+                     hide_index=True, use_container_width=True)
+        st.markdown("**Process caches**")
+        st.dataframe([{"cache": k, "size": memprof.fmt_bytes(v)} for k, v in memprof.cache_footprint().items()],
+                     hide_index=True, use_container_width=True)
+        st.markdown("**Bounded caches**")
+        st.dataframe([{"cache": k, "entries": v["entries"], "size": memprof.fmt_bytes(v["bytes"]),
+                       "hit rate": v["hit_rate"], "evictions": v["evictions"]} for k, v in cache_stats().items()],
+                     hide_index=True, use_container_width=True)
+        snap = memprof.take_snapshot()
+        if snap is not None:
+            base = memprof.baseline()
+            current, peak = tracemalloc.get_traced_memory()
+            st.caption(f"Traced: {memprof.fmt_bytes(current)} (peak {memprof.fmt_bytes(peak)})"
+                       + (" • diff since baseline" if base else ""))
+            st.dataframe([{"area": a, "size": memprof.fmt_bytes(n), "blocks": c}
+                          for a, n, c in memprof.by_area(snap, base)[:10]],
+                         hide_index=True, use_container_width=True)
+            for line, n in memprof.top_lines(snap, 5, base):
+                st.caption(f"{memprof.fmt_bytes(n)} — {line}")
+            if st.button("Set baseline"):
+                memprof.set_baseline()
+                st.rerun()
 
 # ---------------------- Main content ----------------------
 if st.session_state["itinerary"] is None:
@@ -551,12 +457,35 @@ if st.session_state["itinerary"] is None:
     st.stop()
 
 itin = st.session_state["itinerary"]
+if st.session_state.get("flash"):
+    st.success(st.session_state.pop("flash"))
+if st.session_state.get("flash_warning"):
+    st.warning(st.session_state.pop("flash_warning"))
+if st.session_state.get("trip_id"):
+    st.caption(f"Share this trip: `?trip={st.session_state['trip_id']}` • version "
+               f"{st.session_state.get('trip_version', 0)}"
+               + (" • edits by other travelers appear live" if collab.COLLAB_POLL_S > 0 else ""))
+
+@st.fragment(run_every=collab.COLLAB_POLL_S or None)
+def live_updates():
+    """Vérifie la version du voyage ; n'applique que les deltas des autres éditeurs (src/Core/collab.py)."""
+    trip_id, base = st.session_state.get("trip_id"), st.session_state.get("trip_version", 0)
+    latest = TRIP_STORE.version(trip_id)
+    if latest is None or latest <= base:
+        return
+    if collab.has_pending_edits(st.session_state.get(editor_key())):
+        # Le tableau garde la saisie en cours ; Save Edits fusionnera (ou signalera un conflit)
+        st.caption(f"🔄 Version {latest} available — it will be merged when you save your edits.")
+        return
+    updated, version, n = collab.pull(trip_id, st.session_state["itinerary"], base)
+    adopt_version(updated, version)
+    st.session_state["flash"] = f"{n} update(s) from another traveler (version {version})."
+    st.rerun()
+
+if st.session_state.get("trip_id") and TRIP_STORE.enabled and collab.COLLAB_POLL_S > 0:
+    live_updates()
 
-<<<<<<< HEAD
-# Top KPIs
-=======
 # KPIs
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
 col1, col2, col3, col4 = st.columns(4)
 with col1:
     st.metric("City", itin.get("city", "—"))
@@ -564,136 +493,60 @@ with col2:
     st.metric("Days", len(itin.get("days", [])))
 with col3:
     total_stops = sum(len(d.get("stops", [])) for d in itin.get("days", []))
-<<<<<<< HEAD
-    st.metric("Stops", total_stops)
-=======
     st.metric("Stops", total_stops if total_stops else "—")
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
 with col4:
-    est_cost = 0.0
-    for d in itin.get("days", []):
-        for s in d.get("stops", []):
-            c = s.get("cost_est")
-            if isinstance(c, (int, float)): est_cost += c
+    budget_report = compute_budget(itin, budget_per_day_eur=budget, travelers=travelers)
+    est_cost = budget_report["total_group_eur"]
     st.metric("Est. Total Cost", f"€{est_cost:,.0f}" if est_cost else "—")
 
-<<<<<<< HEAD
-# Tabs for different views
-tab_overview, tab_map, tab_day, tab_export = st.tabs(["Overview", "Map", "Day-by-day", "Export"])
-
-with tab_overview:
-    st.subheader("🗒️ Overview")
-    # Show a concise markdown summary
-    st.markdown(itinerary_to_markdown(itin))
-
-    # Editable table of all stops
-    st.subheader("Edit Stops (All Days)")
-    # Flatten for edit
-    rows = []
-    for di, d in enumerate(itin.get("days", [])):
-        date_str = d.get("date", "")
-        for si, s in enumerate(d.get("stops", [])):
-            rows.append({
-                "day_index": di,
-                "stop_index": si,
-                "date": date_str,
-                "time": s.get("time", ""),
-                "name": s.get("name", ""),
-                "category": s.get("category", ""),
-                "lat": s.get("lat"),
-                "lon": s.get("lon"),
-                "duration_min": s.get("duration_min"),
-                "cost_est": s.get("cost_est"),
-                "notes": s.get("notes", ""),
-            })
-    edited = st.data_editor(
-        rows,
-        num_rows="dynamic",
-        use_container_width=True,
-        key="all_stops_editor",
-        column_config={
-            "day_index": st.column_config.NumberColumn("Day#", disabled=True),
-            "stop_index": st.column_config.NumberColumn("Stop#", disabled=True),
-            "date": st.column_config.TextColumn("Date"),
-            "time": st.column_config.TextColumn("Time (HH:MM)"),
-            "name": st.column_config.TextColumn("Name"),
-            "category": st.column_config.TextColumn("Category"),
-            "lat": st.column_config.NumberColumn("Lat", format="%.6f"),
-            "lon": st.column_config.NumberColumn("Lon", format="%.6f"),
-            "duration_min": st.column_config.NumberColumn("Duration (min)"),
-            "cost_est": st.column_config.NumberColumn("Cost (€)", format="%.2f"),
-            "notes": st.column_config.TextColumn("Notes"),
-        }
+usage = itin.get("usage") or {}
+if usage:
+    st.caption(
+        f"LLM: {usage.get('llm_calls', 0)} call(s) • {usage.get('prompt_tokens', 0)}+{usage.get('completion_tokens', 0)} tokens"
+        f" • ${usage.get('cost_usd', 0):.4f} • {usage.get('llm_latency_s', 0):.1f}s"
     )
 
-    # Apply edits back into session itinerary
-    if st.button("💾 Save Edits"):
-        # Reset stops then rebuild from editor
-        new_days = {}
-        for r in edited:
-            di = int(r["day_index"])
-            if di not in new_days:
-                # seed from original date/summary if exists
-                old_day = itin["days"][di] if di < len(itin["days"]) else {"date": r.get("date",""), "summary":"", "stops":[]}
-                new_days[di] = {"date": r.get("date", old_day.get("date","")),
-                                "summary": old_day.get("summary",""),
-                                "stops": []}
-            stop = {
-                "time": r.get("time") or "",
-                "name": r.get("name") or "",
-                "category": r.get("category") or "",
-                "lat": r.get("lat"),
-                "lon": r.get("lon"),
-                "duration_min": r.get("duration_min"),
-                "cost_est": r.get("cost_est"),
-                "notes": r.get("notes") or "",
-            }
-            new_days[di]["stops"].append(stop)
-
-        # Reassemble in original order
-        new_itin_days = []
-        for i in sorted(new_days.keys()):
-            new_itin_days.append(new_days[i])
-        st.session_state["itinerary"]["days"] = new_itin_days
-        st.success("Edits saved.")
+# Images des POIs : une résolution par rendu, partagée par les onglets (hors de l'itinéraire)
+place_images = resolve_place_images(itin)
+# Libellés du contenu du voyage dans la langue de l'itinéraire (src/Chains/renderer.py)
+tpl = template(itin.get("language_code", "fr"))
 
-with tab_map:
-    st.subheader("🗺️ Map")
-    points = extract_points_for_map(itin)
-    if not points:
-        st.info("No geocoordinates found. Add lat/lon in the editor to see a map.")
-    else:
-        # Streamlit's native map
-        st.map(points, latitude="lat", longitude="lon", size=10)
-=======
 # Tabs
-tab_overview, tab_table, tab_map, tab_day, tab_export = st.tabs(["Overview", "Table", "Map", "Day-by-day", "Export"])
+tab_overview, tab_table, tab_map, tab_day, tab_budget, tab_export = st.tabs(
+    ["Overview", "Table", "Map", "Day-by-day", "Budget", "Export"]
+)
 
-with tab_overview:
+with tab_overview, span("ui.tab.overview"):
     st.subheader("🗒️ Overview")
 
-    if has_agent_markdown(itin):
-        st.markdown(itin["markdown"])
+    if is_agent_itinerary(itin):
+        st.markdown(itinerary_markdown(itin))
         st.divider()
 
-    st.subheader("📍 Points d’intérêt (tous les jours)")
+    st.subheader(f"📍 {tpl.label['pois_all']}")
+    card_thumbs = place_thumbs(place_images, THUMB_CARD_WIDTH)
     for day_idx, day in enumerate(itin.get("days", [])):
-        st.markdown(f"### Jour {day_idx+1} — {day.get('date','')}")
+        where = f" — {day['city']}" if itin.get("legs") and day.get("city") and not day.get("transfer") else ""
+        st.markdown(f"### {tpl.day_name.format(n=day_idx+1)} — {day.get('date','')}{where}")
+        if day.get("transfer"):
+            tr = day["transfer"]
+            st.link_button(f"{tpl.label['route']}: {tr.get('from', '')} → {tr.get('to', '')}",
+                           get_agent_day_maps(itin, day_idx).get("dir_link") or "", use_container_width=True)
+            continue
         pois = get_agent_day_pois(itin, day_idx)
         if not pois:
             pois = [{"label": s.get("name",""), "address": s.get("notes","")} for s in day.get("stops", [])]
         if not pois:
-            st.caption("Aucun POI pour ce jour.")
+            st.caption(tpl.label["no_pois"])
             continue
 
-        used_urls = set()  # dé-dup images pour ce jour
         cols = st.columns(3, gap="small")
         for i, poi in enumerate(pois):
             with cols[i % 3]:
                 label = poi.get("label") or poi.get("name") or "POI"
                 addr = poi.get("address") or ""
                 link = poi.get("map_link")
-                img = get_unique_place_image(label, itin.get("city",""), used_urls)
+                img = place_thumb(itin, place_images, label, card_thumbs, THUMB_CARD_WIDTH)
 
                 st.markdown('<div class="card">', unsafe_allow_html=True)
                 if img:
@@ -705,11 +558,11 @@ with tab_overview:
                 row = st.columns([1,1,1])
                 with row[0]:
                     if link:
-                        st.link_button(f"Carte {day_idx+1}-{i+1}", link, use_container_width=True)
+                        st.link_button(f"{tpl.label['map']} {day_idx+1}-{i+1}", link, use_container_width=True)
                 with row[1]:
                     maps = get_agent_day_maps(itin, day_idx)
                     if maps.get("dir_link") and i % 3 == 0:
-                        st.link_button(f"Route {day_idx+1}", maps["dir_link"], use_container_width=True)
+                        st.link_button(f"{tpl.label['route']} {day_idx+1}", maps["dir_link"], use_container_width=True)
                 with row[2]:
                     est_cost = poi.get("est_cost_eur")
                     if not est_cost and i < len(day.get("stops", [])):
@@ -722,13 +575,14 @@ with tab_overview:
                     )
                 st.markdown('</div>', unsafe_allow_html=True)
 
-with tab_table:
+with tab_table, span("ui.tab.table"):
     st.subheader("📊 Itinerary (table view)")
+    table_thumbs = place_thumbs(place_images, THUMB_TABLE_WIDTH)
     for idx, day in enumerate(itin.get("days", [])):
-        st.markdown(f"### Day {idx+1} — {day.get('date','')}")
-        df = day_to_dataframe(day, itin.get("city",""))
+        st.markdown(f"### {tpl.day_name.format(n=idx+1)} — {day.get('date','')}")
+        df = day_to_dataframe(day, itin, place_images, table_thumbs)
         if df.empty:
-            st.caption("No stops for this day.")
+            st.caption(tpl.label["no_stops"])
             continue
         st.dataframe(
             df,
@@ -743,18 +597,57 @@ with tab_table:
         )
         st.divider()
 
-with tab_map:
+    # Édition des stops ; "Save Edits" enregistre un patch des seules lignes modifiées
+    st.subheader("✏️ Edit stops (all days)")
+    rows, positions = collab.editor_rows(itin)
+    st.data_editor(
+        rows,
+        num_rows="dynamic",
+        use_container_width=True,
+        key=editor_key(),
+        column_config={
+            "day_index": st.column_config.NumberColumn("Day#", min_value=0, max_value=max(len(itin.get("days", [])) - 1, 0)),
+            "date": st.column_config.TextColumn("Date", disabled=True),
+            "time": st.column_config.TextColumn("Time (HH:MM)"),
+            "duration_min": st.column_config.NumberColumn("Duration (min)"),
+            "cost_est": st.column_config.NumberColumn("Cost (€)", format="%.2f"),
+        }
+    )
+    if st.button("💾 Save Edits"):
+        ops = collab.editor_ops(itin, positions, st.session_state.get(editor_key()))
+        trip_id, base = st.session_state.get("trip_id"), st.session_state.get("trip_version", 0)
+        try:
+            new_itin, version = collab.save(trip_id, itin, base, ops)
+        except EditConflict as e:
+            # Vue mise à jour avec les modifications des autres ; la saisie est à refaire
+            new_itin, version, _ = collab.pull(trip_id, itin, base)
+            st.session_state["flash_warning"] = (
+                f"Another traveler changed the same stops (version {e.version}); your edits were not saved. "
+                "The table now shows the latest version."
+            )
+        else:
+            st.session_state["flash"] = (f"Edits saved: {len(ops)} change(s)"
+                                         + (f", version {version}." if trip_id else ".")) if ops else "No changes to save."
+        adopt_version(new_itin, version)
+        st.rerun()
+
+with tab_map, span("ui.tab.map"):
     st.subheader("🗺️ Map & Routes")
 
     has_any_route = False
+    trip_route = (itin.get("maps") or {}).get("dir_link")
+    if trip_route:
+        st.link_button(f"{tpl.label['open_maps']} — {tpl.label['whole_trip']}: {itin.get('city', '')}", trip_route,
+                       use_container_width=True)
     for idx, day in enumerate(itin.get("days", [])):
         maps = get_agent_day_maps(itin, idx)
         dir_link = maps.get("dir_link")
         if dir_link:
             has_any_route = True
             with st.container(border=True):
-                st.markdown(f"### {day.get('date','')} — Global Route")
-                st.link_button(f"Open in Google Maps — Day {idx+1}", dir_link, use_container_width=True)
+                st.markdown(f"### {day.get('date','')} — {tpl.label['route']}")
+                st.link_button(f"{tpl.label['open_maps']} — {tpl.day_name.format(n=idx+1)}", dir_link,
+                               use_container_width=True)
                 pois = get_agent_day_pois(itin, idx)
                 if pois:
                     st.markdown("**POIs**")
@@ -763,67 +656,35 @@ with tab_map:
                         addr = p.get("address") or ""
                         link = p.get("map_link")
                         line = f"- **{label}**" + (f" — {addr}" if addr else "")
-                        if link: line += f" • [Carte]({link})"
+                        if link: line += tpl.poi_link.format(link)
                         st.markdown(line)
 
     if not has_any_route:
-        st.caption("Pas de lien d’itinéraire global fourni par l’agent — utilisez la carte si des lat/lon sont renseignés ci-dessous.")
+        st.caption(tpl.label["no_route"])
 
     points = extract_points_for_map(itin)
     if points:
         st.map(points, latitude="lat", longitude="lon")
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
         with st.expander("Points shown"):
             st.dataframe(points, use_container_width=True)
 
-with tab_day:
+with tab_day, span("ui.tab.day"):
     st.subheader("📆 Day-by-day plan")
-<<<<<<< HEAD
-    for day in itin.get("days", []):
-        with st.container(border=True):
-            st.markdown(f"### {day.get('date','')}")
-            if day.get("summary"): st.write(day["summary"])
-            stops = day.get("stops", [])
-            if not stops:
-                st.caption("No stops for this day.")
-                continue
-            # Pretty list
-            for s in stops:
-                left, right = st.columns([2, 1])
-                with left:
-                    st.markdown(f"**{s.get('time','--:--')}** — **{s.get('name','Stop')}**")
-                    meta = []
-                    if s.get("category"): meta.append(s["category"])
-                    if s.get("duration_min"): meta.append(f"{s['duration_min']} min")
-                    if s.get("cost_est") is not None: meta.append(f"€{s['cost_est']:.2f}")
-                    if meta:
-                        st.caption(" • ".join(meta))
-                    if s.get("notes"):
-                        st.write(s["notes"])
-                with right:
-                    # Optional per-stop quick edits (not persisted until Save Edits in Overview)
-                    st.text_input("Time", value=s.get("time",""), key=f"time_{day['date']}_{s.get('name','')}")
-                    st.text_input("Notes", value=s.get("notes",""), key=f"notes_{day['date']}_{s.get('name','')}")
-
-with tab_export:
-    st.subheader("📤 Export")
-    md = itinerary_to_markdown(itin)
-=======
     for i, day in enumerate(itin.get("days", [])):
         with st.container(border=True):
             st.markdown(f"### {day.get('date','')}")
             if "sections" in day:  # agent
                 secs = day["sections"]
-                for key in ["morning","lunch","afternoon","evening","logistics","rain_plan","recap"]:
+                for key in SECTION_KEYS:
                     xs = secs.get(key, [])
                     if xs:
-                        st.markdown(f"**{key.capitalize()}**")
+                        st.markdown(f"**{tpl.label[key]}**")
                         for b in xs:
                             st.write(f"- {b}")
             else:  # legacy stops
                 stops = day.get("stops", [])
                 if not stops:
-                    st.caption("No stops for this day.")
+                    st.caption(tpl.label["no_stops"])
                     continue
                 for s in stops:
                     left, right = st.columns([2, 1])
@@ -841,24 +702,68 @@ with tab_export:
                         st.text_input("Time", value=s.get("time",""), key=f"time_{day['date']}_{s.get('name','')}")
                         st.text_input("Notes", value=s.get("notes",""), key=f"notes_{day['date']}_{s.get('name','')}")
 
-with tab_export:
+with tab_budget, span("ui.tab.budget"):
+    st.subheader("💶 Budget")
+    st.caption(f"{travelers} traveler(s) • budget €{budget}/day per traveler")
+
+    b1, b2, b3 = st.columns(3)
+    with b1:
+        st.metric("Per traveler", f"€{budget_report['total_per_traveler_eur']:,.0f}")
+    with b2:
+        st.metric("Group total", f"€{budget_report['total_group_eur']:,.0f}")
+    with b3:
+        st.metric("Days over budget", len(budget_report["days_over_budget"]))
+    if budget_report["missing"]:
+        st.caption(f"{budget_report['missing']} item(s) without cost estimate (counted as €0).")
+
+    st.markdown("**Per day**")
+    st.dataframe(
+        budget_report["per_day"],
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "day_index": st.column_config.NumberColumn("Day#"),
+            "per_traveler_eur": st.column_config.NumberColumn("Per traveler (€)", format="%.2f"),
+            "group_eur": st.column_config.NumberColumn("Group (€)", format="%.2f"),
+            "over_budget": st.column_config.CheckboxColumn("Over budget"),
+        }
+    )
+    st.markdown("**Per category**")
+    st.dataframe(
+        budget_report["per_category"],
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "per_traveler_eur": st.column_config.NumberColumn("Per traveler (€)", format="%.2f"),
+            "group_eur": st.column_config.NumberColumn("Group (€)", format="%.2f"),
+        }
+    )
+
+    # Suggestion locale (sans appel LLM) pour les jours hors budget, sur les lignes chiffrées ci-dessus
+    costs = cost_frame(itin) if budget_report["days_over_budget"] else None
+    for di in budget_report["days_over_budget"]:
+        day = itin["days"][di]
+        keep = select_pois_within_budget(day_items(costs, di), budget)
+        with st.expander(f"{tpl.day_name.format(n=di+1)} — {day.get('date','')}: fit within €{budget}"):
+            for p in keep:
+                c = p.get("est_cost_eur")
+                st.write(f"- {p.get('label') or p.get('name') or 'POI'}"
+                         + (f" (€{float(c):.0f})" if isinstance(c, (int, float)) else ""))
+
+with tab_export, span("ui.tab.export"):
     st.subheader("📤 Export")
-    md = itin["markdown"] if has_agent_markdown(itin) else itinerary_to_markdown_legacy(itin)
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
-    js = itinerary_to_json(itin)
-    ics = itinerary_to_ics(itin, default_start=start_time.strftime("%H:%M"))
+    md = itinerary_markdown(itin)
+    version = itinerary_version(itin)
+    js = itinerary_to_json(version, itin)
+    ics = ics_export(version, start_time.strftime("%H:%M"), itin)
 
     st.download_button("Download Markdown", md, file_name="itinerary.md")
-    st.download_button("Download JSON", js, file_name="itinerary.json")
-    st.download_button("Download Calendar (.ics)", ics, file_name="itinerary.ics")
+    st.download_button("Download JSON", js, file_name="itinerary.json", mime="application/json")
+    st.download_button("Download Calendar (.ics)", ics, file_name="itinerary.ics", mime="text/calendar")
 
     st.divider()
     st.text_area("Preview (Markdown)", md, height=300)
 
-<<<<<<< HEAD
-# Footer tip
-st.caption("Tip: Add lat/lon for each stop to unlock the map. Use the Overview → Edit Stops table to refine details.")
-=======
 # ---------------------- Signature badge ----------------------
 def _data_uri(path_or_url: str) -> str | None:
     if not path_or_url:
@@ -886,4 +791,3 @@ else:
       <span>Créé par <strong>{SIGNATURE_NAME}</strong></span>
     </div>
     ''', unsafe_allow_html=True)
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
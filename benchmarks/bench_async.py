@@ -0,0 +1,72 @@
+"""
+Sessions simultanées sur le cœur asynchrone : N voyages générés en même temps sur la boucle
+unique (src.Utils.aio), appels LLM bornés par les créneaux de l'ordonnanceur.
+
+    python -m benchmarks.bench_async [--sessions 200] [--days 2] [--slots 64] [--latency 0.5]
+
+Faux LLM à latence fixe (attente asyncio), cache, fragments et limiteur neutralisés.
+Affiche le temps total, le débit et le nombre de threads du process au pic : il ne
+dépend pas du nombre de sessions (avant, chaque appel en cours occupait un thread).
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from src.Chains import Itinerary_chain
+from src.Chains.fake_llm import install_fake_llm
+from src.Chains.itinerary_cache import ItineraryCache
+from src.Core.fragments import DayComposer
+from src.Core.planner import TravelPlanner
+from src.Core.scheduler import LLMScheduler
+from src.Utils import aio
+from src.Utils.rate_limit import set_llm_rate_limit
+
+async def _session(i: int, days: int, scheduler: LLMScheduler) -> dict:
+    p = TravelPlanner()
+    p.set_city(f"City{i}")
+    p.set_interests("food, art")
+    p.set_days(days)
+    p.set_session(f"user{i}", f"session{i}")
+    p.scheduler = scheduler
+    p.composer = DayComposer(None)
+    return await p.acreate_itinerary()
+
+async def _main(sessions: int, days: int, scheduler: LLMScheduler) -> tuple:
+    peak = 0
+
+    async def sample():
+        nonlocal peak
+        while True:
+            peak = max(peak, threading.active_count())
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.ensure_future(sample())
+    t0 = time.perf_counter()
+    trips = await asyncio.gather(*(_session(i, days, scheduler) for i in range(sessions)))
+    wall = time.perf_counter() - t0
+    sampler.cancel()
+    return trips, wall, peak
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--days", type=int, default=2)
+    ap.add_argument("--slots", type=int, default=64, help="appels LLM simultanés (SCHEDULER_WORKERS)")
+    ap.add_argument("--latency", type=float, default=0.5)
+    args = ap.parse_args()
+
+    install_fake_llm(latency_s=args.latency)
+    Itinerary_chain.ITINERARY_CACHE = ItineraryCache(None)
+    set_llm_rate_limit(1e6, burst=1e6)
+
+    trips, wall, peak = aio.run_sync(_main(args.sessions, args.days, LLMScheduler(workers=args.slots)))
+    calls = args.sessions * args.days
+    ideal = -(-args.days * args.sessions // args.slots) * args.latency
+    print(f"{args.sessions} sessions x {args.days} jours, {args.slots} créneaux, latence {args.latency}s")
+    print(f"  {calls} appels en {wall:.2f}s (borne {ideal:.2f}s)  {calls / wall:.1f} appels/s  "
+          f"threads au pic : {peak}")
+    assert len(trips) == args.sessions and all(len(t["days"]) == args.days for t in trips)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+BoundedCache : taux de succès LRU vs TinyLFU et respect des bornes.
+
+    python -m benchmarks.bench_cache [--requests 200000] [--keys 20000] [--entries 1000]
+                                     [--scan-every 5000] [--scan-len 2000]
+
+Charge : clés tirées selon une loi de Zipf (quelques villes/POIs très demandés, une
+longue traîne), entrecoupées de balayages de clés vues une seule fois (prewarm, robots).
+Valeurs de 200 o à 8 Ko ; le cache est borné à `--entries` entrées et à la moitié des
+octets qu'elles occuperaient au maximum. Graine fixe : résultats reproductibles.
+"""
+import argparse
+import bisect
+import random
+import time
+
+from src.Utils.bounded_cache import LRU, TINYLFU, BoundedCache
+
+def _workload(n: int, keys: int, scan_every: int, scan_len: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    weights = [1.0 / (i + 1) for i in range(keys)]
+    cum, total = [], 0.0
+    for w in weights:
+        total += w
+        cum.append(total)
+    out, scan_id = [], 0
+    for i in range(n):
+        if scan_every and i and i % scan_every == 0:
+            out.extend(f"scan-{scan_id}-{j}" for j in range(scan_len))
+            scan_id += 1
+        out.append(f"k{bisect.bisect_left(cum, rng.random() * total)}")
+    return out
+
+def _run(policy: str, trace: list, entries: int, max_bytes: int) -> dict:
+    cache = BoundedCache(f"bench-{policy}", max_entries=entries, max_bytes=max_bytes, policy=policy)
+    peak = 0
+    t0 = time.perf_counter()
+    for k in trace:
+        if cache.get(k) is None:
+            cache.set(k, b"x" * (200 + hash(k) % 8000))
+        peak = max(peak, cache.stats()["bytes"]) if len(cache) % 97 == 0 else peak
+    wall = time.perf_counter() - t0
+    s = cache.stats()
+    return {**s, "peak_bytes": max(peak, s["bytes"]), "us_per_op": 1e6 * wall / len(trace)}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200000)
+    ap.add_argument("--keys", type=int, default=20000)
+    ap.add_argument("--entries", type=int, default=1000)
+    ap.add_argument("--scan-every", type=int, default=5000)
+    ap.add_argument("--scan-len", type=int, default=2000)
+    args = ap.parse_args()
+
+    trace = _workload(args.requests, args.keys, args.scan_every, args.scan_len)
+    max_bytes = args.entries * 8200 // 2
+    print(f"{len(trace)} lookups, Zipf over {args.keys} keys + scans of {args.scan_len} one-off keys "
+          f"every {args.scan_every}; cache {args.entries} entries / {max_bytes // 1024} KB")
+    for policy in (LRU, TINYLFU):
+        r = _run(policy, trace, args.entries, max_bytes)
+        print(f"  {policy:<8} hit rate {r['hit_rate']:.3f}  evictions {r['evictions']:>7}  "
+              f"rejected {r['rejected']:>7}  peak {r['peak_bytes'] // 1024} KB (cap {max_bytes // 1024} KB)  "
+              f"{r['us_per_op']:.1f} µs/op")
+        assert r["peak_bytes"] <= max_bytes and r["entries"] <= args.entries
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Édition à plusieurs (src/Core/collab.py) : chemin précédent (tableau entier -> nouvel
+itinéraire -> diff complet) vs patch des seules lignes modifiées, puis éditeurs concurrents.
+
+    python -m benchmarks.bench_collab [--days 14] [--stops 8] [--n 500] [--editors 8]
+
+Store en mémoire. « Rattrapage » : load() complet (payload + deltas rejoués) vs
+edits_since() de la version de la vue. Les éditeurs concurrents partent tous de la même
+version : modifications de stops distincts (rebase) puis du même stop (conflits).
+"""
+import argparse
+import copy
+import threading
+import time
+
+from src.Core import collab
+from src.Core.json_patch import diff
+from src.Core.trip_store import EditConflict, MemoryTripBackend, TripStore
+
+def make_trip(days: int, stops: int) -> dict:
+    return {"city": "Lisbon", "days": [
+        {"date": f"2026-05-{d + 1:02d}", "stops": [
+            collab.new_stop({"time": f"{9 + s}:00", "name": f"Stop {d}-{s}", "category": "museum",
+                             "duration_min": 60, "cost_est": 10, "notes": ""})
+            for s in range(stops)]}
+        for d in range(days)]}
+
+def legacy_rebuild(itin: dict, rows: list) -> dict:
+    """Ancien Save Edits : tous les jours reconstruits depuis les lignes du tableau."""
+    days = [{**d, "stops": []} for d in itin["days"]]
+    for r in rows:
+        days[r["day_index"]]["stops"].append(collab.new_stop(r))
+    return {**itin, "days": days}
+
+def _time(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - t0) / n * 1e6
+
+def _editors(store: TripStore, trip_id: str, n: int, ops_for) -> tuple:
+    base, out = store.version(trip_id), {"saved": 0, "conflicts": 0}
+    lock = threading.Lock()
+
+    def run(i: int):
+        try:
+            store.apply_edits(trip_id, base, ops_for(i))
+            key = "saved"
+        except EditConflict:
+            key = "conflicts"
+        with lock:
+            out[key] += 1
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return out["saved"], out["conflicts"]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=14)
+    ap.add_argument("--stops", type=int, default=8)
+    ap.add_argument("--n", type=int, default=500)
+    ap.add_argument("--editors", type=int, default=8)
+    args = ap.parse_args()
+
+    itin = make_trip(args.days, args.stops)
+    rows, positions = collab.editor_rows(itin)
+    print(f"{args.days} jours x {args.stops} stops ({len(rows)} lignes), une note modifiée x {args.n}")
+
+    def old_path(i: int):
+        edited = copy.copy(rows)
+        edited[5] = {**rows[5], "notes": f"note {i}"}
+        return diff(itin, legacy_rebuild(itin, edited))
+
+    def new_path(i: int):
+        ops = collab.editor_ops(itin, positions, {"edited_rows": {5: {"notes": f"note {i}"}}})
+        collab.apply_local(itin, ops)
+        return ops
+
+    t_old, t_new = _time(old_path, args.n), _time(new_path, args.n)
+    print(f"  tableau -> diff complet   {t_old:9.1f} µs  {len(old_path(0))} op(s)")
+    print(f"  tableau -> patch          {t_new:9.1f} µs  {len(new_path(0))} op(s)  (x{t_old / t_new:.1f})")
+
+    store = TripStore(MemoryTripBackend())
+    trip_id = store.save(make_trip(args.days, args.stops))
+    for i in range(50):
+        store.apply_edits(trip_id, i, [{"op": "replace", "path": f"/days/{i % args.days}/stops/0/notes",
+                                        "value": f"edit {i}"}])
+    t_load = _time(lambda i: store.load(trip_id), args.n)
+    t_pull = _time(lambda i: store.edits_since(trip_id, 49), args.n)
+    print(f"  rattrapage 1 delta sur 50  load() {t_load:9.1f} µs  edits_since() {t_pull:7.1f} µs  "
+          f"(x{t_load / t_pull:.0f})")
+
+    n = min(args.editors, args.days * args.stops)
+    disjoint = lambda i: [{"op": "replace", "value": f"editor {i}",
+                          "path": f"/days/{i % args.days}/stops/{i // args.days}/notes"}]
+    same = lambda i: [{"op": "replace", "path": "/days/0/stops/0/name", "value": f"editor {i}"}]
+    saved, conflicted = _editors(store, trip_id, n, disjoint)
+    print(f"  {n} éditeurs, stops distincts : {saved} enregistrés (rebase), {conflicted} conflit(s)")
+    saved, conflicted = _editors(store, trip_id, n, same)
+    print(f"  {n} éditeurs, même stop       : {saved} enregistré(s), {conflicted} conflit(s)")
+    assert store.load(trip_id)["itinerary"]["days"][0]["stops"][0]["name"].startswith("editor")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Coût du chemin d'erreur sous charge (panne LLM simulée).
+
+    python -m benchmarks.bench_errors [--n 50000] [--threads 8]
+
+Compare l'ancienne construction de CustomException (sys.exc_info + formatage
+immédiat, log en f-string) à la nouvelle (traceback gardé, formatage paresseux,
+log en %-style) lorsque l'erreur est levée, loggée au niveau ERROR mais filtrée,
+puis classée pour la politique de retry. Compte aussi les tentatives faites par
+tenacity quand le fournisseur refuse la requête (erreur non réessayable).
+"""
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tenacity import retry, stop_after_attempt, retry_if_exception, retry_if_exception_type
+
+from src.Utils.custom_exception import CustomException, is_retryable
+
+class LegacyCustomException(Exception):
+    """Copie de l'implémentation précédente (formatage à la construction)."""
+
+    def __init__(self, message: str, error_detail: Exception = None):
+        self.error_message = self.get_detailed_error_message(message, error_detail)
+        super().__init__(self.error_message)
+
+    @staticmethod
+    def get_detailed_error_message(message, error_detail):
+        _, _, exc_tb = sys.exc_info()
+        file_name = exc_tb.tb_frame.f_code.co_filename if exc_tb else "Unknown File"
+        line_number = exc_tb.tb_lineno if exc_tb else "Unknown Line"
+        return f"{message} | Error: {error_detail} | File: {file_name} | Line: {line_number}"
+
+class APIConnectionError(Exception):
+    pass
+
+logger = logging.getLogger("bench.errors")
+logger.propagate = False
+logger.addHandler(logging.NullHandler())
+logger.setLevel(logging.CRITICAL)  # comme un pod en panne qui filtre le bruit
+
+def _upstream():
+    raise APIConnectionError("Connection error: upstream unavailable " + "x" * 200)
+
+def legacy_path(n: int) -> int:
+    retryable = 0
+    for _ in range(n):
+        try:
+            try:
+                _upstream()
+            except Exception as e:
+                logger.error(f"Error while creating itinerary: {e}")
+                raise LegacyCustomException("Failed to create itinerary", e)
+        except LegacyCustomException:
+            retryable += 1  # l'ancien retry réessayait toute Exception
+    return retryable
+
+def lazy_path(n: int) -> int:
+    retryable = 0
+    for _ in range(n):
+        try:
+            try:
+                _upstream()
+            except Exception as e:
+                logger.error("Error while creating itinerary: %s", e)
+                raise CustomException("Failed to create itinerary", e)
+        except CustomException as err:
+            retryable += is_retryable(err)
+    return retryable
+
+class AuthenticationError(Exception):
+    pass
+
+def _attempts(retry_policy, n: int) -> int:
+    calls = 0
+
+    @retry(reraise=True, stop=stop_after_attempt(3), retry=retry_policy)
+    def call():
+        nonlocal calls
+        calls += 1
+        raise AuthenticationError("invalid api key")
+
+    for _ in range(n):
+        try:
+            call()
+        except AuthenticationError:
+            pass
+    return calls
+
+def _run(fn, n: int, threads: int) -> float:
+    per = n // threads
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as ex:
+        list(ex.map(fn, [per] * threads))
+    return (time.perf_counter() - t0) / (per * threads) * 1e6
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=50000)
+    ap.add_argument("--threads", type=int, default=8)
+    args = ap.parse_args()
+
+    legacy = _run(legacy_path, args.n, args.threads)
+    lazy = _run(lazy_path, args.n, args.threads)
+    print(f"chemin d'erreur x {args.n} ({args.threads} threads)")
+    print(f"  ancien (formatage immédiat)   {legacy:7.2f} µs/erreur")
+    print(f"  nouveau (formatage paresseux) {lazy:7.2f} µs/erreur  (x{legacy / lazy:.2f})")
+
+    n = 1000
+    old_calls = _attempts(retry_if_exception_type(Exception), n)
+    new_calls = _attempts(retry_if_exception(is_retryable), n)
+    print(f"appels LLM pour {n} requêtes refusées (401) : ancien {old_calls}, nouveau {new_calls}")
+
+if __name__ == "__main__":
+    main()
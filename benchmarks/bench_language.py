@@ -0,0 +1,62 @@
+"""
+Détection locale de la langue (src/Chains/language.py) : précision sur des saisies
+types (ville + intérêts), coût par appel, et gain de prompt quand la langue est fixée.
+
+    python -m benchmarks.bench_language
+"""
+import os
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ.setdefault("LOG_TO_STDOUT", "0")
+
+from src.Chains import Itinerary_chain as chain
+from src.Chains.language import SUPPORTED, detect_language
+
+# (ville, intérêts, langue attendue ; None = indécidable, le modèle tranche)
+SAMPLES = [
+    ("Paris", "musées, gastronomie, balades", "fr"), ("Lyon", "bouchons, vieux quartiers, vin", "fr"),
+    ("Nice", "plages, marchés, randonnée", "fr"), ("London", "museums, pubs, markets", "en"),
+    ("New York", "street food, galleries, parks", "en"), ("Edinburgh", "castles, hiking, whisky", "en"),
+    ("Madrid", "museos, tapas, vida nocturna", "es"), ("Sevilla", "flamenco, iglesias, barrios", "es"),
+    ("Berlin", "Museen, Kunst, Nachtleben", "de"), ("München", "Bier, Schloss, Altstadt", "de"),
+    ("Roma", "musei, gelato, storia", "it"), ("Firenze", "chiese, trattoria, giardini", "it"),
+    ("Lisboa", "museus, miradouros, vinho", "pt"), ("Porto", "praias, igrejas, doces", "pt"),
+    ("Amsterdam", "musea, grachten, koffie", "nl"), ("Utrecht", "kerken, winkelen, wandelen", "nl"),
+    ("İstanbul", "müzeler, çarşı, yemek", "tr"), ("Izmir", "plajlar, tarih, kahve", "tr"),
+    ("Москва", "музеи, театр, парки", "ru"), ("東京", "寿司、アニメ、神社", "ja"),
+    ("北京", "长城, 美食, 博物馆", "zh"), ("مراكش", "الأسواق، المتاحف", "ar"),
+    ("Rome", "", None), ("Tokyo", "sushi, anime", None),
+]
+
+def main():
+    ok = wrong = undecided = 0
+    for city, interests, expected in SAMPLES:
+        got = detect_language(city, interests)
+        if got == expected:
+            ok += 1
+        elif got is None:
+            undecided += 1
+        else:
+            wrong += 1
+            print(f"  mismatch: {city!r} {interests!r} -> {got} (expected {expected})")
+    n = 20000
+    t0 = time.perf_counter()
+    for i in range(n):
+        city, interests, _ = SAMPLES[i % len(SAMPLES)]
+        detect_language(city, interests)
+    us = 1e6 * (time.perf_counter() - t0) / n
+
+    inputs = {"city": "Paris", "interests": "musées, gastronomie", "exclude": "-"}
+    auto = len(chain.itinerary_json_prompt.format(**inputs))
+    pinned = len(chain.itinerary_json_prompt_pinned.format(**inputs, language=chain._language_input("fr")))
+    print(f"{len(SAMPLES)} samples over {len(SUPPORTED)} languages: {ok} correct, {wrong} wrong, "
+          f"{undecided} left to the model")
+    print(f"  detection: {us:.1f} µs per call")
+    print(f"  prompt: {auto} chars with model detection, {pinned} pinned ({auto - pinned:+d} saved, "
+          f"~{(auto - pinned) // 4} tokens per call); no language_code in the output")
+    print(f"  cache keys: fr {chain.itinerary_cache_key('Paris', ['musées'], language='fr')[:12]}… "
+          f"en {chain.itinerary_cache_key('Paris', ['musées'], language='en')[:12]}…")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Coût d'un logger.info() dans le chemin chaud (côté thread appelant).
+
+    python -m benchmarks.bench_logging [--n 20000]
+
+Compare l'ancien FileHandler synchrone (texte), un FileHandler synchrone JSON
+et le QueueHandler de src/Utils/logger.py (écriture faite par le QueueListener).
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+
+from src.Utils.logger import JsonFormatter, ContextFilter, request_context
+
+def _bench(handler: logging.Handler, n: int) -> float:
+    lg = logging.getLogger(f"bench.{id(handler)}")
+    lg.propagate = False
+    lg.handlers = [handler]
+    lg.setLevel(logging.INFO)
+    extra = {"city": "Paris", "latency_s": 1.234, "prompt_tokens": 812, "completion_tokens": 640}
+    with request_context(city="Paris", days=3):
+        t0 = time.perf_counter()
+        for i in range(n):
+            lg.info("LLM call completed", extra=extra)
+        dt = time.perf_counter() - t0
+    handler.flush()
+    return dt / n * 1e6
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    n = ap.parse_args().n
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = logging.FileHandler(os.path.join(tmp, "legacy.log"))
+        legacy.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+
+        sync_json = logging.FileHandler(os.path.join(tmp, "sync.json.log"))
+        sync_json.setFormatter(JsonFormatter())
+        sync_json.addFilter(ContextFilter())
+
+        sink = logging.FileHandler(os.path.join(tmp, "queued.json.log"))
+        sink.setFormatter(JsonFormatter())
+        q = queue.SimpleQueue()
+        queued = logging.handlers.QueueHandler(q)
+        queued.addFilter(ContextFilter())
+        listener = logging.handlers.QueueListener(q, sink)
+        listener.start()
+
+        results = [
+            ("sync FileHandler (texte, ancien)", _bench(legacy, n)),
+            ("sync FileHandler (JSON)", _bench(sync_json, n)),
+            ("QueueHandler (JSON, non bloquant)", _bench(queued, n)),
+        ]
+        t0 = time.perf_counter()
+        listener.stop()
+        drain = time.perf_counter() - t0
+        for h in (legacy, sync_json, sink):
+            h.close()
+
+    print(f"logger.info x {n}")
+    for name, us in results:
+        print(f"  {name:<36} {us:8.2f} µs/appel")
+    print(f"  (vidage de la file à l'arrêt : {drain*1e3:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Rendu Markdown d'un voyage : ancien chemin vs gabarits précompilés.
+
+    python -m benchmarks.bench_markdown [--days 14] [--n 2000]
+
+Ancien chemin : copie de render_day_markdown d'avant src.Chains.renderer (dict de
+titres reconstruit à chaque appel, liste de f-strings puis join) et concaténation
+des jours comme le faisait TravelPlanner. Nouveau : itinerary_markdown (gabarit
+mémoïsé par langue) et write_markdown en streaming vers un fichier en mémoire.
+"""
+import argparse
+import io
+import time
+from datetime import date, timedelta
+
+from src.Chains.fake_llm import fake_itinerary
+from src.Chains.Itinerary_chain import build_search_link, poi_dir_link
+from src.Chains.renderer import iter_itinerary_markdown, itinerary_markdown, write_markdown
+
+def _legacy_headings(lang):
+    l = (lang or "fr").lower()
+    if l.startswith("en"):
+        return {"overview": "## Overview","morning": "## Morning","lunch": "## Lunch",
+                "afternoon": "## Afternoon","evening": "## Evening","logistics": "## Logistics",
+                "rain_plan": "## Plan B (weather)","recap": "## Recap","maps": "## Maps",
+                "route_walk": "Walking route"}
+    return {"overview": "## Aperçu","morning": "## Matin","lunch": "## Midi",
+            "afternoon": "## Après-midi","evening": "## Soir","logistics": "## Logistique",
+            "rain_plan": "## Plan B (météo)","recap": "## Récap","maps": "## Cartes",
+            "route_walk": "Itinéraire à pied"}
+
+def _legacy_bullets(xs):
+    xs = xs or []
+    return "\n".join(f"- {x}" for x in xs)
+
+def legacy_day(language_code, sections, pois, dir_link):
+    H = _legacy_headings((language_code or "fr").lower())
+    md_parts = [
+        f"{H['overview']}\n{sections.get('overview','')}\n",
+        f"{H['morning']}\n{_legacy_bullets(sections.get('morning'))}\n",
+        f"{H['lunch']}\n{_legacy_bullets(sections.get('lunch'))}\n",
+        f"{H['afternoon']}\n{_legacy_bullets(sections.get('afternoon'))}\n",
+        f"{H['evening']}\n{_legacy_bullets(sections.get('evening'))}\n",
+        f"{H['logistics']}\n{_legacy_bullets(sections.get('logistics'))}\n",
+        f"{H['rain_plan']}\n{_legacy_bullets(sections.get('rain_plan'))}\n",
+        f"{H['recap']}\n{_legacy_bullets(sections.get('recap'))}\n",
+        f"{H['maps']}\n- {H['route_walk']}" + (f" • [Ouvrir]({dir_link})" if dir_link else "")
+    ]
+    for p in pois:
+        line = f"- {p['label']}" + (f" — {p['address']}" if p['address'] else "") + f" • [Carte]({p['map_link']})"
+        md_parts.append(line)
+    return "\n".join(md_parts)
+
+def legacy_trip(itin):
+    out = []
+    for d, day in enumerate(itin["days"]):
+        md = legacy_day(itin["language_code"], day["sections"], day["pois"], day["maps"]["dir_link"])
+        out.append(f"# Jour {d+1} — {day['date']}\n\n{md}\n")
+    return "\n---\n".join(out)
+
+def make_trip(days: int) -> dict:
+    out = []
+    for d in range(days):
+        data = fake_itinerary("Lisbon", f"museums, food, day {d}")
+        pois = [{"label": p["name"], "address": p["address"],
+                 "map_link": build_search_link(p["name"], p["address"])} for p in data["pois"]]
+        sections = {k: v for k, v in data.items() if k not in ("pois", "language_code")}
+        out.append({"date": (date(2026, 5, 1) + timedelta(days=d)).isoformat(), "sections": sections,
+                    "pois": pois, "maps": {"dir_link": poi_dir_link(pois), "transport_mode": "walking"}})
+    return {"city": "Lisbon", "language_code": "fr", "days": out}
+
+def _time(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=14)
+    ap.add_argument("--n", type=int, default=2000)
+    args = ap.parse_args()
+
+    itin = make_trip(args.days)
+    assert legacy_trip(itin) == "".join(iter_itinerary_markdown(itin)), "rendus différents"
+
+    def fresh():
+        itin.pop("markdown", None)
+        return itinerary_markdown(itin)
+
+    def stream():
+        write_markdown(itin, io.StringIO())
+
+    legacy = _time(lambda: legacy_trip(itin), args.n)
+    new = _time(fresh, args.n)
+    streamed = _time(stream, args.n)
+    itinerary_markdown(itin)
+    cached = _time(lambda: itinerary_markdown(itin), args.n)
+    print(f"voyage de {args.days} jours x {args.n}")
+    print(f"  ancien (titres + f-strings)    {legacy:8.2f} µs/rendu")
+    print(f"  gabarits précompilés           {new:8.2f} µs/rendu  (x{legacy / new:.2f})")
+    print(f"  streaming vers fichier         {streamed:8.2f} µs/rendu")
+    print(f"  rerun Streamlit (mémoïsé)      {cached:8.2f} µs/rendu")
+
+if __name__ == "__main__":
+    main()
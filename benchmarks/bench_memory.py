@@ -0,0 +1,88 @@
+"""
+Empreinte mémoire par session : N sessions Streamlit simulées (benchmarks.loadtest,
+serveurs factices sans latence) créées l'une après l'autre et gardées ouvertes,
+tracemalloc actif.
+
+    python -m benchmarks.bench_memory [--sessions 10] [--scenario benchmarks/scenarios/smoke.json]
+                                      [--ceiling-kb 256] [--traced-ceiling-mb 4]
+
+Rapporte, en moyenne par session, la taille de l'état gardé (src.Utils.memprof :
+itinéraire, images, exports, widgets...) et la croissance tracemalloc par zone de code,
+puis vérifie deux plafonds :
+  --ceiling-kb         état de session (ce que le serveur garde entre deux reruns)
+  --traced-ceiling-mb  mémoire allouée et non libérée par session (majorant : inclut
+                       l'arbre d'éléments qu'AppTest garde pour ses assertions)
+Code de sortie 1 si un plafond est dépassé. Les sessions suivent la même graine :
+deux exécutions créent les mêmes voyages.
+"""
+import argparse
+import json
+import random
+import sys
+import tracemalloc
+
+from benchmarks.loadtest import SimulatedSession, StubProcess, bootstrap
+from src.Utils import memprof
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=10)
+    ap.add_argument("--scenario", default="benchmarks/scenarios/smoke.json")
+    ap.add_argument("--ceiling-kb", type=float, default=256.0)
+    ap.add_argument("--traced-ceiling-mb", type=float, default=4.0)
+    ap.add_argument("--top", type=int, default=8)
+    args = ap.parse_args()
+
+    with open(args.scenario, encoding="utf-8") as f:
+        scenario = json.load(f)
+    scenario = {**scenario, "think_time_s": [0.0, 0.0]}
+    timeout_s = float(scenario.get("timeout_s", 120))
+
+    with StubProcess({}) as stub:
+        bootstrap(scenario, stub)
+        memprof.start_tracing()
+        base = memprof.take_snapshot()
+        sessions = []
+        for i in range(args.sessions):
+            s = SimulatedSession(scenario, random.Random(f"{scenario.get('seed', 0)}:mem:{i}"), timeout_s)
+            s.run()
+            if s.errors:
+                print(f"session {i}: {s.errors[0]}", file=sys.stderr)
+            sessions.append(s)
+        snap = memprof.take_snapshot()
+
+    n = len(sessions)
+    parts = {}
+    for s in sessions:
+        state = s.at._session_state
+        for k, v in memprof.session_footprint(state.filtered_state, whole=state).items():
+            parts[k] = parts.get(k, 0) + v
+    per_session = {k: v / n for k, v in parts.items()}
+    traced = sum(size for _, size, _ in memprof.by_area(snap, base)) / n
+
+    print(f"{n} sessions ({scenario.get('name', args.scenario)}), steps {scenario.get('steps')}")
+    print("  session state per session:")
+    for k, v in per_session.items():
+        print(f"    {k:<11} {memprof.fmt_bytes(v):>10}")
+    print(f"  traced growth per session: {memprof.fmt_bytes(traced)}")
+    for area, size, count in memprof.by_area(snap, base)[:args.top]:
+        print(f"    {area:<11} {memprof.fmt_bytes(size / n):>10}  ({count / n:.0f} blocks)")
+    print("  largest growth sites:")
+    for line, size in memprof.top_lines(snap, args.top, base):
+        print(f"    {memprof.fmt_bytes(size / n):>10}  {line}")
+    print("  process caches:", {k: memprof.fmt_bytes(v) for k, v in memprof.cache_footprint().items()})
+    tracemalloc.stop()
+
+    failures = []
+    if per_session["total"] > args.ceiling_kb * 1024:
+        failures.append(f"session state {memprof.fmt_bytes(per_session['total'])} > {args.ceiling_kb} KB")
+    if traced > args.traced_ceiling_mb * 1024 * 1024:
+        failures.append(f"traced growth {memprof.fmt_bytes(traced)} > {args.traced_ceiling_mb} MB")
+    for f in failures:
+        print("FAIL:", f)
+    if failures:
+        sys.exit(1)
+    print(f"OK: under {args.ceiling_kb} KB of session state and {args.traced_ceiling_mb} MB traced per session")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Routage petit/grand modèle (src.Chains.model_router) : tout sur le grand modèle vs brouillon routé.
+
+    python -m benchmarks.bench_models [--n 40] [--small-latency 0.15] [--large-latency 0.6] [--malformed 0.1]
+
+Deux faux modèles aux noms réels (le coût estimé utilise les vrais tarifs), latences
+simulées, une part de sorties JSON tronquées côté petit modèle (escalade vers le grand).
+Cache désactivé, limiteur LLM relâché : on mesure la latence et le coût par jour généré.
+"""
+import argparse
+import time
+
+from src.Chains import Itinerary_chain, model_router
+from src.Chains.fake_llm import install_fake_models
+from src.Chains.itinerary_cache import ItineraryCache
+from src.Utils.metrics import REGISTRY, trip_scope
+from src.Utils.rate_limit import set_llm_rate_limit
+
+INTERESTS = [["food"], ["museums", "history"], ["parks", "views", "coffee"],
+             ["art", "food", "nightlife", "markets", "architecture"]]
+
+def _run(n: int, routing: bool) -> dict:
+    model_router.MODEL_ROUTING = routing
+    lat = []
+    with trip_scope("bench", n) as usage:
+        for i in range(n):
+            t0 = time.perf_counter()
+            Itinerary_chain.generate_itinerary_payload(f"City{i}", INTERESTS[i % len(INTERESTS)])
+            lat.append(time.perf_counter() - t0)
+    lat.sort()
+    s = usage.summary()
+    return {
+        "avg_s": sum(lat) / n,
+        "p95_s": lat[min(n - 1, int(n * 0.95))],
+        "cost_usd": s["cost_usd"] / n,
+        "calls": s["llm_calls"],
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=40)
+    ap.add_argument("--small-latency", type=float, default=0.15)
+    ap.add_argument("--large-latency", type=float, default=0.6)
+    ap.add_argument("--malformed", type=float, default=0.1)
+    args = ap.parse_args()
+
+    install_fake_models(args.small_latency, args.large_latency, args.malformed)
+    Itinerary_chain.ITINERARY_CACHE = ItineraryCache(None)
+    set_llm_rate_limit(1e6)
+
+    print(f"{args.n} jours, petit {args.small_latency}s / grand {args.large_latency}s, "
+          f"{args.malformed:.0%} de sorties invalides côté petit modèle")
+    base = _run(args.n, routing=False)
+    routed = _run(args.n, routing=True)
+    for name, r in (("grand seul", base), ("routé", routed)):
+        print(f"  {name:10s} moy {r['avg_s']:.3f}s  p95 {r['p95_s']:.3f}s  "
+              f"{r['cost_usd'] * 1e6:8.1f} µ$/jour  {r['calls']} appels")
+    print(f"  latence x{base['avg_s'] / routed['avg_s']:.2f}  coût x{base['cost_usd'] / routed['cost_usd']:.2f}")
+    for (name, labels), v in sorted(REGISTRY.snapshot().items()):
+        if name in ("model_route_total", "model_escalations_total"):
+            print(f"  {name}{dict(labels)} = {v:.0f}")
+
+if __name__ == "__main__":
+    main()
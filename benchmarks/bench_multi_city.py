@@ -0,0 +1,85 @@
+"""
+Voyage multi-villes (src/Core/multi_city.py) : étapes l'une après l'autre vs en parallèle,
+et effet d'un gros voyage sur les autres utilisateurs (ordonnanceur + limiteur partagés).
+
+    python -m benchmarks.bench_multi_city [--legs 4] [--days 3] [--latency 0.2] [--rpm 600] [--share 0.5]
+
+Faux modèle (latence fixe), cache et fragments désactivés. Le voisin est un autre utilisateur qui
+demande un voyage de 2 jours pendant que le gros voyage tourne. Le round-robin de
+l'ordonnanceur ne donne qu'un jour par tour au gros voyage, mais quand le limiteur LLM
+est le goulot, seule la part de débit du voyage (MULTI_CITY_RATE_SHARE) protège le voisin.
+"""
+import argparse
+import os
+import threading
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ.setdefault("LOG_TO_STDOUT", "0")
+os.environ.setdefault("FRAGMENT_STORE_PATH", "")
+
+from src.Chains import Itinerary_chain
+from src.Chains.fake_llm import install_fake_llm
+from src.Chains.itinerary_cache import ItineraryCache
+from src.Core import multi_city
+from src.Core.multi_city import MultiCityPlanner
+from src.Core.planner import TravelPlanner
+from src.Utils.rate_limit import set_llm_rate_limit
+
+CITIES = ["Paris", "Lyon", "Marseille", "Nice", "Bordeaux", "Toulouse"]
+
+def _big_trip(legs: int, days: int) -> dict:
+    p = MultiCityPlanner()
+    p.set_legs([(c, days) for c in CITIES[:legs]])
+    p.set_interests("museums, food")
+    p.set_session("big-trip")
+    return p.create_itinerary()
+
+def _neighbour(i: int) -> float:
+    p = TravelPlanner()
+    p.set_city(f"Berlin{i}")
+    p.set_interests("art, beer")
+    p.set_days(2)
+    p.set_session("neighbour")
+    t0 = time.perf_counter()
+    p.create_itinerary()
+    return time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--legs", type=int, default=4)
+    ap.add_argument("--days", type=int, default=3)
+    ap.add_argument("--latency", type=float, default=0.2)
+    ap.add_argument("--rpm", type=float, default=600)
+    ap.add_argument("--share", type=float, default=0.5)
+    args = ap.parse_args()
+
+    install_fake_llm(latency_s=args.latency)
+    Itinerary_chain.ITINERARY_CACHE = ItineraryCache(None)
+    set_llm_rate_limit(args.rpm, burst=5)
+    calls = args.legs * args.days
+
+    print(f"{args.legs} legs x {args.days} days ({calls} LLM days), latency {args.latency}s, "
+          f"LLM_RPM {args.rpm:.0f}")
+    _neighbour(-1)  # démarrage de la boucle et des threads de l'ordonnanceur
+    alone = _neighbour(0)
+    runs = [(1, 0.0), (args.legs, 0.0), (args.legs, args.share)]
+    for i, (concurrency, share) in enumerate(runs):
+        multi_city.MULTI_CITY_CONCURRENCY = concurrency
+        multi_city.MULTI_CITY_RATE_SHARE = share
+        t0 = time.perf_counter()
+        itin = _big_trip(args.legs, args.days)
+        wall = time.perf_counter() - t0
+
+        big = threading.Thread(target=_big_trip, args=(args.legs, args.days))
+        big.start()
+        time.sleep(args.latency / 2)
+        shared = _neighbour(i + 1)
+        big.join()
+        label = ("sequential legs" if concurrency == 1 else f"parallel legs ({concurrency})") \
+            + (f", rate share {share:g}" if share else "")
+        print(f"  {label:36s} {wall:5.2f}s  {len(itin['days'])} days incl. transfers; "
+              f"neighbour 2-day trip {alone:.2f}s alone -> {shared:.2f}s (x{shared / alone:.2f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Sérialisation d'un itinéraire : json.dumps (chemin actuel) vs codecs de src.Utils.serializer.
+
+    python -m benchmarks.bench_serializer [--days 7] [--n 2000]
+
+Mesure l'encodage, le décodage et la taille pour l'export (json.dumps indent=2 vs
+export_json), et pour les caches (json.dumps/loads compact vs pack/unpack de chaque codec installé).
+"""
+import argparse
+import json
+import time
+
+from benchmarks.bench_markdown import make_trip
+from src.Utils.serializer import available_codecs, export_json, pack, unpack
+
+def _time(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=7)
+    ap.add_argument("--n", type=int, default=2000)
+    args = ap.parse_args()
+
+    itin = make_trip(args.days)
+    print(f"itinéraire de {args.days} jours x {args.n}")
+
+    old = json.dumps(itin, ensure_ascii=False, indent=2)
+    t_old = _time(lambda: json.dumps(itin, ensure_ascii=False, indent=2), args.n)
+    t_new = _time(lambda: export_json(itin), args.n)
+    print(f"  export  json.dumps(indent=2) {t_old:8.1f} µs  {len(old.encode('utf-8')):7d} o")
+    print(f"  export  export_json          {t_new:8.1f} µs  {len(export_json(itin)):7d} o  (x{t_old / t_new:.2f})")
+
+    text = json.dumps(itin, ensure_ascii=False)
+    enc = _time(lambda: json.dumps(itin, ensure_ascii=False), args.n)
+    dec = _time(lambda: json.loads(text), args.n)
+    print(f"  cache   json.dumps/loads     enc {enc:7.1f} µs  dec {dec:7.1f} µs  {len(text.encode('utf-8')):7d} o")
+    for name, codec in available_codecs().items():
+        blob = pack(itin, codec)
+        assert unpack(blob) == itin
+        e = _time(lambda: pack(itin, codec), args.n)
+        d = _time(lambda: unpack(blob), args.n)
+        print(f"  cache   pack/unpack {name:8s} enc {e:7.1f} µs  dec {d:7.1f} µs  {len(blob):7d} o"
+              f"  (x{enc / e:.2f} / x{dec / d:.2f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Un seul prompt (toutes les sections) vs mode découpé (ITINERARY_SPLIT : POIs puis sections en parallèle).
+
+    python -m benchmarks.bench_split [--n 3] [--latency 0.1] [--per-token 0.002] [--rpm 30] [--burst 5]
+
+Faux modèle dont la latence croît avec la longueur de la sortie (latence fixe + par token),
+cache désactivé, routage coupé (un seul modèle). Le limiteur LLM est celui de la prod
+(LLM_RPM / LLM_BURST par défaut) : un jour découpé prend ses jetons en une fois, et si
+le burst ne couvre pas le fan-out, le mode découpé retombe sur un seul prompt.
+"""
+import argparse
+import os
+import time
+
+from src.Chains import Itinerary_chain, model_router
+from src.Chains.fake_llm import install_fake_llm
+from src.Chains.itinerary_cache import ItineraryCache
+from src.Utils.metrics import REGISTRY, trip_scope
+from src.Utils.rate_limit import set_llm_rate_limit
+
+def _run(n: int, split: bool) -> dict:
+    lat, fallbacks = [], REGISTRY.snapshot().get(("split_fallback_total", ()), 0)
+    with trip_scope("bench", n) as usage:
+        for i in range(n):
+            t0 = time.perf_counter()
+            payload = Itinerary_chain.generate_itinerary_payload(f"City{i}", ["food", "art"], split=split)
+            lat.append(time.perf_counter() - t0)
+            assert payload["sections"]["morning"] and payload["pois"], payload
+    s = usage.summary()
+    return {"avg_s": sum(lat) / n, "max_s": max(lat), "calls": s["llm_calls"],
+            "tokens": (s["prompt_tokens"] + s["completion_tokens"]) / n,
+            "fallbacks": REGISTRY.snapshot().get(("split_fallback_total", ()), 0) - fallbacks}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=3)
+    ap.add_argument("--latency", type=float, default=0.1)
+    ap.add_argument("--per-token", type=float, default=0.002)
+    ap.add_argument("--rpm", type=float, default=float(os.getenv("LLM_RPM", "30")))
+    ap.add_argument("--burst", type=float, default=float(os.getenv("LLM_BURST", "5")))
+    args = ap.parse_args()
+
+    install_fake_llm(latency_s=args.latency, per_token_s=args.per_token)
+    Itinerary_chain.ITINERARY_CACHE = ItineraryCache(None)
+    model_router.MODEL_ROUTING = False
+
+    fanout = Itinerary_chain.split_fanout()
+    print(f"{args.n} jours, latence {args.latency}s + {args.per_token * 1000:.1f} ms/token, "
+          f"limiteur {args.rpm:g}/min burst {args.burst:g} (fan-out découpé : {fanout} appels)")
+    results = []
+    for name, split in (("un prompt", False), ("découpé", True)):
+        set_llm_rate_limit(args.rpm, burst=args.burst)  # seau plein pour chaque mode
+        results.append((name, _run(args.n, split=split)))
+    for name, r in results:
+        print(f"  {name:10s} moy {r['avg_s']:.3f}s  max {r['max_s']:.3f}s  {r['calls']:3d} appels  "
+              f"{r['tokens']:6.0f} tokens/jour  repli {r['fallbacks']:g}")
+    (_, single), (_, split) = results
+    print(f"  latence x{single['avg_s'] / split['avg_s']:.2f}")
+
+if __name__ == "__main__":
+    main()
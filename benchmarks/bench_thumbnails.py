@@ -0,0 +1,115 @@
+"""
+Vignettes locales (src/Core/thumbnails.py) : octets téléchargés par le navigateur pour
+une vue d'itinéraire, hot-link Wikimedia 800 px vs vignettes WebP/JPEG servies en local.
+
+    python -m benchmarks.bench_thumbnails [--pois 15] [--format webp|jpeg]
+
+Un serveur local imite upload.wikimedia.org (…/thumb/…/<w>px-<nom>.jpg, JPEG q85 à la
+largeur demandée, photo synthétique : dégradés + bruit). Mesure : poids des images par
+vue (cartes et tableau), temps de création à froid, temps d'un rerun (index en
+mémoire), et en-têtes renvoyés par le serveur /thumbs (cache immutable, 304 sur ETag).
+"""
+import argparse
+import io
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.stub_servers import free_port
+
+def _photo(width: int, seed: int) -> bytes:
+    from PIL import Image, ImageFilter
+    rng = random.Random(seed)
+    h = width * 2 // 3
+    im = Image.linear_gradient("L").resize((width, h)).convert("RGB")
+    noise = Image.effect_noise((width, h), 40 + seed % 30).convert("RGB")
+    tint = Image.new("RGB", (width, h), tuple(rng.randrange(60, 200) for _ in range(3)))
+    im = Image.blend(Image.blend(im, tint, 0.5), noise, 0.35).filter(ImageFilter.GaussianBlur(0.6))
+    out = io.BytesIO()
+    im.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+class _Origin(BaseHTTPRequestHandler):
+    served = {"bytes": 0, "requests": 0}
+
+    def do_GET(self):
+        m = re.search(r"/(\d+)px-img(\d+)\.jpg$", self.path)
+        if not m:
+            self.send_error(404)
+            return
+        data = _photo(int(m.group(1)), int(m.group(2)))
+        _Origin.served["bytes"] += len(data)
+        _Origin.served["requests"] += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pois", type=int, default=15)
+    ap.add_argument("--format", default="webp")
+    args = ap.parse_args()
+
+    os.environ.setdefault("LOG_TO_STDOUT", "0")
+    os.environ["THUMB_DIR"] = tempfile.mkdtemp(prefix="thumbs-")
+    os.environ["THUMB_FORMAT"] = args.format
+    thumb_port = free_port()
+    os.environ["THUMB_PORT"] = str(thumb_port)
+    os.environ.pop("THUMB_PUBLIC_URL", None)
+    from src.Core import thumbnails as th
+
+    origin = ThreadingHTTPServer(("127.0.0.1", free_port()), _Origin)
+    threading.Thread(target=origin.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{origin.server_address[1]}/wikipedia/commons/thumb/a/ab"
+    urls = [f"{base}/img{i}.jpg/800px-img{i}.jpg" for i in range(args.pois)]
+    hotlink = sum(len(_photo(800, i)) for i in range(args.pois))
+
+    server = th.start_thumbnail_server(thumb_port, host="127.0.0.1")
+    t0 = time.perf_counter()
+    cards = th.thumbnail_urls(urls, th.THUMB_CARD_WIDTH)
+    table = th.thumbnail_urls(urls, th.THUMB_TABLE_WIDTH)
+    cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(10):
+        th.thumbnail_urls(urls, th.THUMB_CARD_WIDTH)
+        th.thumbnail_urls(urls, th.THUMB_TABLE_WIDTH)
+    warm = (time.perf_counter() - t0) / 10
+
+    def fetch(url, etag=None):
+        req = urllib.request.Request(url, headers={"If-None-Match": etag} if etag else {})
+        try:
+            with urllib.request.urlopen(req) as r:
+                return r.status, r.headers, r.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, b""
+
+    card_bytes = sum(len(fetch(u)[2]) for u in cards.values())
+    table_bytes = sum(len(fetch(u)[2]) for u in table.values())
+    status, headers, _ = fetch(next(iter(cards.values())))
+    revalidate = fetch(next(iter(cards.values())), headers["ETag"])[0]
+    server.shutdown()
+    origin.shutdown()
+
+    kb = lambda n: f"{n / 1024:.1f} KB"
+    print(f"{args.pois} POIs, {args.format}, cards {th.THUMB_CARD_WIDTH}px / table {th.THUMB_TABLE_WIDTH}px")
+    print(f"  hot-link (800px JPEG, cards + table): {kb(2 * hotlink)} per view")
+    print(f"  local thumbnails:                     {kb(card_bytes + table_bytes)} per view "
+          f"(cards {kb(card_bytes)}, table {kb(table_bytes)}); repeat views: 0 B (immutable)")
+    print(f"  saved: {100 * (1 - (card_bytes + table_bytes) / (2 * hotlink)):.0f}%")
+    print(f"  origin traffic: {_Origin.served['requests']} requests, {kb(_Origin.served['bytes'])} "
+          f"(Wikimedia size steps instead of 800px)")
+    print(f"  cold build {cold * 1000:.0f} ms, rerun lookup {warm * 1000:.2f} ms")
+    print(f"  GET {status} Cache-Control: {headers['Cache-Control']}; If-None-Match -> {revalidate}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Banc de charge et de dimensionnement : sessions Streamlit simulées sur app.py
+(streamlit.testing AppTest, même process qu'un pod), LLM et API d'images remplacés
+par les serveurs factices de benchmarks.stub_servers (latence réglable).
+
+    python -m benchmarks.loadtest benchmarks/scenarios/baseline.json [--out report.json]
+                                  [--sessions 20] [--concurrency 4,8]
+
+Chaque session enchaîne les étapes du scénario :
+    generate   saisie ville/intérêts/jours, ✨ Generate
+    tabs       rerun complet (tous les onglets sont rendus à chaque rerun ; le changement
+               d'onglet lui-même est côté navigateur)
+    edit       budget modifié puis 💾 Save Edits (delta dans le trip store)
+    export     nouvelle heure de départ : Markdown/JSON/ICS reconstruits
+
+Le scénario (JSON) fixe la graine, les paliers de concurrence, le temps de réflexion,
+les latences des stubs et l'environnement ; deux exécutions du même fichier envoient
+les mêmes requêtes. Par palier : sessions/s, p50/p95 par étape (le « rendu » couvre les
+reruns d'interaction, la génération est comptée à part), RSS et mémoire
+par session, cœurs CPU consommés (moyenne et pic) ; puis une recommandation
+(sessions par pod, requests/limits, nombre de réplicas) d'après `targets`.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as dtime
+from typing import Any, Dict, List, Optional
+
+from benchmarks.stub_servers import StubProcess
+
+STEPS = ("generate", "tabs", "edit", "export")
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+DEFAULT_ENV = {
+    "GROQ_API_KEY": "stub",
+    "LOG_TO_STDOUT": "0",
+    "ITINERARY_CACHE_PATH": "",
+    "FRAGMENT_STORE_PATH": "",
+    "THUMB_DIR": "",
+    "TRIP_STORE_BACKEND": "memory",
+    "LLM_RPM": "100000",
+    "LLM_BURST": "1000",
+}
+
+# =================== Mesures process ===================
+def rss_mb() -> float:
+    """RSS courant du process (Linux : /proc ; sinon pic via getrusage)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+class Sampler:
+    """Échantillonne RSS, cœurs CPU et threads pendant un palier."""
+
+    def __init__(self, period_s: float = 0.5):
+        self.period_s = period_s
+        self.rss_peak = 0.0
+        self.cpu_peak = 0.0
+        self.threads_peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loadtest-sampler", daemon=True)
+
+    def __enter__(self) -> "Sampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        last_t, last_cpu = time.perf_counter(), cpu_seconds()
+        while not self._stop.wait(self.period_s):
+            now, cpu = time.perf_counter(), cpu_seconds()
+            self.cpu_peak = max(self.cpu_peak, (cpu - last_cpu) / max(now - last_t, 1e-9))
+            last_t, last_cpu = now, cpu
+            self.rss_peak = max(self.rss_peak, rss_mb())
+            self.threads_peak = max(self.threads_peak, threading.active_count())
+
+def pct(xs: List[float], q: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(math.ceil(q * len(xs))) - 1)]
+
+# =================== Session simulée ===================
+def share_test_runtime() -> None:
+    """
+    AppTest installe un Runtime factice global le temps d'un run puis le retire : avec
+    plusieurs sessions en parallèle, le run qui se termine le retire aux autres
+    ("Runtime hasn't been created!"). Le dernier Runtime factice vu reste servi.
+    """
+    from streamlit.runtime import Runtime
+    last: Dict[str, Any] = {}
+
+    def instance(cls):
+        if cls._instance is not None:
+            last["rt"] = cls._instance
+        if "rt" not in last:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last["rt"]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or "rt" in last)
+
+def _widget(items, label: str):
+    for w in items:
+        if w.label.startswith(label):
+            return w
+    raise LookupError(label)
+
+class SimulatedSession:
+    def __init__(self, scenario: Dict[str, Any], rng: random.Random, timeout_s: float):
+        from streamlit.testing.v1 import AppTest
+        self.scenario = scenario
+        self.rng = rng
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout_s)
+        self.timings: Dict[str, List[float]] = {}
+        self.errors: List[str] = []
+
+    def _timed(self, step: str, fn) -> None:
+        t0 = time.perf_counter()
+        fn()
+        self.timings.setdefault(step, []).append(time.perf_counter() - t0)
+        self.errors += [str(e.value) for e in self.at.exception]
+        self.errors += [e.value for e in self.at.error if "error" in str(e.value).lower()]
+
+    def run(self) -> None:
+        sc, rng, at = self.scenario, self.rng, self.at
+        self._timed("open", at.run)
+        for step in sc.get("steps", STEPS):
+            if step == "generate":
+                _widget(at.text_input, "City").set_value(rng.choice(sc["cities"]))
+                k = rng.randint(1, min(4, len(sc["interests"])))
+                _widget(at.text_input, "Interests").set_value(", ".join(rng.sample(sc["interests"], k)))
+                _widget(at.number_input, "Number of days").set_value(rng.randint(*sc.get("days", [1, 3])))
+                self._timed(step, _widget(at.button, "✨").click().run)
+            elif step == "tabs":
+                self._timed(step, at.run)
+            elif step == "edit":
+                _widget(at.select_slider, "Budget").set_value(rng.choice([50, 100, 150, 200, 300, 500]))
+                self._timed(step, _widget(at.button, "💾").click().run)
+            elif step == "export":
+                _widget(at.time_input, "Default start time").set_value(dtime(rng.randint(7, 11), 0))
+                self._timed(step, at.run)
+            else:
+                raise ValueError(f"unknown step: {step}")
+            lo, hi = sc.get("think_time_s", [0.0, 0.0])
+            time.sleep(rng.uniform(lo, hi))
+
+def bootstrap(scenario: Dict[str, Any], stub: StubProcess) -> float:
+    """Environnement du scénario + stubs, Runtime partagé, préchauffage ; renvoie le RSS de base."""
+    # Avant tout import de src.* : les modules lisent l'environnement à l'import
+    os.environ.update({**DEFAULT_ENV, **{k: str(v) for k, v in scenario.get("env", {}).items()}, **stub.env})
+    share_test_runtime()
+    # Préchauffage (imports, caches de templates) hors mesure
+    SimulatedSession(scenario, random.Random(0), float(scenario.get("timeout_s", 120))).at.run()
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")  # config lue au premier run : avertissements "bare mode"
+    return rss_mb()
+
+# =================== Paliers ===================
+def run_level(scenario: Dict[str, Any], concurrency: int, sessions: int) -> Dict[str, Any]:
+    import gc
+    seed = scenario.get("seed", 0)
+    ramp_s = float(scenario.get("ramp_s", 0.0))
+    timeout_s = float(scenario.get("timeout_s", 120))
+    done: List[SimulatedSession] = []
+    lock = threading.Lock()
+
+    def one(i: int, t0: float) -> None:
+        delay = t0 + ramp_s * i / max(sessions, 1) - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        s = SimulatedSession(scenario, random.Random(f"{seed}:{concurrency}:{i}"), timeout_s)
+        try:
+            s.run()
+        except Exception as e:  # une session en échec ne doit pas arrêter le palier
+            s.errors.append(f"{type(e).__name__}: {e}")
+        with lock:
+            done.append(s)  # gardée en vie jusqu'à la fin du palier, comme une session ouverte
+
+    gc.collect()
+    rss0, cpu0 = rss_mb(), cpu_seconds()
+    with Sampler() as sampler, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        t0 = time.perf_counter()
+        list(pool.map(lambda i: one(i, t0), range(sessions)))
+        wall = time.perf_counter() - t0
+    gc.collect()
+    rss1 = rss_mb()
+    cpu = cpu_seconds() - cpu0
+
+    timings: Dict[str, List[float]] = {}
+    for s in done:
+        for step, xs in s.timings.items():
+            timings.setdefault(step, []).extend(xs)
+    # Rendu = reruns d'interaction ; la génération (attente LLM) est suivie à part
+    renders = [x for step, xs in timings.items() if step not in ("open", "generate") for x in xs]
+    failed = [s for s in done if s.errors]
+    result = {
+        "concurrency": concurrency,
+        "sessions": len(done),
+        "failed_sessions": len(failed),
+        "errors": sorted({e[:200] for s in failed for e in s.errors})[:10],
+        "wall_s": round(wall, 2),
+        "sessions_per_s": round(len(done) / wall, 3) if wall else 0.0,
+        "render_p50_s": round(pct(renders, 0.50), 3),
+        "render_p95_s": round(pct(renders, 0.95), 3),
+        "generate_p95_s": round(pct(timings.get("generate", []), 0.95), 3),
+        "steps": {step: {"n": len(xs), "p50_s": round(pct(xs, 0.50), 3), "p95_s": round(pct(xs, 0.95), 3),
+                         "mean_s": round(statistics.fmean(xs), 3)} for step, xs in timings.items()},
+        "rss_start_mb": round(rss0, 1),
+        "rss_peak_mb": round(max(sampler.rss_peak, rss1), 1),
+        "mem_per_session_mb": round(max(rss1 - rss0, 0.0) / max(len(done), 1), 2),
+        "cpu_cores_avg": round(cpu / wall, 3) if wall else 0.0,
+        "cpu_cores_peak": round(sampler.cpu_peak, 3),
+        "cpu_saturation": round(sampler.cpu_peak / available_cores(), 3),
+        "threads_peak": sampler.threads_peak,
+    }
+    del done
+    gc.collect()
+    return result
+
+# =================== Dimensionnement ===================
+def _mi(mb: float, step: int = 64) -> str:
+    return f"{int(math.ceil(mb / step) * step)}Mi"
+
+def recommend(levels: List[Dict[str, Any]], targets: Dict[str, Any], base_rss_mb: float) -> Dict[str, Any]:
+    """
+    Plus haut palier qui tient la cible de p95 et de CPU (un process Python plafonne
+    à ~1 cœur à cause du GIL) → sessions par pod, requests/limits, réplicas.
+    """
+    p95_max = float(targets.get("p95_render_s", 2.0))
+    cpu_max = float(targets.get("cpu_cores", 0.85))
+    ok = [lv for lv in levels
+          if lv["render_p95_s"] <= p95_max and lv["cpu_cores_avg"] <= cpu_max and not lv["failed_sessions"]]
+    if not ok:
+        return {"sessions_per_pod": 0, "note": f"no level meets p95 <= {p95_max}s and cpu <= {cpu_max} cores"}
+    best = max(ok, key=lambda lv: lv["concurrency"])
+    per_pod = best["concurrency"]
+    per_session = max(lv["mem_per_session_mb"] for lv in levels)
+    mem_request = base_rss_mb + per_session * per_pod
+    peak = int(targets.get("peak_concurrent_sessions", per_pod))
+    return {
+        "sessions_per_pod": per_pod,
+        "render_p95_s": best["render_p95_s"],
+        "replicas": max(1, math.ceil(peak / per_pod)),
+        "peak_concurrent_sessions": peak,
+        "resources": {
+            "requests": {"cpu": f"{int(math.ceil(best['cpu_cores_avg'] * 20)) * 50}m",
+                         "memory": _mi(mem_request)},
+            "limits": {"memory": _mi(mem_request * 1.5)},
+        },
+    }
+
+# =================== CLI ===================
+def _print_level(lv: Dict[str, Any]) -> None:
+    print(f"  concurrency {lv['concurrency']:>3}: {lv['sessions']} sessions ({lv['failed_sessions']} failed) "
+          f"in {lv['wall_s']}s  {lv['sessions_per_s']} sessions/s  render p50 {lv['render_p50_s']}s "
+          f"p95 {lv['render_p95_s']}s  generate p95 {lv['generate_p95_s']}s")
+    print(f"                   RSS {lv['rss_start_mb']} -> {lv['rss_peak_mb']} MB "
+          f"({lv['mem_per_session_mb']} MB/session)  CPU {lv['cpu_cores_avg']} cores avg, "
+          f"{lv['cpu_cores_peak']} peak  threads {lv['threads_peak']}")
+    for step, st in lv["steps"].items():
+        print(f"                   {step:<9} n={st['n']:<4} p50 {st['p50_s']}s  p95 {st['p95_s']}s")
+    for e in lv["errors"]:
+        print(f"                   error: {e}")
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("scenario", help="fichier JSON (benchmarks/scenarios/)")
+    ap.add_argument("--out", help="rapport JSON")
+    ap.add_argument("--sessions", type=int, help="surcharge le nombre de sessions par palier")
+    ap.add_argument("--concurrency", help="surcharge les paliers, ex. 4,8,16")
+    args = ap.parse_args(argv)
+
+    with open(args.scenario, encoding="utf-8") as f:
+        scenario = json.load(f)
+    levels = args.concurrency or scenario.get("concurrency", [4])
+    if isinstance(levels, str):
+        levels = [int(x) for x in levels.split(",") if x.strip()]
+    elif isinstance(levels, int):
+        levels = [levels]
+    sessions = args.sessions or int(scenario.get("sessions", 10))
+
+    stubs = scenario.get("stubs", {})
+    with StubProcess(stubs, malformed_rate=float(stubs.get("malformed_rate", 0.0))) as stub:
+        base_rss = bootstrap(scenario, stub)
+        print(f"scenario {scenario.get('name', args.scenario)}: {sessions} sessions per level, "
+              f"stubs {stubs}, {available_cores()} cores, base RSS {base_rss:.1f} MB")
+        results = []
+        for c in levels:
+            lv = run_level(scenario, int(c), sessions)
+            _print_level(lv)
+            results.append(lv)
+
+    rec = recommend(results, scenario.get("targets", {}), base_rss)
+    print("recommendation:", json.dumps(rec))
+    report = {"scenario": scenario, "base_rss_mb": round(base_rss, 1), "cores": available_cores(),
+              "python": sys.version.split()[0], "levels": results, "recommendation": rec}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
+
+if __name__ == "__main__":
+    main()
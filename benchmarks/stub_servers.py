@@ -0,0 +1,195 @@
+"""
+Serveurs factices pour les bancs de charge : Groq (API chat completions), Wikipedia
+et Wikidata sur un seul port, avec une latence réglable par service.
+
+    python -m benchmarks.stub_servers [--port 8900] [--groq-latency 0.8] [--wiki-latency 0.1]
+                                      [--wikidata-latency 0.15] [--malformed-rate 0.0]
+
+Réponses déterministes (même requête, même réponse) ; le JSON d'itinéraire vient de
+src.Chains.fake_llm. Pour y brancher l'application :
+
+    GROQ_API_BASE=http://127.0.0.1:8900/groq
+    WIKIPEDIA_API_URL=http://127.0.0.1:8900/wikipedia/{lang}/w/api.php
+    WIKIDATA_API_URL=http://127.0.0.1:8900/wikidata/w/api.php
+
+(stub_env() renvoie ces variables.) Tourne de préférence dans un process séparé
+(StubProcess) pour ne pas fausser la mesure CPU de l'application.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from src.Chains.fake_llm import fake_completion
+
+# GIF 1x1 (vignettes factices)
+_PIXEL = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+def _h(text: str, n: int = 8) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:n]
+
+def stub_env(base_url: str) -> Dict[str, str]:
+    """Variables d'environnement qui redirigent l'application vers les serveurs factices."""
+    return {
+        "GROQ_API_BASE": f"{base_url}/groq",
+        "WIKIPEDIA_API_URL": f"{base_url}/wikipedia/{{lang}}/w/api.php",
+        "WIKIDATA_API_URL": f"{base_url}/wikidata/w/api.php",
+    }
+
+# =================== Réponses ===================
+def groq_completion(body: dict, malformed_rate: float) -> dict:
+    messages = body.get("messages") or []
+    human = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+    model = body.get("model", "")
+    text, usage = fake_completion(human, sum(len(str(m.get("content", ""))) for m in messages),
+                                  model, malformed_rate)
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    return {
+        "id": f"chatcmpl-{_h(human + model, 12)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                     "finish_reason": "stop", "logprobs": None}],
+        "usage": usage,
+    }
+
+def wikipedia_search(base_url: str, lang: str, params: dict) -> dict:
+    query = params.get("gsrsearch", "")
+    limit = int(params.get("gsrlimit", 5))
+    pages = {}
+    for i in range(min(limit, 3)):
+        pid = int(_h(f"{lang}|{query}|{i}", 7), 16)
+        pages[str(pid)] = {
+            "pageid": pid, "title": f"{query} ({i})",
+            "thumbnail": {"source": f"{base_url}/thumb/{_h(f'{lang}|{query}|{i}', 16)}.gif"},
+        }
+    return {"query": {"pages": pages}}
+
+def wikidata_api(params: dict) -> dict:
+    if params.get("action") == "wbsearchentities":
+        term = params.get("search", "")
+        return {"search": [{"id": f"Q{int(_h(term, 6), 16)}", "label": term}]}
+    qid = params.get("ids", "Q0")
+    return {"entities": {qid: {"claims": {"P18": [
+        {"mainsnak": {"datavalue": {"value": f"Stub_{qid}.jpg"}}}]}}}}
+
+# =================== Serveur ===================
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency: Dict[str, float] = {}
+    malformed_rate = 0.0
+
+    def _send(self, code: int, body: bytes, ctype: str = "application/json") -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, obj: dict) -> None:
+        self._send(200, json.dumps(obj).encode("utf-8"))
+
+    def _base_url(self) -> str:
+        return f"http://{self.headers.get('Host') or '127.0.0.1'}"
+
+    def do_POST(self):
+        path = urllib.parse.urlsplit(self.path).path
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if path.startswith("/groq/") and path.endswith("/chat/completions"):
+            time.sleep(self.latency.get("groq", 0.0))
+            self._json(groq_completion(body, self.malformed_rate))
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        parts = url.path.strip("/").split("/")
+        if parts[0] == "wikipedia" and len(parts) >= 2:
+            time.sleep(self.latency.get("wikipedia", 0.0))
+            self._json(wikipedia_search(self._base_url(), parts[1], params))
+        elif parts[0] == "wikidata":
+            time.sleep(self.latency.get("wikidata", 0.0))
+            self._json(wikidata_api(params))
+        elif parts[0] == "thumb":
+            self._send(200, _PIXEL, "image/gif")
+        elif parts[0] == "healthz":
+            self._send(200, b"ok\n", "text/plain")
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+def serve(port: int, latency: Dict[str, float], malformed_rate: float = 0.0,
+          host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    handler = type("StubHandler", (_StubHandler,), {"latency": dict(latency), "malformed_rate": malformed_rate})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class StubProcess:
+    """Serveurs factices dans un sous-process (context manager) ; `env` à injecter dans l'application."""
+
+    def __init__(self, latency: Dict[str, float], malformed_rate: float = 0.0, port: Optional[int] = None):
+        self.port = port or free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.env = stub_env(self.base_url)
+        self._args = [sys.executable, "-m", "benchmarks.stub_servers", "--port", str(self.port),
+                      "--groq-latency", str(latency.get("groq", 0.0)),
+                      "--wiki-latency", str(latency.get("wikipedia", 0.0)),
+                      "--wikidata-latency", str(latency.get("wikidata", 0.0)),
+                      "--malformed-rate", str(malformed_rate)]
+        self._proc: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "StubProcess":
+        self._proc = subprocess.Popen(self._args, cwd=os.getcwd())
+        deadline = time.monotonic() + 15
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.2):
+                    return self
+            except OSError:
+                time.sleep(0.1)
+        self.__exit__()
+        raise RuntimeError(f"stub servers did not start on port {self.port}")
+
+    def __exit__(self, *exc) -> None:
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait(timeout=5)
+            self._proc = None
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--groq-latency", type=float, default=0.8)
+    ap.add_argument("--wiki-latency", type=float, default=0.1)
+    ap.add_argument("--wikidata-latency", type=float, default=0.15)
+    ap.add_argument("--malformed-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    server = serve(args.port, {"groq": args.groq_latency, "wikipedia": args.wiki_latency,
+                               "wikidata": args.wikidata_latency}, args.malformed_rate, host=args.host)
+    print(f"stub servers on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,42 @@
-<<<<<<< HEAD
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from src.Config.config import GROQ_API_KEY
-
-
-llm = ChatGroq(
-    groq_api_key = GROQ_API_KEY,
-    model_name = "llama-3.3-70b-versatile",
-    temperature=0.3
-)
-
-
-itnineary_prompt = ChatPromptTemplate([
-    ("system" , "You are a helpful travel asssistant. Create a day trip itineary for {city} based on user's interest : {interests}. Provide a brief , bulleted itineary"),
-    ("human" , "Create a itineary for my day trip")
-])
-
-def generate_itineary(city:str , interests:list[str]) -> str:
-    response = llm.invoke(
-        itnineary_prompt.format_messages(city=city,interests=', '.join(interests))
-    )
-
-    return response.content
-=======
 # src/Chains/itinerary_agent.py
-from typing import List, Dict, Any
+from typing import Optional, List, Dict, Any
+import asyncio
 import json
+import os
+import time
+import hashlib
 import urllib.parse
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from src.Config.config import GROQ_API_KEY
+from src.Utils.logger import get_logger
+from src.Utils.custom_exception import is_retryable, classify_error, OutputParseError, PARSE
+from src.Utils.metrics import REGISTRY, TokenUsageHandler, record_llm_call, record_retry
+from src.Utils.tracing import span
+from src.Utils import aio, rate_limit
+from src.Chains.itinerary_cache import ITINERARY_CACHE, cache_key
+from src.Chains.renderer import render_day, template
+from src.Chains.language import language_name
+from src.Chains import model_router
+from src.Chains.model_router import SMALL, LARGE
+
+logger = get_logger(__name__)
 
 # ======================= LLM =======================
-llm = ChatGroq(
-    groq_api_key=GROQ_API_KEY,
-    model_name="llama-3.3-70b-versatile",
-    temperature=0.2,                      # réponses nettes
-    model_kwargs={"top_p": 0.9}           # supprime le warning Pydantic
-)
+MODEL_NAME = model_router.LARGE_MODEL
+
+def _chat_model(model_name: str) -> ChatGroq:
+    return ChatGroq(
+        groq_api_key=GROQ_API_KEY,
+        model_name=model_name,
+        temperature=0.2,                      # réponses nettes
+        model_kwargs={"top_p": 0.9}           # supprime le warning Pydantic
+    )
+
+llm = _chat_model(MODEL_NAME)
+llm_draft = _chat_model(model_router.DRAFT_MODEL)   # brouillons (voir model_router)
 
 # ==================== Prompt sécurisé ====================
 # On injecte l'exemple JSON via une variable "schema" pour éviter d'échapper les accolades.
@@ -60,18 +57,102 @@ schema_example = (
     '}'
 )
 
+_itinerary_human = (
+    "City: {city}\nInterests: {interests}\n"
+    "Contraintes : 6–10 POIs max, adresses ou lieux reconnaissables. "
+    "Brefs bullets, concrets (horaires indicatifs, ordre logique).\n"
+    "Lieux déjà prévus les autres jours, à ne pas reproposer : {exclude}"
+)
+
 itinerary_json_prompt = ChatPromptTemplate.from_messages([
     ("system",
      "Tu es un expert du voyage. Tu DOIS détecter la langue du dernier message utilisateur "
      "et répondre uniquement dans cette langue. Renvoie STRICTEMENT un JSON (sans texte autour). "
      "Structure attendue : {schema}"),
-    ("human",
-     "City: {city}\nInterests: {interests}\n"
-     "Contraintes : 6–10 POIs max, adresses ou lieux reconnaissables. "
-     "Brefs bullets, concrets (horaires indicatifs, ordre logique).")
+    ("human", _itinerary_human)
 ]).partial(schema=schema_example)
 
 chain_json = itinerary_json_prompt | llm | StrOutputParser()
+chain_json_draft = itinerary_json_prompt | llm_draft | StrOutputParser()
+
+# Langue connue d'avance (src/Chains/language.py) : ni détection ni language_code en sortie
+schema_example_pinned = schema_example.replace('"language_code": "fr|en|es|ar|...", ', "")
+
+itinerary_json_prompt_pinned = ChatPromptTemplate.from_messages([
+    ("system",
+     "Tu es un expert du voyage. Réponds uniquement en {language}. "
+     "Renvoie STRICTEMENT un JSON (sans texte autour). Structure attendue : {schema}"),
+    ("human", _itinerary_human)
+]).partial(schema=schema_example_pinned)
+
+# ============ Mode découpé : POIs, puis une complétion courte par section ============
+ITINERARY_SPLIT = os.getenv("ITINERARY_SPLIT", "off").lower() in ("1", "on", "true", "yes")
+SPLIT_CONCURRENCY = int(os.getenv("SPLIT_CONCURRENCY", "8"))
+
+_pois_human = (
+    "City: {city}\nInterests: {interests}\nSection: pois\n"
+    "6–10 POIs pour une journée, adresses ou lieux reconnaissables, dans un ordre de visite logique.\n"
+    "Lieux déjà prévus les autres jours, à ne pas reproposer : {exclude}"
+)
+_pois_schema = '{"name":"string","address":"string","category":"sight|museum|food|view|park","est_cost_eur": 0}'
+
+pois_json_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "Tu es un expert du voyage. Détecte la langue du dernier message utilisateur. "
+     "Renvoie STRICTEMENT un JSON (sans texte autour) : {schema}"),
+    ("human", _pois_human)
+]).partial(schema='{"language_code": "fr|en|es|ar|...", "pois": [' + _pois_schema + ']}')
+
+pois_json_prompt_pinned = ChatPromptTemplate.from_messages([
+    ("system",
+     "Tu es un expert du voyage. Réponds uniquement en {language}. "
+     "Renvoie STRICTEMENT un JSON (sans texte autour) : {schema}"),
+    ("human", _pois_human)
+]).partial(schema='{"pois": [' + _pois_schema + ']}')
+
+section_json_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "Tu es un expert du voyage. Réponds uniquement en langue '{language}'. "
+     "Renvoie STRICTEMENT un JSON (sans texte autour) : {shape}"),
+    ("human",
+     "City: {city}\nInterests: {interests}\nSection: {section}\n"
+     "Lieux de la journée (à utiliser, dans cet ordre) :\n{places}\n{instruction}")
+])
+
+SECTION_INSTRUCTIONS: Dict[str, str] = {
+    "overview": "2 à 3 phrases qui présentent la journée.",
+    "morning": "2 à 4 bullets brefs avec horaires indicatifs, lieux ci-dessus.",
+    "lunch": "1 à 2 bullets : où et quoi manger près des lieux du matin.",
+    "afternoon": "2 à 4 bullets brefs avec horaires indicatifs, lieux ci-dessus.",
+    "evening": "1 à 3 bullets brefs avec horaires indicatifs.",
+    "logistics": "2 à 4 bullets : transports, billets, réservations.",
+    "rain_plan": "2 à 3 bullets : alternatives couvertes en cas de pluie.",
+    "recap": "3 à 5 bullets qui résument la journée.",
+}
+
+def _chain_for(tier: str, prompt: Optional[ChatPromptTemplate] = None):
+    # lookup au moment de l'appel : install_fake_llm / install_fake_models remplacent ces globals
+    if prompt is None:
+        return chain_json if tier == LARGE else chain_json_draft
+    return prompt | (llm if tier == LARGE else llm_draft) | StrOutputParser()
+
+# Version du prompt : invalide le cache quand le prompt ou le schéma changent
+def _prompt_version(schema: str, prompt: ChatPromptTemplate) -> str:
+    raw = schema + "".join(str(m.prompt.template) for m in prompt.messages)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:8]
+
+PROMPT_VERSION = _prompt_version(schema_example, itinerary_json_prompt)
+PROMPT_VERSION_PINNED = _prompt_version(schema_example_pinned, itinerary_json_prompt_pinned)
+
+def itinerary_cache_key(city: str, interests: List[str], transport_mode: str = "walking",
+                        language: Optional[str] = None) -> str:
+    """Langue fixée : une entrée par langue ; sinon la langue est celle détectée par le modèle."""
+    version = f"{PROMPT_VERSION_PINNED}-{language}" if language else PROMPT_VERSION
+    return cache_key(city, interests, transport_mode, version=version)
+
+def _language_input(language: str) -> str:
+    name = language_name(language)
+    return f"{name} ({language})" if name != language else language
 
 # =================== Helpers Google Maps ===================
 def _q(s: str) -> str:
@@ -96,27 +177,7 @@ def build_dir_link(points: List[str], mode: str = "walking") -> str:
 
 # =================== Localisation des titres ===================
 def _headings(lang: str) -> Dict[str, str]:
-    l = (lang or "fr").lower()
-    if l.startswith("en"):
-        return {"overview": "## Overview","morning": "## Morning","lunch": "## Lunch",
-                "afternoon": "## Afternoon","evening": "## Evening","logistics": "## Logistics",
-                "rain_plan": "## Plan B (weather)","recap": "## Recap","maps": "## Maps",
-                "route_walk": "Walking route"}
-    if l.startswith("es"):
-        return {"overview": "## Resumen","morning": "## Mañana","lunch": "## Almuerzo",
-                "afternoon": "## Tarde","evening": "## Noche","logistics": "## Logística",
-                "rain_plan": "## Plan B (clima)","recap": "## Resumen","maps": "## Mapas",
-                "route_walk": "Ruta a pie"}
-    if l.startswith("ar"):
-        return {"overview": "## نظرة عامة","morning": "## الصباح","lunch": "## الغداء",
-                "afternoon": "## بعد الظهر","evening": "## المساء","logistics": "## الجوانب اللوجستية",
-                "rain_plan": "## الخطة البديلة (الطقس)","recap": "## خلاصة","maps": "## الخرائط",
-                "route_walk": "مسار سير"}
-    # FR par défaut
-    return {"overview": "## Aperçu","morning": "## Matin","lunch": "## Midi",
-            "afternoon": "## Après-midi","evening": "## Soir","logistics": "## Logistique",
-            "rain_plan": "## Plan B (météo)","recap": "## Récap","maps": "## Cartes",
-            "route_walk": "Itinéraire à pied"}
+    return template(lang).headings
 
 # =================== Parsing/formatage ===================
 def _safe_json(s: str) -> Dict[str, Any]:
@@ -127,33 +188,174 @@ def _safe_json(s: str) -> Dict[str, Any]:
     i, j = s.find("{"), s.rfind("}")
     if i >= 0 and j > i:
         s = s[i:j+1]
-    return json.loads(s)
+    try:
+        return json.loads(s)
+    except json.JSONDecodeError as e:
+        raise OutputParseError(f"Invalid JSON from model: {e}") from e
+
+def render_day_markdown(language_code: str, sections: Dict[str, Any], pois: List[Dict[str, Any]],
+                        dir_link: str) -> str:
+    """Markdown localisé d'un jour (sections + carte + POIs), via les gabarits précompilés."""
+    return render_day(sections, pois, dir_link, language_code)
 
-def _bullets(xs: List[str]) -> str:
-    xs = xs or []
-    return "\n".join(f"- {x}" for x in xs)
+def poi_dir_link(pois: List[Dict[str, Any]], transport_mode: str = "walking") -> str:
+    points = [(p.get("address") or p.get("label") or p.get("name") or "").strip() for p in pois]
+    return build_dir_link(points, mode=transport_mode)
+
+async def _ainvoke_json(tier: str, city: str, inputs: Dict[str, Any], prompt: Optional[ChatPromptTemplate] = None,
+                        expect: str = "pois", section: str = "all", paced: bool = True) -> tuple:
+    """
+    Un appel LLM sur le niveau `tier` -> (JSON parsé, nom du modèle). `expect` : clé obligatoire.
+    `paced=False` : jeton du limiteur déjà pris par l'appelant (sections du mode découpé).
+    """
+    model = model_router.model_for(tier)
+    usage = TokenUsageHandler()
+    if paced:
+        await rate_limit.LLM_RATE_LIMITER.aacquire()
+    t0 = time.perf_counter()
+    try:
+        with span("chain.invoke", city=city, model=model, tier=tier, section=section) as sp:
+            raw = await _chain_for(tier, prompt).ainvoke(inputs, config={"callbacks": [usage]})
+            sp.set_attribute("prompt_tokens", usage.prompt_tokens)
+            sp.set_attribute("completion_tokens", usage.completion_tokens)
+    except Exception:
+        record_llm_call(usage.model or model, usage.prompt_tokens, usage.completion_tokens,
+                        time.perf_counter() - t0, status="error")
+        raise
+    call = record_llm_call(usage.model or model, usage.prompt_tokens, usage.completion_tokens,
+                           time.perf_counter() - t0)
+    logger.info("LLM call completed", extra={
+        "city": city, "latency_s": call["latency_s"], "prompt_tokens": call["prompt_tokens"],
+        "completion_tokens": call["completion_tokens"], "tier": tier, "section": section, "llm": call
+    })
+    with span("chain.safe_json", chars=len(raw or "")):
+        data = _safe_json(raw)
+    if not isinstance(data, dict) or (expect == "pois" and not isinstance(data.get("pois", []), list)) \
+            or (expect != "pois" and expect not in data):
+        raise OutputParseError("Unexpected itinerary shape")
+    return data, call["model"]
+
+async def _ainvoke_routed(city: str, inputs: Dict[str, Any], user_interests: List[str], refine: bool,
+                          sections=model_router.SECTIONS, prompt: Optional[ChatPromptTemplate] = None,
+                          expect: str = "pois", section: str = "all", paced: bool = True) -> tuple:
+    """Choix du niveau (model_router) + une escalade vers le grand modèle si le JSON est inexploitable."""
+    tier, reason = model_router.route(user_interests, refine=refine, sections=sections)
+    try:
+        data, model = await _ainvoke_json(tier, city, inputs, prompt, expect, section, paced)
+    except Exception as e:
+        # Sortie du petit modèle inexploitable : un seul essai sur le grand avant le retry tenacity
+        if tier != SMALL or classify_error(e) != PARSE:
+            raise
+        REGISTRY.inc("model_escalations_total", reason="parse")
+        tier, reason = LARGE, "escalated"
+        data, model = await _ainvoke_json(tier, city, inputs, prompt, expect, section)  # appel en plus : son jeton
+    REGISTRY.inc("model_route_total", tier=tier, reason=reason)
+    return data, model
+
+# =================== Mode découpé (ITINERARY_SPLIT) ===================
+def split_fanout() -> int:
+    """Appels LLM d'un jour en mode découpé (POIs + une section par appel)."""
+    return 1 + len(SECTION_INSTRUCTIONS)
+
+def split_fits() -> bool:
+    """Le limiteur LLM peut-il accorder le jour entier d'un coup (burst >= fan-out) ?"""
+    return getattr(rate_limit.LLM_RATE_LIMITER, "burst", 0) >= split_fanout()
+
+async def _agenerate_split(city: str, user_interests: List[str], interests_txt: str, exclude: Optional[List[str]],
+                           refine: bool, language: Optional[str] = None) -> tuple:
+    """
+    POIs d'abord (appel court), puis une complétion courte par section en parallèle,
+    avec les POIs en contexte : la latence est celle de la section la plus lente.
+    Les jetons du limiteur sont pris en une fois pour tout le jour (split_fanout()) :
+    les sections ne se retrouvent pas à attendre un jeton chacune au milieu du jour.
+    """
+    await rate_limit.LLM_RATE_LIMITER.aacquire(split_fanout())
+    base = {"city": city, "interests": interests_txt, "exclude": "; ".join(exclude or []) or "-"}
+    head_inputs = dict(base, language=_language_input(language)) if language else base
+    with span("chain.split.pois", city=city):
+        head, poi_model = await _ainvoke_routed(city, head_inputs, user_interests, refine, sections=("pois",),
+                                                prompt=pois_json_prompt_pinned if language else pois_json_prompt,
+                                                expect="pois", section="pois", paced=False)
+    language = language or head.get("language_code") or "fr"
+    places = "\n".join(
+        f"- {p.get('name') or p.get('address')} ({p.get('address') or '?'})" for p in head.get("pois") or []
+    ) or "-"
+    gate = asyncio.Semaphore(max(1, SPLIT_CONCURRENCY))
+
+    async def one(section: str) -> tuple:
+        inputs = dict(base, section=section, language=language, places=places,
+                      instruction=SECTION_INSTRUCTIONS[section],
+                      shape=json.dumps({section: "string" if section == "overview" else ["bullet1"]}))
+        async with gate:
+            return await _ainvoke_routed(city, inputs, user_interests, refine, sections=(section,),
+                                         prompt=section_json_prompt, expect=section, section=section, paced=False)
+
+    data: Dict[str, Any] = {"language_code": language, "pois": head.get("pois") or []}
+    models = {poi_model}
+    with span("chain.split.sections", sections=len(SECTION_INSTRUCTIONS)):
+        results = await asyncio.gather(*(one(sec) for sec in SECTION_INSTRUCTIONS))
+    for sec, (part, model) in zip(SECTION_INSTRUCTIONS, results):
+        data[sec] = part.get(sec)
+        models.add(model)
+    return data, "+".join(sorted(m for m in models if m))
 
 # =================== API publique ===================
 @retry(
     reraise=True,
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=0.8, min=1, max=6),
-    retry=retry_if_exception_type(Exception)
+    retry=retry_if_exception(is_retryable),
+    before_sleep=record_retry,
+    sleep=aio.traced_sleep
 )
-def generate_itinerary_payload(city: str, interests: List[str], transport_mode: str = "walking") -> Dict[str, Any]:
+async def agenerate_itinerary_payload(city: str, interests: List[str], transport_mode: str = "walking",
+                                      exclude: Optional[List[str]] = None, refine: bool = False,
+                                      split: Optional[bool] = None, language: Optional[str] = None,
+                                      user_interests: Optional[List[str]] = None) -> Dict[str, Any]:
     """
+    `exclude` : POIs déjà prévus d'autres jours, passés au prompt comme lieux à éviter.
+    Ce n'est qu'une consigne : la clé de cache l'ignore et le planner déduplique après coup.
+    `refine` : force le grand modèle et ignore le cache en lecture (le résultat le remplace).
+    `split` : POIs puis sections en parallèle (défaut : ITINERARY_SPLIT) ; même payload en sortie.
+    `language` : code ISO fixé d'avance (détection locale) ; None : le modèle détecte la langue.
+    `user_interests` : intérêts saisis par l'utilisateur, seuls comptés pour le routage
+    (défaut : `interests`) ; le planner y passe ses intérêts sans le thème du jour.
+
     Génère un payload structuré:
     {
       "language_code": "fr|en|...",
       "sections": {...},
       "pois": [{"label","address","map_link","category","est_cost_eur"}],
       "maps": {"dir_link","transport_mode"},
-      "markdown": "...."
+      "model": "llama-..."
     }
+    Pas de Markdown dans le payload (ni en cache) : generate_itinerary_markdown le rend à la demande.
     """
     interests_txt = ", ".join([i.strip() for i in interests if i and i.strip()]) or "general"
-    raw = chain_json.invoke({"city": city, "interests": interests_txt})
-    data = _safe_json(raw)
+    user_interests = interests if user_interests is None else user_interests
+    language = (language or "").strip().lower()[:2] or None
+    key = itinerary_cache_key(city, interests, transport_mode, language)
+    t0 = time.perf_counter()
+    cached = None if refine else ITINERARY_CACHE.get(key)
+    if cached is not None:
+        record_llm_call(cached.get("model") or MODEL_NAME, 0, 0, time.perf_counter() - t0, cache="hit")
+        return cached
+
+    use_split = ITINERARY_SPLIT if split is None else split
+    if use_split and not split_fits():
+        # Le limiteur ne couvre pas le fan-out d'un jour : un seul prompt plutôt que 9 appels à la file
+        REGISTRY.inc("split_fallback_total")
+        use_split = False
+    if use_split:
+        data, model = await _agenerate_split(city, user_interests, interests_txt, exclude, refine, language)
+    else:
+        inputs = {"city": city, "interests": interests_txt, "exclude": "; ".join(exclude or []) or "-"}
+        if language:
+            inputs["language"] = _language_input(language)
+        data, model = await _ainvoke_routed(city, inputs, user_interests, refine,
+                                            prompt=itinerary_json_prompt_pinned if language else None)
+    if language:
+        data["language_code"] = language
 
     # POIs + liens
     pois_in = data.get("pois", []) or []
@@ -172,26 +374,7 @@ def generate_itinerary_payload(city: str, interests: List[str], transport_mode:
             "est_cost_eur": p.get("est_cost_eur"),
         })
 
-    # Markdown localisé
-    lang = (data.get("language_code") or "fr").lower()
-    H = _headings(lang)
-    md_parts = [
-        f"{H['overview']}\n{data.get('overview','')}\n",
-        f"{H['morning']}\n{_bullets(data.get('morning'))}\n",
-        f"{H['lunch']}\n{_bullets(data.get('lunch'))}\n",
-        f"{H['afternoon']}\n{_bullets(data.get('afternoon'))}\n",
-        f"{H['evening']}\n{_bullets(data.get('evening'))}\n",
-        f"{H['logistics']}\n{_bullets(data.get('logistics'))}\n",
-        f"{H['rain_plan']}\n{_bullets(data.get('rain_plan'))}\n",
-        f"{H['recap']}\n{_bullets(data.get('recap'))}\n",
-        f"{H['maps']}\n- {H['route_walk']}" + (f" • [Ouvrir]({dir_link})" if dir_link else "")
-    ]
-    for p in pois_out:
-        line = f"- {p['label']}" + (f" — {p['address']}" if p['address'] else "") + f" • [Carte]({p['map_link']})"
-        md_parts.append(line)
-    markdown = "\n".join(md_parts)
-
-    return {
+    payload = {
         "language_code": data.get("language_code") or "fr",
         "sections": {
             "overview": data.get("overview", ""),
@@ -208,11 +391,22 @@ def generate_itinerary_payload(city: str, interests: List[str], transport_mode:
             "dir_link": dir_link,
             "transport_mode": transport_mode
         },
-        "markdown": markdown
+        "model": model
     }
+    ITINERARY_CACHE.set(key, payload)
+    return payload
+
+def generate_itinerary_payload(city: str, interests: List[str], transport_mode: str = "walking",
+                               exclude: Optional[List[str]] = None, refine: bool = False,
+                               split: Optional[bool] = None, language: Optional[str] = None,
+                               user_interests: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Adaptateur synchrone de agenerate_itinerary_payload (Streamlit, scripts)."""
+    return aio.run_sync(agenerate_itinerary_payload(city, interests, transport_mode, exclude, refine, split,
+                                                    language, user_interests))
 
 def generate_itinerary_markdown(city: str, interests: List[str], transport_mode: str = "walking") -> str:
-    """Raccourci : renvoie directement le Markdown."""
+    """Raccourci : Markdown localisé du jour, rendu à la demande depuis le payload."""
     payload = generate_itinerary_payload(city, interests, transport_mode)
-    return payload["markdown"]
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
+    with span("chain.build_markdown", pois=len(payload["pois"])):
+        return render_day_markdown(payload["language_code"], payload["sections"], payload["pois"],
+                                   payload["maps"]["dir_link"])
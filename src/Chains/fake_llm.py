@@ -0,0 +1,121 @@
+# src/Chains/fake_llm.py
+"""
+LLM factice et déterministe pour les tests/batchs hors-ligne : renvoie un JSON
+conforme au schéma de itinerary_json_prompt à partir de la ville et des intérêts.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Any, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+_CATEGORIES = ["sight", "museum", "food", "view", "park"]
+
+def _field(text: str, name: str) -> str:
+    m = re.search(rf"^{name}:\s*(.*)$", text, flags=re.M)
+    return m.group(1).strip() if m else ""
+
+def fake_itinerary(city: str, interests: str, n_pois: int = 6) -> dict:
+    seed = int(hashlib.sha1(f"{city}|{interests}".encode("utf-8")).hexdigest(), 16)
+    tags = [t.strip() for t in interests.split(",") if t.strip()] or ["general"]
+    pois = []
+    for i in range(n_pois):
+        tag = tags[i % len(tags)]
+        pois.append({
+            "name": f"{city} {tag.title()} #{(seed >> (i * 4)) % 97 + 1}",
+            "address": f"{10 + i} Rue {tag.title()}, {city}",
+            "category": _CATEGORIES[(seed >> i) % len(_CATEGORIES)],
+            "est_cost_eur": (seed >> (i * 3)) % 40,
+        })
+    return {
+        "language_code": "en",
+        "overview": f"A day in {city} around {', '.join(tags)}.",
+        "morning": [f"09:00 {pois[0]['name']}"],
+        "lunch": ["12:30 Local bistro"],
+        "afternoon": [f"14:00 {pois[1]['name']}", f"16:00 {pois[2]['name']}"],
+        "evening": [f"19:30 {pois[3]['name']}"],
+        "logistics": ["Buy a day pass"],
+        "rain_plan": [f"Swap outdoor stops for {pois[1]['name']}"],
+        "recap": [p["name"] for p in pois[:3]],
+        "pois": pois,
+    }
+
+def _bucket(text: str) -> float:
+    return int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+def fake_completion(human: str, prompt_chars: int, model_name: str = "",
+                    malformed_rate: float = 0.0) -> tuple:
+    """(texte, usage) de la réponse au message utilisateur `human` ; sert aussi au faux serveur Groq."""
+    payload = fake_itinerary(_field(human, "City") or "City", _field(human, "Interests"))
+    section = _field(human, "Section")
+    if section == "pois":
+        payload = {"language_code": payload["language_code"], "pois": payload["pois"]}
+    elif section:
+        payload = {section: payload.get(section)}
+    text = json.dumps(payload, ensure_ascii=False)
+    if malformed_rate and _bucket(human + model_name) < malformed_rate:
+        text = text[: len(text) // 2]  # JSON tronqué, comme une sortie coupée
+    return text, {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(text) // 4}
+
+class FakeItineraryLLM(BaseChatModel):
+    """Chat model factice (latence simulée + usage de tokens approximatif : 1 token ≈ 4 caractères)."""
+
+    model_name: str = "fake-itinerary"
+    latency_s: float = 0.0
+    per_token_s: float = 0.0              # latence proportionnelle à la longueur de la sortie
+    malformed_rate: float = 0.0           # part des réponses non-JSON (déterministe par prompt)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-itinerary"
+
+    def _respond(self, messages: List[BaseMessage]) -> tuple:
+        human = str(messages[-1].content) if messages else ""
+        text, usage = fake_completion(human, sum(len(str(m.content)) for m in messages),
+                                      self.model_name, self.malformed_rate)
+        result = ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=text))],
+            llm_output={"token_usage": usage, "model_name": self.model_name},
+        )
+        return result, self.latency_s + self.per_token_s * usage["completion_tokens"]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        result, delay = self._respond(messages)
+        if delay:
+            time.sleep(delay)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        result, delay = self._respond(messages)
+        if delay:
+            await asyncio.sleep(delay)  # latence réseau simulée sans bloquer la boucle
+        return result
+
+def _install(large: FakeItineraryLLM, small: FakeItineraryLLM) -> None:
+    from langchain_core.output_parsers import StrOutputParser
+    import src.Chains.Itinerary_chain as itinerary_chain
+    prompt = itinerary_chain.itinerary_json_prompt
+    itinerary_chain.llm, itinerary_chain.llm_draft = large, small   # mode découpé
+    itinerary_chain.chain_json = prompt | large | StrOutputParser()
+    itinerary_chain.chain_json_draft = prompt | small | StrOutputParser()
+
+def install_fake_llm(latency_s: float = 0.0, per_token_s: float = 0.0) -> None:
+    """Remplace les chaînes par prompt | FakeItineraryLLM | parser (même chemin de parsing)."""
+    fake = FakeItineraryLLM(latency_s=latency_s, per_token_s=per_token_s)
+    _install(fake, fake)
+
+def install_fake_models(small_latency_s: float = 0.0, large_latency_s: float = 0.0,
+                        small_malformed_rate: float = 0.0, per_token_s: float = 0.0) -> None:
+    """Deux faux modèles (petit/grand) portant les vrais noms, pour que le coût estimé soit réaliste."""
+    from src.Chains.model_router import DRAFT_MODEL, LARGE_MODEL
+    _install(
+        FakeItineraryLLM(model_name=LARGE_MODEL, latency_s=large_latency_s, per_token_s=per_token_s),
+        FakeItineraryLLM(model_name=DRAFT_MODEL, latency_s=small_latency_s, per_token_s=per_token_s,
+                         malformed_rate=small_malformed_rate),
+    )
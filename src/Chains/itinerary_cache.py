@@ -0,0 +1,108 @@
+# src/Chains/itinerary_cache.py
+"""
+Cache des payloads de generate_itinerary_payload, partagé entre l'app et le batch
+de préchauffage (python -m src.Core.prewarm). Backend SQLite par défaut, store partagé
+(SHARED_STORE_URL) en déploiement multi-réplicas.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, List, Union
+from src.Utils.bounded_cache import cache_from_env
+from src.Utils.serializer import pack, unpack
+from src.Utils import shared_store
+
+ITINERARY_CACHE_PATH = os.getenv("ITINERARY_CACHE_PATH", os.path.join("cache", "itinerary_cache.sqlite"))
+ITINERARY_CACHE_TTL_S = int(os.getenv("ITINERARY_CACHE_TTL_S", str(7 * 24 * 3600)))
+
+# =================== Clé ===================
+def _norm(s: str) -> str:
+    return " ".join((s or "").lower().split())
+
+def cache_key(city: str, interests: List[str], transport_mode: str, version: str = "") -> str:
+    """Clé stable : ville + intérêts (normalisés, dédupliqués, triés) + mode + version du prompt."""
+    tags = sorted({_norm(i) for i in interests or [] if i and i.strip()})
+    raw = "|".join([_norm(city), ",".join(tags), _norm(transport_mode), version])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+# =================== Backend ===================
+class SQLiteStore:
+    """KV (clé -> blob sérialisé) avec date d'écriture ; une connexion par thread, WAL pour lecteurs concurrents."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._conn() as c:
+            c.execute("CREATE TABLE IF NOT EXISTS kv (k TEXT PRIMARY KEY, v TEXT NOT NULL, ts REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[tuple]:
+        row = self._conn().execute("SELECT v, ts FROM kv WHERE k = ?", (key,)).fetchone()
+        return row if row else None
+
+    def set(self, key: str, value: Union[bytes, str]) -> None:
+        with self._conn() as c:
+            c.execute("INSERT OR REPLACE INTO kv (k, v, ts) VALUES (?, ?, ?)", (key, value, time.time()))
+
+    def delete(self, key: str) -> None:
+        with self._conn() as c:
+            c.execute("DELETE FROM kv WHERE k = ?", (key,))
+
+# =================== Cache ===================
+class ItineraryCache:
+    """
+    Store (SQLite / partagé) précédé d'un niveau mémoire borné (CACHE_ITINERARY_MAX_ENTRIES,
+    défaut 256 ; CACHE_ITINERARY_MAX_BYTES, défaut 16 Mo) qui garde les blobs sérialisés :
+    chaque get() rend une copie, que l'appelant peut modifier.
+    """
+
+    def __init__(self, store=None, ttl_s: int = ITINERARY_CACHE_TTL_S):
+        self.store = store
+        self.ttl_s = ttl_s
+        self.cache = cache_from_env("itinerary", max_entries=256, max_bytes=16 * 1024 * 1024,
+                                    ttl_s=ttl_s, store=store) if store is not None else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        blob = self.cache.get(key)
+        return unpack(blob) if blob is not None else None
+
+    def set(self, key: str, payload: Dict[str, Any]) -> None:
+        if self.enabled:
+            self.cache.set(key, pack(payload))
+
+    def delete(self, key: str) -> None:
+        if self.enabled:
+            self.cache.delete(key)
+
+    def contains(self, key: str) -> bool:
+        return self.enabled and (key in self.cache or self.get(key) is not None)
+
+def _default_cache() -> ItineraryCache:
+    if shared_store.SHARED is not None:
+        # Multi-pods : un seul cache pour tous les réplicas (expiration côté serveur)
+        return ItineraryCache(shared_store.SharedKVStore(shared_store.SHARED, "itinerary", ITINERARY_CACHE_TTL_S))
+    if not ITINERARY_CACHE_PATH:
+        return ItineraryCache(None)
+    try:
+        return ItineraryCache(SQLiteStore(ITINERARY_CACHE_PATH))
+    except sqlite3.Error:
+        return ItineraryCache(None)
+
+ITINERARY_CACHE = _default_cache()
@@ -0,0 +1,130 @@
+# src/Chains/language.py
+"""
+Détection locale de la langue de la saisie (ville + intérêts), sans appel LLM.
+
+La langue est choisie avant la génération : le prompt la fixe au lieu de demander
+au modèle de la détecter (prompt plus court, pas de `language_code` en sortie), la
+clé de cache en dépend de façon déterministe, et les titres sont connus d'avance.
+
+Heuristique en deux temps, en quelques microsecondes :
+  1. écriture (arabe, cyrillique, kana, han) ;
+  2. alphabet latin : mots outils et vocabulaire du voyage propres à chaque langue,
+     plus les diacritiques distinctifs (ñ, ß, ã, ş...).
+Rend None quand rien ne départage (ex. « Rome » seul) : l'appelant garde alors la
+détection par le modèle ou un choix explicite.
+
+    LANGUAGE_DETECT=on|off    off : le planner laisse le modèle détecter la langue
+"""
+import os
+import re
+import unicodedata
+from typing import Dict, Iterable, Optional
+
+from src.Chains.renderer import LABELS
+
+# Nom affiché (sélecteur de l'app, consigne du prompt)
+LANGUAGE_NAMES: Dict[str, str] = {
+    "fr": "Français", "en": "English", "es": "Español", "ar": "العربية", "de": "Deutsch",
+    "it": "Italiano", "pt": "Português", "nl": "Nederlands", "tr": "Türkçe", "ru": "Русский",
+    "zh": "中文", "ja": "日本語",
+}
+SUPPORTED = tuple(code for code in LANGUAGE_NAMES if code in LABELS)
+LANGUAGE_DETECT = os.getenv("LANGUAGE_DETECT", "on").lower() in ("1", "on", "true", "yes")
+
+# =================== Écritures ===================
+_SCRIPTS = (
+    ("ja", re.compile(r"[぀-ヿ]")),                 # hiragana / katakana
+    ("zh", re.compile(r"[一-鿿]")),                 # han sans kana
+    ("ar", re.compile(r"[؀-ۿݐ-ݿ]")),
+    ("ru", re.compile(r"[Ѐ-ӿ]")),
+)
+
+# =================== Alphabet latin ===================
+# Mots sans accents (comparés à la saisie repliée) ; un mot commun à deux langues n'y figure pas
+_WORDS: Dict[str, str] = {
+    "en": "the and with of for near food foods museums history historic parks beach beaches "
+          "coffee shopping nightlife pubs hiking music street markets market churches church "
+          "castle castles gardens garden view views wine seafood family kids photography galleries gallery "
+          "sunset walking old town best cheap landmarks sights outdoors",
+    "fr": "les et des du avec pour au aux une musee musees histoire patrimoine plage plages parc parcs "
+          "nourriture vin vins marche marches eglise eglises chateau chateaux jardins vue vues randonnee "
+          "balade balades quartier quartiers boutiques sorties vie nocturne enfants famille photographie "
+          "patisserie patisseries boulangerie gastronomie plein air spectacles fromage",
+    "es": "el los las y con del museo museos historia playa playas parque parques comida vinos mercado "
+          "mercados iglesia iglesias castillo castillos jardines senderismo barrio barrios compras vida "
+          "nocturna ninos familia fotografia arquitectura tapas cerveza miradores",
+    "de": "der die das und mit fur von im zum zur museen geschichte strande essen kaffee wein markte "
+          "kirche kirchen schloss burg aussicht wandern viertel einkaufen nachtleben kinder familie "
+          "fotografie architektur kunst bier altstadt biergarten",
+    "it": "il lo gli con per di della delle dei musei storia spiaggia spiagge parco parchi cibo mercato "
+          "mercati chiesa chiese castello giardini escursioni quartiere quartieri notturna bambini famiglia "
+          "architettura gelato cucina trattoria",
+    "pt": "os com da dos das museu museus praia praias vinho igreja igrejas castelo jardins trilhas "
+          "bairros noturna criancas arquitetura doces miradouros",
+    "nl": "het een met van voor musea geschiedenis stranden parken eten koffie wijn markten kerk kerken "
+          "kasteel tuinen uitzicht wandelen wijk winkelen uitgaan kinderen gezin architectuur grachten",
+    "tr": "ve ile icin muze muzeler tarih plaj plajlar parklar yemek kahve sarap pazar carsi cami camiler "
+          "kale bahce manzara yuruyus mahalle alisveris gece hayati cocuk aile fotograf mimari sanat",
+}
+_LEXICON: Dict[str, str] = {}
+_AMBIGUOUS = set()
+for _lang, _words in _WORDS.items():
+    for _w in _words.split():
+        if _LEXICON.get(_w, _lang) != _lang:
+            _AMBIGUOUS.add(_w)
+        _LEXICON[_w] = _lang
+for _w in _AMBIGUOUS:
+    del _LEXICON[_w]
+
+# Diacritiques propres (ou presque) à une langue
+_MARKS: Dict[str, str] = {
+    "è": "fr", "ê": "fr", "œ": "fr", "â": "fr", "î": "fr", "û": "fr", "ë": "fr", "ù": "fr",
+    "ñ": "es", "¿": "es", "¡": "es",
+    "ä": "de", "ß": "de",
+    "ã": "pt", "õ": "pt",
+    "ì": "it", "ò": "it",
+    "ş": "tr", "ğ": "tr", "ı": "tr", "İ": "tr",
+}
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+def _fold(word: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", word) if not unicodedata.combining(c))
+
+def language_scores(text: str) -> Dict[str, float]:
+    """Indices par langue pour `text` (diagnostic ; detect_language décide)."""
+    scores: Dict[str, float] = {}
+    for lang, rx in _SCRIPTS:
+        n = len(rx.findall(text or ""))
+        if n:
+            scores[lang] = scores.get(lang, 0.0) + 3.0 * n
+    if "ja" in scores and "zh" in scores:      # kana présents : japonais, même avec des kanji
+        scores["ja"] += scores.pop("zh")
+    for ch in text or "":
+        lang = _MARKS.get(ch) or _MARKS.get(ch.lower())
+        if lang:
+            scores[lang] = scores.get(lang, 0.0) + 2.0
+    for word in _WORD_RE.findall((text or "").lower()):
+        w = _fold(word)
+        lang = _LEXICON.get(w) or (_LEXICON.get(w[:-1]) if len(w) > 3 and w.endswith("s") else None)
+        if lang:
+            scores[lang] = scores.get(lang, 0.0) + 1.0
+    return scores
+
+def detect_language(*texts: Optional[str], default: Optional[str] = None) -> Optional[str]:
+    """
+    Code ISO 639-1 d'une langue de SUPPORTED, ou `default` si la saisie ne départage pas
+    (aucun indice, ou égalité entre les deux premières langues).
+    """
+    scores = language_scores("\n".join(t for t in texts if t))
+    ranked = sorted(((s, lang) for lang, s in scores.items() if lang in SUPPORTED), reverse=True)
+    if not ranked or (len(ranked) > 1 and ranked[0][0] == ranked[1][0]):
+        return default
+    return ranked[0][1]
+
+def language_name(code: Optional[str]) -> str:
+    return LANGUAGE_NAMES.get((code or "").lower()[:2], code or "")
+
+def normalize_language(code: Optional[str], choices: Iterable[str] = SUPPORTED) -> Optional[str]:
+    """« EN-us » -> « en » si supporté, sinon None."""
+    c = (code or "").strip().lower()[:2]
+    return c if c in set(choices) else None
@@ -0,0 +1,56 @@
+# src/Chains/model_router.py
+"""
+Choix du modèle pour generate_itinerary_payload.
+
+Deux niveaux : "small" (brouillons, rapide et peu cher) et "large" (70B). Un premier
+jet part sur le petit modèle ; on passe au grand sur demande explicite (refine),
+pour les requêtes complexes (beaucoup d'intérêts saisis par l'utilisateur), ou quand
+la sortie du petit modèle n'est pas un JSON exploitable. Le thème du jour et la liste
+des lieux déjà prévus (générés par le planner) ne comptent pas.
+
+    MODEL_ROUTING=on|off             off : tout sur le grand modèle (comportement historique)
+    DRAFT_MODEL=llama-3.1-8b-instant
+    MODEL_TIERS="overview=large,rain_plan=small"   niveau imposé par section
+"""
+import os
+from typing import Dict, Iterable, List
+
+SMALL, LARGE = "small", "large"
+
+LARGE_MODEL = os.getenv("LARGE_MODEL", "llama-3.3-70b-versatile")
+DRAFT_MODEL = os.getenv("DRAFT_MODEL", "llama-3.1-8b-instant")
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "on").lower() not in ("0", "off", "false", "no")
+
+# Seuil de "requête complexe" (intérêts de l'utilisateur)
+COMPLEX_MIN_INTERESTS = int(os.getenv("COMPLEX_MIN_INTERESTS", "5"))
+
+SECTIONS = ("overview", "morning", "lunch", "afternoon", "evening", "logistics", "rain_plan", "recap", "pois")
+
+def _parse_tiers(raw: str) -> Dict[str, str]:
+    out = {s: SMALL for s in SECTIONS}
+    for item in (raw or "").split(","):
+        if "=" in item:
+            section, tier = (x.strip().lower() for x in item.split("=", 1))
+            if section in out and tier in (SMALL, LARGE):
+                out[section] = tier
+    return out
+
+SECTION_TIERS = _parse_tiers(os.getenv("MODEL_TIERS", ""))
+
+def model_for(tier: str) -> str:
+    return LARGE_MODEL if tier == LARGE else DRAFT_MODEL
+
+def is_complex(interests: List[str]) -> bool:
+    return len([i for i in interests or [] if i and i.strip()]) >= COMPLEX_MIN_INTERESTS
+
+def route(interests: List[str], refine: bool = False, sections: Iterable[str] = SECTIONS) -> tuple:
+    """(niveau, raison) pour un appel couvrant `sections` ; `interests` : ceux saisis par l'utilisateur."""
+    if not MODEL_ROUTING:
+        return LARGE, "routing_off"
+    if refine:
+        return LARGE, "refine"
+    if is_complex(interests):
+        return LARGE, "complex"
+    if any(SECTION_TIERS.get(s) == LARGE for s in sections):
+        return LARGE, "section_config"
+    return SMALL, "draft"
@@ -0,0 +1,218 @@
+# src/Chains/renderer.py
+"""
+Rendu Markdown localisé des itinéraires.
+
+Les gabarits sont compilés une fois par langue (titres, "Ouvrir", "Carte", "Jour"...,
+libellés de l'app) puis réutilisés ; le rendu d'un voyage est un générateur (un morceau
+par jour) pour pouvoir streamer un long voyage vers un fichier sans tout concaténer.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, NamedTuple, TextIO
+
+SECTION_KEYS = ("morning", "lunch", "afternoon", "evening", "logistics", "rain_plan", "recap")
+
+# =================== Libellés par langue ===================
+LABELS: Dict[str, Dict[str, str]] = {
+    "en": {"overview": "Overview", "morning": "Morning", "lunch": "Lunch", "afternoon": "Afternoon",
+           "evening": "Evening", "logistics": "Logistics", "rain_plan": "Plan B (weather)", "recap": "Recap",
+           "maps": "Maps", "route_walk": "Walking route", "open": "Open", "map": "Map", "day": "Day",
+           "route": "Route", "pois_all": "Points of interest (all days)", "no_pois": "No POIs for this day.",
+           "no_stops": "No stops for this day.", "open_maps": "Open in Google Maps",
+           "whole_trip": "Whole trip",
+           "no_route": "No route link for this trip — use the map below if coordinates are available."},
+    "es": {"overview": "Resumen", "morning": "Mañana", "lunch": "Almuerzo", "afternoon": "Tarde",
+           "evening": "Noche", "logistics": "Logística", "rain_plan": "Plan B (clima)", "recap": "Resumen",
+           "maps": "Mapas", "route_walk": "Ruta a pie", "open": "Abrir", "map": "Mapa", "day": "Día",
+           "route": "Ruta", "pois_all": "Puntos de interés (todos los días)", "no_pois": "No hay lugares para este día.",
+           "no_stops": "No hay paradas para este día.", "open_maps": "Abrir en Google Maps",
+           "whole_trip": "Viaje completo",
+           "no_route": "No hay enlace de ruta para este viaje: usa el mapa de abajo si hay coordenadas."},
+    "ar": {"overview": "نظرة عامة", "morning": "الصباح", "lunch": "الغداء", "afternoon": "بعد الظهر",
+           "evening": "المساء", "logistics": "الجوانب اللوجستية", "rain_plan": "الخطة البديلة (الطقس)",
+           "recap": "خلاصة", "maps": "الخرائط", "route_walk": "مسار سير", "open": "فتح", "map": "خريطة",
+           "day": "اليوم", "route": "المسار", "pois_all": "نقاط الاهتمام (كل الأيام)",
+           "no_pois": "لا توجد أماكن لهذا اليوم.",
+           "no_stops": "لا توجد محطات لهذا اليوم.", "open_maps": "فتح في خرائط Google",
+           "whole_trip": "الرحلة كاملة",
+           "no_route": "لا يوجد رابط مسار لهذه الرحلة — استخدم الخريطة أدناه إذا توفرت الإحداثيات."},
+    "fr": {"overview": "Aperçu", "morning": "Matin", "lunch": "Midi", "afternoon": "Après-midi",
+           "evening": "Soir", "logistics": "Logistique", "rain_plan": "Plan B (météo)", "recap": "Récap",
+           "maps": "Cartes", "route_walk": "Itinéraire à pied", "open": "Ouvrir", "map": "Carte", "day": "Jour",
+           "route": "Trajet", "pois_all": "Points d’intérêt (tous les jours)", "no_pois": "Aucun POI pour ce jour.",
+           "no_stops": "Aucune étape pour ce jour.", "open_maps": "Ouvrir dans Google Maps",
+           "whole_trip": "Voyage complet",
+           "no_route": "Pas de lien d’itinéraire pour ce voyage — utilisez la carte ci-dessous si des coordonnées sont disponibles."},
+    "de": {"overview": "Überblick", "morning": "Vormittag", "lunch": "Mittagessen", "afternoon": "Nachmittag",
+           "evening": "Abend", "logistics": "Logistik", "rain_plan": "Plan B (Wetter)", "recap": "Zusammenfassung",
+           "maps": "Karten", "route_walk": "Fußweg", "open": "Öffnen", "map": "Karte", "day": "Tag",
+           "route": "Route", "pois_all": "Sehenswürdigkeiten (alle Tage)", "no_pois": "Keine Orte für diesen Tag.",
+           "no_stops": "Keine Stopps für diesen Tag.", "open_maps": "In Google Maps öffnen",
+           "whole_trip": "Ganze Reise",
+           "no_route": "Kein Routenlink für diese Reise – nutze die Karte unten, falls Koordinaten vorhanden sind."},
+    "it": {"overview": "Panoramica", "morning": "Mattina", "lunch": "Pranzo", "afternoon": "Pomeriggio",
+           "evening": "Sera", "logistics": "Logistica", "rain_plan": "Piano B (meteo)", "recap": "Riepilogo",
+           "maps": "Mappe", "route_walk": "Percorso a piedi", "open": "Apri", "map": "Mappa", "day": "Giorno",
+           "route": "Percorso", "pois_all": "Punti di interesse (tutti i giorni)",
+           "no_pois": "Nessun luogo per questo giorno.",
+           "no_stops": "Nessuna tappa per questo giorno.", "open_maps": "Apri in Google Maps",
+           "whole_trip": "Viaggio completo",
+           "no_route": "Nessun link al percorso per questo viaggio: usa la mappa qui sotto se ci sono coordinate."},
+    "pt": {"overview": "Visão geral", "morning": "Manhã", "lunch": "Almoço", "afternoon": "Tarde",
+           "evening": "Noite", "logistics": "Logística", "rain_plan": "Plano B (tempo)", "recap": "Resumo",
+           "maps": "Mapas", "route_walk": "Rota a pé", "open": "Abrir", "map": "Mapa", "day": "Dia",
+           "route": "Rota", "pois_all": "Pontos de interesse (todos os dias)", "no_pois": "Nenhum local para este dia.",
+           "no_stops": "Nenhuma parada para este dia.", "open_maps": "Abrir no Google Maps",
+           "whole_trip": "Viagem completa",
+           "no_route": "Sem link de rota para esta viagem — use o mapa abaixo se houver coordenadas."},
+    "nl": {"overview": "Overzicht", "morning": "Ochtend", "lunch": "Lunch", "afternoon": "Middag",
+           "evening": "Avond", "logistics": "Logistiek", "rain_plan": "Plan B (weer)", "recap": "Samenvatting",
+           "maps": "Kaarten", "route_walk": "Wandelroute", "open": "Openen", "map": "Kaart", "day": "Dag",
+           "route": "Route", "pois_all": "Bezienswaardigheden (alle dagen)", "no_pois": "Geen plekken voor deze dag.",
+           "no_stops": "Geen stops voor deze dag.", "open_maps": "Openen in Google Maps",
+           "whole_trip": "Hele reis",
+           "no_route": "Geen routelink voor deze reis — gebruik de kaart hieronder als er coördinaten zijn."},
+    "tr": {"overview": "Genel bakış", "morning": "Sabah", "lunch": "Öğle yemeği", "afternoon": "Öğleden sonra",
+           "evening": "Akşam", "logistics": "Lojistik", "rain_plan": "B planı (hava)", "recap": "Özet",
+           "maps": "Haritalar", "route_walk": "Yürüyüş rotası", "open": "Aç", "map": "Harita", "day": "Gün",
+           "route": "Rota", "pois_all": "Gezilecek yerler (tüm günler)", "no_pois": "Bu gün için yer yok.",
+           "no_stops": "Bu gün için durak yok.", "open_maps": "Google Haritalar'da aç",
+           "whole_trip": "Tüm gezi",
+           "no_route": "Bu gezi için rota bağlantısı yok — koordinatlar varsa aşağıdaki haritayı kullanın."},
+    "ru": {"overview": "Обзор", "morning": "Утро", "lunch": "Обед", "afternoon": "После обеда",
+           "evening": "Вечер", "logistics": "Логистика", "rain_plan": "План Б (погода)", "recap": "Итоги",
+           "maps": "Карты", "route_walk": "Пеший маршрут", "open": "Открыть", "map": "Карта", "day": "День",
+           "route": "Маршрут", "pois_all": "Достопримечательности (все дни)", "no_pois": "На этот день мест нет.",
+           "no_stops": "На этот день нет остановок.", "open_maps": "Открыть в Google Картах",
+           "whole_trip": "Вся поездка",
+           "no_route": "Для этой поездки нет ссылки на маршрут — используйте карту ниже, если есть координаты."},
+    "zh": {"overview": "概览", "morning": "上午", "lunch": "午餐", "afternoon": "下午", "evening": "晚上",
+           "logistics": "交通与安排", "rain_plan": "备选方案（天气）", "recap": "小结", "maps": "地图",
+           "route_walk": "步行路线", "open": "打开", "map": "地图", "day": "天", "day_n": "第{n}天",
+           "route": "路线", "pois_all": "景点（全部日程）", "no_pois": "当天没有景点。",
+           "no_stops": "当天没有行程。", "open_maps": "在 Google 地图中打开",
+           "whole_trip": "整个行程",
+           "no_route": "此行程没有路线链接——如有坐标，请使用下方地图。"},
+    "ja": {"overview": "概要", "morning": "午前", "lunch": "昼食", "afternoon": "午後", "evening": "夜",
+           "logistics": "移動・手配", "rain_plan": "代替プラン（天候）", "recap": "まとめ", "maps": "地図",
+           "route_walk": "徒歩ルート", "open": "開く", "map": "地図", "day": "日", "day_n": "{n}日目",
+           "route": "ルート", "pois_all": "見どころ（全日程）", "no_pois": "この日のスポットはありません。",
+           "no_stops": "この日の予定はありません。", "open_maps": "Google マップで開く",
+           "whole_trip": "旅行全体",
+           "no_route": "この旅行のルートリンクはありません。座標がある場合は下の地図を使ってください。"},
+}
+DEFAULT_LANG = "fr"
+
+class Template(NamedTuple):
+    lang: str
+    headings: Dict[str, str]               # compat _headings(): "## Matin"...
+    heads: tuple                           # ("## Aperçu\n", "\n## Matin\n", ..., "\n## Cartes\n- Itinéraire à pied")
+    open_link: str                         # " • [Ouvrir]({})"
+    poi_link: str                          # " • [Carte]({})"
+    day_title: str                         # "# Jour {n} — {date}"
+    day_name: str                          # "Jour {n}" ("第{n}天"...)
+    label: Dict[str, str]
+
+def lang_key(language_code: str) -> str:
+    l = (language_code or DEFAULT_LANG).lower()[:2]
+    return l if l in LABELS else DEFAULT_LANG
+
+@lru_cache(maxsize=None)
+def template(language_code: str) -> Template:
+    """Gabarit compilé d'une langue (mémoïsé ; langues inconnues -> FR)."""
+    lang = lang_key(language_code)
+    L = LABELS[lang]
+    headings = {k: f"## {L[k]}" for k in ("overview", "maps") + SECTION_KEYS}
+    headings["route_walk"] = L["route_walk"]
+    day_name = L.get("day_n") or f"{L['day']} {{n}}"
+    return Template(
+        lang=lang,
+        headings=headings,
+        heads=(headings["overview"] + "\n",)
+              + tuple(f"\n{headings[k]}\n" for k in SECTION_KEYS)
+              + (f"\n{headings['maps']}\n- {L['route_walk']}",),
+        open_link=f" • [{L['open']}]({{}})",
+        poi_link=f" • [{L['map']}]({{}})",
+        day_title=f"# {day_name} — {{date}}",
+        day_name=day_name,
+        label=L,
+    )
+
+# =================== Rendu ===================
+def _bullets(xs: List[Any]) -> str:
+    return "\n".join([f"- {x}" for x in xs]) if xs else ""
+
+def render_day(sections: Dict[str, Any], pois: List[Dict[str, Any]], dir_link: str,
+               language_code: str = DEFAULT_LANG) -> str:
+    T = template(language_code)
+    h_over, h_morn, h_lunch, h_aft, h_eve, h_log, h_rain, h_recap, h_maps = T.heads
+    get, b = sections.get, _bullets
+    md = (f"{h_over}{get('overview', '')}\n{h_morn}{b(get('morning'))}\n{h_lunch}{b(get('lunch'))}\n"
+          f"{h_aft}{b(get('afternoon'))}\n{h_eve}{b(get('evening'))}\n{h_log}{b(get('logistics'))}\n"
+          f"{h_rain}{b(get('rain_plan'))}\n{h_recap}{b(get('recap'))}\n{h_maps}")
+    if dir_link:
+        md += T.open_link.format(dir_link)
+    if pois:
+        poi_link = T.poi_link
+        md += "".join([
+            f"\n- {p.get('label', '')}" + (f" — {p['address']}" if p.get("address") else "")
+            + poi_link.format(p.get("map_link", "")) for p in pois
+        ])
+    return md
+
+def render_transfer(transfer: Dict[str, Any], dir_link: str, language_code: str = DEFAULT_LANG) -> str:
+    """Jour de transfert d'un voyage multi-villes : trajet et lien d'itinéraire."""
+    T = template(language_code)
+    md = f"## {T.label['route']}\n- {transfer.get('from', '')} → {transfer.get('to', '')}"
+    return md + (T.open_link.format(dir_link) if dir_link else "")
+
+def iter_itinerary_markdown(itin: Dict[str, Any]) -> Iterator[str]:
+    """Voyage complet, un morceau par jour (rendu à la demande depuis sections/pois/maps)."""
+    lang = itin.get("language_code") or DEFAULT_LANG
+    T = template(lang)
+    multi = bool(itin.get("legs"))
+    for i, day in enumerate(itin.get("days", []) or []):
+        title = T.day_title.format(n=i + 1, date=day.get("date", ""))
+        if multi and day.get("city") and not day.get("transfer"):
+            title += f" — {day['city']}"
+        dir_link = (day.get("maps") or {}).get("dir_link", "")
+        body = render_transfer(day["transfer"], dir_link, lang) if day.get("transfer") \
+            else render_day(day.get("sections") or {}, day.get("pois") or [], dir_link, lang)
+        yield ("\n---\n" if i else "") + title + "\n\n" + body + "\n"
+
+def iter_legacy_markdown(itin: Dict[str, Any]) -> Iterator[str]:
+    """Ancien format days/stops (stops édités à la main)."""
+    yield f"# ✈️ Itinerary: {itin.get('city','')}\n"
+    for d in itin.get("days", []) or []:
+        yield f"\n## {d.get('date','')}"
+        if d.get("summary"):
+            yield "\n" + d["summary"]
+        for s in d.get("stops", []) or []:
+            meta = []
+            if s.get("category"): meta.append(s["category"])
+            if s.get("duration_min"): meta.append(f"{s['duration_min']} min")
+            if isinstance(s.get("cost_est"), (int, float)): meta.append(f"€{s['cost_est']:.2f}")
+            meta_txt = f" _({' • '.join(meta)})_" if meta else ""
+            yield f"\n- **{s.get('time', '--:--')}** — **{s.get('name', 'Stop')}**{meta_txt}"
+            if s.get("notes"):
+                yield f"\n  - {s['notes']}"
+        yield "\n"
+
+def is_agent_itinerary(itin: Dict[str, Any]) -> bool:
+    return isinstance(itin, dict) and any("sections" in d for d in itin.get("days", []) or [])
+
+def itinerary_markdown(itin: Dict[str, Any]) -> str:
+    """
+    Markdown du voyage, rendu une seule fois puis mémorisé dans itin["markdown"]
+    (à retirer après une modification de l'itinéraire).
+    """
+    md = itin.get("markdown")
+    if not isinstance(md, str) or not md:
+        chunks = iter_itinerary_markdown(itin) if is_agent_itinerary(itin) else iter_legacy_markdown(itin)
+        md = itin["markdown"] = "".join(chunks)
+    return md
+
+def write_markdown(itin: Dict[str, Any], fp: TextIO) -> None:
+    """Écrit le Markdown morceau par morceau (gros voyages, export fichier)."""
+    chunks = iter_itinerary_markdown(itin) if is_agent_itinerary(itin) else iter_legacy_markdown(itin)
+    for chunk in chunks:
+        fp.write(chunk)
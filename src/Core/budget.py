@@ -0,0 +1,151 @@
+# src/Core/budget.py
+import math
+from typing import Optional, Dict, Any, List, Callable
+import pandas as pd
+
+# Poids par défaut d'une catégorie de POI (valeur pour le sélecteur budget)
+CATEGORY_VALUE: Dict[str, float] = {
+    "sight": 3.0,
+    "museum": 3.0,
+    "view": 2.5,
+    "park": 2.0,
+    "food": 2.0,
+}
+DEFAULT_VALUE = 1.0
+
+COST_COLUMNS = ["day_index", "date", "label", "category", "cost_eur"]
+
+# =================== Extraction ===================
+def _as_cost(x: Any) -> Optional[float]:
+    """Coût numérique ou None (str numériques tolérées, NaN/bool rejetés)."""
+    if isinstance(x, bool) or x is None:
+        return None
+    try:
+        v = float(x)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(v) or v < 0 else v
+
+def cost_frame(itin: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Une ligne par dépense (stop ou POI) de l'itinéraire.
+    Les stops priment : ils sont synthétisés depuis les POIs, on ne compte pas deux fois.
+    cost_eur = coût par voyageur (NaN si inconnu).
+    """
+    rows: List[tuple] = []
+    for di, d in enumerate(itin.get("days", []) or []):
+        date_str = d.get("date", "")
+        stops = d.get("stops") or []
+        if stops:
+            for s in stops:
+                rows.append((di, date_str, s.get("name") or "Stop",
+                             s.get("category") or "general", _as_cost(s.get("cost_est"))))
+        else:
+            for p in d.get("pois") or []:
+                rows.append((di, date_str, p.get("label") or p.get("name") or "POI",
+                             p.get("category") or "general", _as_cost(p.get("est_cost_eur"))))
+    df = pd.DataFrame.from_records(rows, columns=COST_COLUMNS)
+    df["cost_eur"] = df["cost_eur"].astype("float64")
+    return df
+
+def day_items(costs: pd.DataFrame, day_index: int) -> List[Dict[str, Any]]:
+    """Dépenses d'un jour, telles que compute_budget les compte (lignes de cost_frame)."""
+    day = costs[costs["day_index"] == day_index]
+    return [{"label": label, "category": category, "est_cost_eur": None if pd.isna(cost) else float(cost)}
+            for label, category, cost in zip(day["label"], day["category"], day["cost_eur"])]
+
+# =================== Agrégation ===================
+def compute_budget(itin: Dict[str, Any], budget_per_day_eur: Optional[float] = None,
+                   travelers: int = 1) -> Dict[str, Any]:
+    """
+    Agrège en une passe vectorisée :
+    {
+      "per_day": DataFrame[day_index, date, items, missing, per_traveler_eur, group_eur, over_budget],
+      "per_category": DataFrame[category, items, per_traveler_eur, group_eur],
+      "total_per_traveler_eur", "total_group_eur", "missing", "days_over_budget"
+    }
+    Les coûts manquants sont comptés (colonne missing) mais valent 0 dans les sommes.
+    """
+    travelers = max(1, int(travelers or 1))
+    df = cost_frame(itin)
+    df["missing"] = df["cost_eur"].isna()
+    df["cost_eur"] = df["cost_eur"].fillna(0.0)
+
+    # Inclut les jours sans dépense pour que chaque jour apparaisse
+    days = pd.DataFrame(
+        [(i, d.get("date", "")) for i, d in enumerate(itin.get("days", []) or [])],
+        columns=["day_index", "date"],
+    )
+    per_day = (
+        df.groupby("day_index")
+          .agg(items=("label", "size"), missing=("missing", "sum"), per_traveler_eur=("cost_eur", "sum"))
+          .reset_index()
+    )
+    per_day = days.merge(per_day, on="day_index", how="left").fillna(
+        {"items": 0, "missing": 0, "per_traveler_eur": 0.0}
+    )
+    per_day = per_day.astype({"items": "int64", "missing": "int64"})
+    per_day["group_eur"] = per_day["per_traveler_eur"] * travelers
+    if budget_per_day_eur:
+        per_day["over_budget"] = per_day["per_traveler_eur"] > float(budget_per_day_eur)
+    else:
+        per_day["over_budget"] = False
+
+    per_category = (
+        df.groupby("category")
+          .agg(items=("label", "size"), per_traveler_eur=("cost_eur", "sum"))
+          .reset_index()
+          .sort_values("per_traveler_eur", ascending=False, ignore_index=True)
+    )
+    per_category["group_eur"] = per_category["per_traveler_eur"] * travelers
+
+    total = float(per_day["per_traveler_eur"].sum())
+    return {
+        "per_day": per_day,
+        "per_category": per_category,
+        "total_per_traveler_eur": total,
+        "total_group_eur": total * travelers,
+        "missing": int(df["missing"].sum()),
+        "days_over_budget": per_day.loc[per_day["over_budget"], "day_index"].tolist(),
+    }
+
+# =================== Sélection sous budget ===================
+def poi_value(poi: Dict[str, Any]) -> float:
+    return CATEGORY_VALUE.get((poi.get("category") or "").lower(), DEFAULT_VALUE)
+
+def select_pois_within_budget(pois: List[Dict[str, Any]], budget_eur: float,
+                              value_fn: Callable[[Dict[str, Any]], float] = poi_value) -> List[Dict[str, Any]]:
+    """
+    Sac à dos 0/1 : sous-ensemble de POIs de valeur maximale dont le coût tient dans budget_eur.
+    Les POIs gratuits ou sans coût connu sont toujours gardés. Coûts arrondis à l'euro supérieur.
+    L'ordre d'origine est conservé.
+    """
+    capacity = max(0, int(math.floor(budget_eur or 0)))
+    free, paid = [], []
+    for i, p in enumerate(pois or []):
+        c = _as_cost(p.get("est_cost_eur", p.get("cost_est")))
+        if not c:
+            free.append(i)
+        else:
+            paid.append((i, int(math.ceil(c)), float(value_fn(p))))
+
+    # best[c] = meilleure valeur pour un coût <= c ; keep[k][c] = item k pris à la capacité c
+    best = [0.0] * (capacity + 1)
+    keep: List[bytearray] = []
+    for _, cost, value in paid:
+        row = bytearray(capacity + 1)
+        for c in range(capacity, cost - 1, -1):
+            cand = best[c - cost] + value
+            if cand > best[c]:
+                best[c] = cand
+                row[c] = 1
+        keep.append(row)
+
+    chosen = set(free)
+    c = capacity
+    for k in range(len(paid) - 1, -1, -1):
+        if keep[k][c]:
+            idx, cost, _ = paid[k]
+            chosen.add(idx)
+            c -= cost
+    return [p for i, p in enumerate(pois or []) if i in chosen]
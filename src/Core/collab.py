@@ -0,0 +1,145 @@
+# src/Core/collab.py
+"""
+Édition d'un voyage à plusieurs, par petits patchs.
+
+Une modification du tableau ne reconstruit plus itin["days"] : l'état de st.data_editor
+(edited_rows / added_rows / deleted_rows) devient quelques opérations JSON Patch sur
+les stops concernés (update / add / move / remove), enregistrées par
+TRIP_STORE.apply_edits() sur la version de base de la vue (concurrence optimiste,
+conflits détectés, rebase des modifications disjointes). Les autres vues récupèrent
+seulement les deltas postérieurs à leur version (pull) : coût proportionnel au
+changement, pas au voyage.
+
+    COLLAB_POLL_S=2    intervalle de vérification de version par vue (0 : pas de mise à jour auto)
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.Core.json_patch import apply_patch
+from src.Core.trip_store import TRIP_STORE, TripStore
+from src.Utils.metrics import REGISTRY
+
+COLLAB_POLL_S = float(os.getenv("COLLAB_POLL_S", "2"))
+
+STOP_FIELDS = ("time", "name", "category", "duration_min", "cost_est", "notes")
+
+# Clés dérivées du contenu, à recalculer après une modification
+_DERIVED_KEYS = ("markdown", "images")
+
+# =================== Opérations sur les stops ===================
+def _stop_path(day: int, idx: Any) -> str:
+    return f"/days/{day}/stops/{idx}"
+
+def new_stop(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Stop saisi dans le tableau (mêmes champs que les stops synthétisés)."""
+    return {
+        "time": row.get("time") or "",
+        "name": row.get("name") or "",
+        "category": row.get("category") or "",
+        "lat": None, "lon": None,
+        "duration_min": row.get("duration_min"),
+        "cost_est": row.get("cost_est"),
+        "notes": row.get("notes") or "",
+    }
+
+def update_stop_ops(itin: Dict[str, Any], day: int, idx: int, fields: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Un replace par champ réellement modifié (add si le stop n'avait pas ce champ)."""
+    stop = itin["days"][day]["stops"][idx]
+    ops = []
+    for k, v in fields.items():
+        if k not in STOP_FIELDS or stop.get(k) == v:
+            continue
+        ops.append({"op": "replace" if k in stop else "add", "path": f"{_stop_path(day, idx)}/{k}", "value": v})
+    return ops
+
+def add_stop_ops(day: int, stop: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Ajout en fin de journée (« /- » : ne décale aucun index, commute avec les autres ajouts)."""
+    return [{"op": "add", "path": _stop_path(day, "-"), "value": stop}]
+
+def remove_stop_ops(day: int, idx: int) -> List[Dict[str, Any]]:
+    return [{"op": "remove", "path": _stop_path(day, idx)}]
+
+def move_stop_ops(day: int, idx: int, to_day: int) -> List[Dict[str, Any]]:
+    """Déplace un stop en fin d'une autre journée."""
+    return [{"op": "move", "from": _stop_path(day, idx), "path": _stop_path(to_day, "-")}]
+
+# =================== Tableau -> patch ===================
+def editor_rows(itin: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Tuple[int, int]]]:
+    """Lignes de st.data_editor et, pour chacune, sa position (jour, index du stop)."""
+    rows, positions = [], []
+    for di, d in enumerate(itin.get("days", []) or []):
+        for si, s in enumerate(d.get("stops", []) or []):
+            rows.append({"day_index": di, "date": d.get("date", ""), "time": s.get("time", ""),
+                         "name": s.get("name", ""), "category": s.get("category", ""),
+                         "duration_min": s.get("duration_min"), "cost_est": s.get("cost_est"),
+                         "notes": s.get("notes", "")})
+            positions.append((di, si))
+    return rows, positions
+
+def _day(value: Any, n_days: int) -> int:
+    return int(value) if isinstance(value, (int, float)) and 0 <= value < n_days else 0
+
+def editor_ops(itin: Dict[str, Any], positions: List[Tuple[int, int]],
+               state: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Patch correspondant à l'état d'un st.data_editor (clés edited_rows, added_rows,
+    deleted_rows). Ordre : champs modifiés (index d'origine), puis suppressions et
+    déplacements du dernier stop au premier (les index restant à traiter ne bougent
+    pas), puis ajouts en fin de journée.
+    """
+    state = state or {}
+    n_days = len(itin.get("days", []) or [])
+    if not n_days:
+        return []
+    deleted = {int(r) for r in state.get("deleted_rows") or [] if int(r) < len(positions)}
+    ops: List[Dict[str, Any]] = []
+    structural: List[Tuple[Tuple[int, int], Optional[int]]] = [(positions[r], None) for r in deleted]
+    for row, changes in (state.get("edited_rows") or {}).items():
+        row = int(row)
+        if row in deleted or row >= len(positions):
+            continue
+        day, idx = positions[row]
+        ops.extend(update_stop_ops(itin, day, idx, changes))
+        if "day_index" in changes and _day(changes["day_index"], n_days) != day:
+            structural.append(((day, idx), _day(changes["day_index"], n_days)))
+    for (day, idx), to_day in sorted(structural, key=lambda x: x[0], reverse=True):
+        ops.extend(remove_stop_ops(day, idx) if to_day is None else move_stop_ops(day, idx, to_day))
+    for row in state.get("added_rows") or []:
+        ops.extend(add_stop_ops(_day(row.get("day_index"), n_days), new_stop(row)))
+    return ops
+
+def has_pending_edits(state: Optional[Dict[str, Any]]) -> bool:
+    state = state or {}
+    return bool(state.get("edited_rows") or state.get("added_rows") or state.get("deleted_rows"))
+
+# =================== Application locale / synchronisation ===================
+def apply_local(itin: Dict[str, Any], ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Applique un patch à l'itinéraire de la session, en place (seules les valeurs des ops sont copiées)."""
+    if ops:
+        itin = apply_patch(itin, ops, in_place=True)
+        for k in _DERIVED_KEYS:
+            itin.pop(k, None)
+    return itin
+
+def pull(trip_id: str, itin: Dict[str, Any], version: int,
+         store: TripStore = TRIP_STORE) -> Tuple[Dict[str, Any], int, int]:
+    """Rattrape les deltas postérieurs à `version` : (itinéraire, nouvelle version, nombre de deltas)."""
+    edits = store.edits_since(trip_id, version)
+    for v, ops in edits:
+        itin, version = apply_local(itin, ops), v
+    if edits:
+        REGISTRY.inc("trip_edits_pulled_total", len(edits))
+    return itin, version, len(edits)
+
+def save(trip_id: Optional[str], itin: Dict[str, Any], version: int, ops: List[Dict[str, Any]],
+         store: TripStore = TRIP_STORE) -> Tuple[Dict[str, Any], int]:
+    """
+    Enregistre `ops` (fait sur `version`) puis met la vue à jour : deltas des autres
+    éditeurs et le sien, dans l'ordre du store. Sans store : application locale seule.
+    Lève trip_store.EditConflict si le patch touche des stops modifiés entre-temps.
+    """
+    if not trip_id or not store.enabled:
+        return apply_local(itin, ops), version
+    store.apply_edits(trip_id, version, ops)
+    itin, version, _ = pull(trip_id, itin, version, store)
+    return itin, version
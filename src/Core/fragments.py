@@ -0,0 +1,159 @@
+# src/Core/fragments.py
+"""
+Réutilisation de journées déjà générées ("fragments") pour composer de nouveaux voyages.
+
+Un fragment = payload d'un jour (generate_itinerary_payload) indexé par
+(ville, thème, mode de transport, langue) + étiquettes d'intérêts. Le compositeur
+choisit pour chaque jour le meilleur fragment (similarité de Jaccard des intérêts,
+sans POI déjà utilisé les jours précédents) et n'appelle le LLM que s'il n'y en a pas.
+Langue inconnue (pas encore détectée) : pas de réutilisation, le fragment imposerait la sienne.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, List, Set, Tuple, Callable, Awaitable
+from src.Core.poi_index import PoiIndex, norm_text
+from src.Utils.serializer import canonical, pack, unpack
+
+FRAGMENT_STORE_PATH = os.getenv("FRAGMENT_STORE_PATH", os.path.join("cache", "fragments.sqlite"))
+FRAGMENT_MIN_SCORE = float(os.getenv("FRAGMENT_MIN_SCORE", "0.5"))
+
+# =================== Normalisation ===================
+def norm_tags(interests: List[str]) -> Set[str]:
+    return {norm_text(i) for i in interests or [] if norm_text(i)}
+
+def city_key(city: str) -> str:
+    """Clé de ville (toutes écritures) ; "" : ville inutilisable, ni stockée ni cherchée."""
+    return norm_text(city) or (city or "").strip().casefold()
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+# =================== Stockage ===================
+class FragmentStore:
+    """Table SQLite indexée par (city, theme, mode, lang) ; une connexion par thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._conn() as c:
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS fragments ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, city TEXT NOT NULL, theme TEXT NOT NULL,"
+                " mode TEXT NOT NULL, lang TEXT NOT NULL, tags TEXT NOT NULL, payload TEXT NOT NULL,"
+                " digest TEXT NOT NULL UNIQUE, ts REAL NOT NULL)"
+            )
+            c.execute("CREATE INDEX IF NOT EXISTS ix_fragments_lookup ON fragments (city, theme, mode, lang)")
+            # Ancienne normalisation ASCII : les villes non latines partageaient la clé "" (irrécupérables)
+            c.execute("DELETE FROM fragments WHERE city = ''")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, city: str, theme: str, interests: List[str], transport_mode: str,
+            payload: Dict[str, Any]) -> None:
+        lang, key = (payload.get("language_code") or "").lower()[:2], city_key(city)
+        if not key or not lang:
+            return
+        tags = json.dumps(sorted(norm_tags(interests)))
+        head = f"{key}|{theme}|{transport_mode}|{tags}|".encode("utf-8")
+        digest = hashlib.sha1(head + canonical(payload)).hexdigest()
+        with self._conn() as c:
+            # Un même payload (ex. servi par le cache) n'est indexé qu'une fois
+            c.execute(
+                "INSERT OR IGNORE INTO fragments (city, theme, mode, lang, tags, payload, digest, ts)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, theme, transport_mode, lang, tags, pack(payload), digest, time.time()),
+            )
+
+    def candidates(self, city: str, theme: str, transport_mode: str, language: Optional[str],
+                   limit: int = 50) -> List[Dict[str, Any]]:
+        """Fragments de la ville, du thème, du mode et de la langue donnés ; aucun si l'une est inconnue."""
+        key, lang = city_key(city), (language or "").lower()[:2]
+        if not key or not lang:
+            return []
+        sql = ("SELECT id, lang, tags, payload FROM fragments WHERE city = ? AND theme = ? AND mode = ? AND lang = ?"
+               " ORDER BY ts DESC LIMIT ?")
+        args: list = [key, theme, transport_mode, lang, limit]
+        return [
+            {"id": fid, "language": lang, "tags": set(json.loads(tags)), "payload": unpack(payload)}
+            for fid, lang, tags, payload in self._conn().execute(sql, args)
+        ]
+
+# =================== Composition ===================
+def best_fragment(candidates: List[Dict[str, Any]], tags: Set[str], used_pois: PoiIndex,
+                  min_score: float = FRAGMENT_MIN_SCORE) -> Optional[Dict[str, Any]]:
+    """Meilleur fragment au-dessus du seuil, sans POI déjà programmé."""
+    best, best_score = None, min_score
+    for cand in candidates:
+        score = jaccard(tags, cand["tags"])
+        if score < best_score or (best is not None and score == best_score):
+            continue
+        if used_pois.overlaps(cand["payload"].get("pois")):
+            continue
+        best, best_score = cand, score
+    return best
+
+class DayComposer:
+    """Fournit le payload d'un jour : fragment réutilisé si possible, sinon LLM (et mémorisation)."""
+
+    def __init__(self, store: Optional[FragmentStore], min_score: float = FRAGMENT_MIN_SCORE):
+        self.store = store
+        self.min_score = min_score
+
+    def day_payload(self, city: str, theme: str, interests: List[str], transport_mode: str,
+                    used_pois: PoiIndex, language: Optional[str],
+                    generate: Callable[[], Dict[str, Any]], reuse: bool = True) -> Tuple[Dict[str, Any], str]:
+        frag = self._reusable(city, theme, interests, transport_mode, used_pois, language) if reuse else None
+        if frag is not None:
+            return frag["payload"], "fragment"
+        payload = generate()
+        self._remember(city, theme, interests, transport_mode, payload)
+        return payload, "llm"
+
+    async def aday_payload(self, city: str, theme: str, interests: List[str], transport_mode: str,
+                           used_pois: PoiIndex, language: Optional[str],
+                           agenerate: Callable[[], Awaitable[Dict[str, Any]]],
+                           reuse: bool = True) -> Tuple[Dict[str, Any], str]:
+        """day_payload() avec une génération asynchrone."""
+        frag = self._reusable(city, theme, interests, transport_mode, used_pois, language) if reuse else None
+        if frag is not None:
+            return frag["payload"], "fragment"
+        payload = await agenerate()
+        self._remember(city, theme, interests, transport_mode, payload)
+        return payload, "llm"
+
+    def _reusable(self, city, theme, interests, transport_mode, used_pois, language) -> Optional[Dict[str, Any]]:
+        if self.store is None:
+            return None
+        cands = self.store.candidates(city, theme, transport_mode, language)
+        return best_fragment(cands, norm_tags(interests), used_pois, self.min_score)
+
+    def _remember(self, city, theme, interests, transport_mode, payload) -> None:
+        if self.store is not None:
+            try:
+                self.store.add(city, theme, interests, transport_mode, payload)
+            except sqlite3.Error:
+                pass
+
+def _default_composer() -> DayComposer:
+    if not FRAGMENT_STORE_PATH:
+        return DayComposer(None)
+    try:
+        return DayComposer(FragmentStore(FRAGMENT_STORE_PATH))
+    except sqlite3.Error:
+        return DayComposer(None)
+
+DAY_COMPOSER = _default_composer()
@@ -0,0 +1,155 @@
+# src/Core/ics.py
+"""
+Export iCalendar (RFC 5545) en streaming.
+
+iter_ics() produit les lignes une à une : texte échappé (\\ ; , retours ligne),
+lignes pliées à 75 octets UTF-8 sans couper un caractère, CRLF, UID/DTSTAMP,
+DTEND = DTSTART + duration_min. Les heures locales de la ville sont converties en
+UTC (suffixe Z) via zoneinfo, ce qui évite d'embarquer un VTIMEZONE ; ville inconnue
+-> heure "flottante" (locale au lecteur), comme l'ancien export. Un jour qui porte sa
+propre ville (voyage multi-villes) utilise le fuseau de celle-ci.
+"""
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo, ZoneInfoNotFoundError = None, Exception
+
+from src.Core.poi_index import norm_text
+from src.Utils.serializer import canonical
+
+PRODID = "-//AI Travel Planner//EN"
+DEFAULT_DURATION_MIN = int(os.getenv("ICS_DEFAULT_DURATION_MIN", "60"))
+
+# Villes fréquentes -> fuseau IANA ; itin["timezone"] est prioritaire
+CITY_TIMEZONES: Dict[str, str] = {
+    "paris": "Europe/Paris", "lyon": "Europe/Paris", "marseille": "Europe/Paris", "nice": "Europe/Paris",
+    "london": "Europe/London", "edinburgh": "Europe/London", "dublin": "Europe/Dublin",
+    "madrid": "Europe/Madrid", "barcelona": "Europe/Madrid", "seville": "Europe/Madrid", "sevilla": "Europe/Madrid",
+    "lisbon": "Europe/Lisbon", "lisboa": "Europe/Lisbon", "porto": "Europe/Lisbon",
+    "rome": "Europe/Rome", "roma": "Europe/Rome", "milan": "Europe/Rome", "florence": "Europe/Rome",
+    "venice": "Europe/Rome", "naples": "Europe/Rome",
+    "berlin": "Europe/Berlin", "munich": "Europe/Berlin", "amsterdam": "Europe/Amsterdam",
+    "brussels": "Europe/Brussels", "bruxelles": "Europe/Brussels", "vienna": "Europe/Vienna",
+    "prague": "Europe/Prague", "budapest": "Europe/Budapest", "zurich": "Europe/Zurich",
+    "geneva": "Europe/Zurich", "geneve": "Europe/Zurich", "copenhagen": "Europe/Copenhagen",
+    "stockholm": "Europe/Stockholm", "oslo": "Europe/Oslo", "athens": "Europe/Athens",
+    "istanbul": "Europe/Istanbul",
+    "marrakech": "Africa/Casablanca", "casablanca": "Africa/Casablanca", "rabat": "Africa/Casablanca",
+    "fes": "Africa/Casablanca", "tangier": "Africa/Casablanca", "cairo": "Africa/Cairo",
+    "tunis": "Africa/Tunis", "dubai": "Asia/Dubai", "doha": "Asia/Qatar",
+    "tokyo": "Asia/Tokyo", "kyoto": "Asia/Tokyo", "osaka": "Asia/Tokyo", "seoul": "Asia/Seoul",
+    "beijing": "Asia/Shanghai", "shanghai": "Asia/Shanghai", "hong kong": "Asia/Hong_Kong",
+    "singapore": "Asia/Singapore", "bangkok": "Asia/Bangkok", "bali": "Asia/Makassar",
+    "new york": "America/New_York", "boston": "America/New_York", "miami": "America/New_York",
+    "chicago": "America/Chicago", "los angeles": "America/Los_Angeles", "san francisco": "America/Los_Angeles",
+    "montreal": "America/Toronto", "toronto": "America/Toronto", "mexico city": "America/Mexico_City",
+    "buenos aires": "America/Argentina/Buenos_Aires", "rio de janeiro": "America/Sao_Paulo",
+    "sydney": "Australia/Sydney", "melbourne": "Australia/Melbourne",
+}
+
+# =================== Fuseau ===================
+def city_timezone(itin: Dict[str, Any]) -> Optional[Any]:
+    """ZoneInfo de la ville du voyage, ou None (heure flottante)."""
+    if ZoneInfo is None:
+        return None
+    city = itin.get("city", "") or ""
+    name = itin.get("timezone") or CITY_TIMEZONES.get(norm_text(city)) \
+        or CITY_TIMEZONES.get(norm_text(city.split(",")[0]))
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+# =================== Format ===================
+def escape_text(value: Any) -> str:
+    """Échappement TEXT (RFC 5545 §3.3.11)."""
+    s = str(value or "")
+    s = s.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+    return s.replace("\r\n", "\\n").replace("\n", "\\n").replace("\r", "\\n")
+
+def fold_line(line: str, limit: int = 75) -> str:
+    """Plie une ligne de contenu à `limit` octets (CRLF + espace), sans couper un caractère UTF-8."""
+    raw = line.encode("utf-8")
+    if len(raw) <= limit:
+        return line + "\r\n"
+    out, start, width = [], 0, limit
+    while start < len(raw):
+        end = min(start + width, len(raw))
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:  # octet de continuation
+            end -= 1
+        out.append(raw[start:end].decode("utf-8"))
+        start, width = end, limit - 1  # l'espace de continuation compte
+    return "\r\n ".join(out) + "\r\n"
+
+def _parse_time(value: Optional[str], default_start: str) -> tuple:
+    for t in (value, default_start, "09:00"):
+        try:
+            h, m = str(t).split(":")[:2]
+            return int(h), int(m)
+        except (TypeError, ValueError):
+            continue
+    return 9, 0
+
+def _fmt(dt: datetime) -> str:
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+# =================== Export ===================
+def itinerary_version(itin: Dict[str, Any]) -> str:
+    """Empreinte du contenu (clé de cache des exports) ; ignore le Markdown mémorisé."""
+    return hashlib.sha1(canonical({k: v for k, v in itin.items() if k != "markdown"})).hexdigest()[:16]
+
+def iter_ics(itin: Dict[str, Any], default_start: str = "09:00", now: Optional[datetime] = None) -> Iterator[str]:
+    """Lignes iCalendar pliées, terminées par CRLF (une VEVENT par stop)."""
+    tz = city_timezone(itin)
+    stamp = _fmt(now or datetime.now(timezone.utc))
+    city = itin.get("city", "")
+
+    yield "BEGIN:VCALENDAR\r\n"
+    yield "VERSION:2.0\r\n"
+    yield f"PRODID:{PRODID}\r\n"
+    yield "CALSCALE:GREGORIAN\r\n"
+    yield fold_line(f"X-WR-CALNAME:{escape_text(f'Trip: {city}' if city else 'Trip')}")
+    if tz is not None:
+        yield fold_line(f"X-WR-TIMEZONE:{tz.key}")
+    for d in itin.get("days", []) or []:
+        try:
+            day = datetime.strptime(d.get("date") or "", "%Y-%m-%d")
+        except ValueError:
+            continue
+        day_tz = city_timezone(d) if d.get("city") or d.get("timezone") else tz
+        for i, s in enumerate(d.get("stops", []) or []):
+            h, m = _parse_time(s.get("time"), default_start)
+            start = day.replace(hour=h % 24, minute=m % 60, tzinfo=day_tz)
+            duration = s.get("duration_min")
+            minutes = int(duration) if isinstance(duration, (int, float)) and duration > 0 else DEFAULT_DURATION_MIN
+            # Durée réelle (en UTC) : correcte aussi un jour de changement d'heure
+            end = (start.astimezone(timezone.utc) if day_tz is not None else start) + timedelta(minutes=minutes)
+            name = s.get("name") or "Visit"
+            uid = hashlib.sha1(f"{city}|{d.get('date')}|{i}|{name}".encode("utf-8")).hexdigest()
+
+            yield "BEGIN:VEVENT\r\n"
+            yield f"UID:{uid}@ai-trip-planner\r\n"
+            yield f"DTSTAMP:{stamp}\r\n"
+            yield f"DTSTART:{_fmt(start)}\r\n"
+            yield f"DTEND:{_fmt(end)}\r\n"
+            yield fold_line(f"SUMMARY:{escape_text(name)}")
+            if s.get("notes"):
+                yield fold_line(f"DESCRIPTION:{escape_text(s['notes'])}")
+            if s.get("address"):
+                yield fold_line(f"LOCATION:{escape_text(s['address'])}")
+            if s.get("category"):
+                yield fold_line(f"CATEGORIES:{escape_text(s['category'])}")
+            yield "END:VEVENT\r\n"
+    yield "END:VCALENDAR\r\n"
+
+def ics_bytes(itin: Dict[str, Any], default_start: str = "09:00") -> bytes:
+    return "".join(iter_ics(itin, default_start)).encode("utf-8")
@@ -0,0 +1,228 @@
+# src/Core/images.py
+"""
+Images des POIs (Wikipedia pageimages, puis Wikidata P18 / Commons), en asynchrone
+sur le client HTTP partagé de src.Utils.aio.
+
+resolve_place_images() cherche les candidats de tous les POIs du voyage en parallèle
+(IMAGE_CONCURRENCY requêtes à la fois), puis attribue les images dans l'ordre du
+voyage pour qu'un même cliché ne serve pas deux fois. Le résultat est gardé hors de
+l'itinéraire (cache du process, clé = POIs du voyage) : il n'apparaît ni dans l'export
+JSON, ni dans le store, ni dans les patchs d'édition, et une modification des POIs
+donne une nouvelle clé.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import urllib.parse
+from typing import Any, Dict, List, Optional, Set
+
+from src.Core.poi_index import PoiIndex, poi_key
+from src.Utils import aio
+from src.Utils.bounded_cache import cache_from_env
+from src.Utils.shared_store import shared_memoize
+from src.Utils.tracing import traced
+
+WIKI_LANGS_ORDER = ["fr", "en", "ar", "es"]
+# Points d'accès des API (surchargés par le banc de charge vers ses serveurs factices)
+WIKIPEDIA_API_URL = os.getenv("WIKIPEDIA_API_URL", "https://{lang}.wikipedia.org/w/api.php")
+WIKIDATA_API_URL = os.getenv("WIKIDATA_API_URL", "https://www.wikidata.org/w/api.php")
+IMAGE_CONCURRENCY = int(os.getenv("IMAGE_CONCURRENCY", "8"))
+# Candidats récupérés par POI avant l'attribution (au-delà : recherche complète, séquentielle)
+IMAGE_CANDIDATES = 3
+
+# Images attribuées par voyage : images_key(itin) -> {pid ou poi_key: url}
+_TRIP_IMAGES = cache_from_env("trip_images", max_entries=256, max_bytes=2 * 1024 * 1024)
+
+def _variants(label: str, city: str) -> List[str]:
+    return [f"{label}, {city}", f"{label} {city}", f"{label} in {city}", f"{label} (landmark)", label]
+
+# =================== Requêtes ===================
+# Les erreurs réseau remontent des fonctions mémoïsées : elles ne sont pas mises en cache
+@shared_memoize("wiki_search", ttl_s=24 * 3600)
+@traced("images.wiki_search_image_candidates")
+async def _wiki_search(query: str, lang: str, limit: int):
+    r = await aio.http_client().get(
+        WIKIPEDIA_API_URL.format(lang=lang),
+        params={
+            "action": "query",
+            "format": "json",
+            "generator": "search",
+            "gsrsearch": query,
+            "gsrlimit": limit,
+            "prop": "pageimages|pageterms|categories",
+            "piprop": "thumbnail",
+            "pithumbsize": 800,
+        },
+    )
+    r.raise_for_status()
+    pages = (r.json().get("query") or {}).get("pages") or {}
+    out = []
+    for _, pg in pages.items():
+        cats = [c.get("title", "") for c in pg.get("categories", [])] if "categories" in pg else []
+        if any("disambiguation" in c.lower() or "homonymie" in c.lower() for c in cats):
+            continue
+        thumb = (pg.get("thumbnail") or {}).get("source")
+        if thumb:
+            out.append((thumb, pg.get("title", ""), pg.get("pageid")))
+    return out
+
+async def wiki_search_image_candidates(query: str, lang: str, limit: int = 5):
+    """Retourne des candidats (thumbnail_url, title, pageid) depuis Wikipedia(lang)."""
+    try:
+        return await _wiki_search(query, lang, limit)
+    except Exception:
+        return []
+
+async def _wikidata_search(term: str, lang: str) -> List[Dict[str, Any]]:
+    r = await aio.http_client().get(
+        WIKIDATA_API_URL,
+        params={"action": "wbsearchentities", "format": "json", "language": lang,
+                "type": "item", "search": term, "limit": 3},
+    )
+    r.raise_for_status()
+    return r.json().get("search") or []
+
+@shared_memoize("wikidata_p18", ttl_s=24 * 3600)
+@traced("images.wikidata_image_filename")
+async def _wikidata_p18(label: str, city: str, lang: str):
+    search = await _wikidata_search(f"{label} ({city})", lang) or await _wikidata_search(label, lang)
+    if not search:
+        return None
+    qid = search[0]["id"]
+    r2 = await aio.http_client().get(
+        WIKIDATA_API_URL,
+        params={"action": "wbgetentities", "format": "json", "ids": qid, "props": "claims"},
+    )
+    r2.raise_for_status()
+    claims = (r2.json().get("entities") or {}).get(qid, {}).get("claims") or {}
+    p18 = claims.get("P18")
+    if not p18:
+        return None
+    return p18[0]["mainsnak"]["datavalue"]["value"]
+
+async def wikidata_image_filename(label: str, city: str, lang: str):
+    """Utilise Wikidata pour chercher P18 (fichier image Commons)."""
+    try:
+        return await _wikidata_p18(label, city, lang)
+    except Exception:
+        return None
+
+def commons_thumb_from_filename(filename: str, width: int = 800):
+    return f"https://commons.wikimedia.org/w/thumb.php?f={urllib.parse.quote(filename)}&w={width}"
+
+# =================== Sélection ===================
+async def unique_place_image(label: str, city: str, used_urls: Set[str]) -> Optional[str]:
+    """Première image non déjà utilisée (Wikipedia multi-langue, puis Wikidata)."""
+    for lang in WIKI_LANGS_ORDER:
+        for q in _variants(label, city):
+            for url, _, _ in await wiki_search_image_candidates(q, lang=lang, limit=8):
+                if url not in used_urls:
+                    used_urls.add(url)
+                    return url
+    return await _wikidata_unique(label, city, used_urls)
+
+async def _wikidata_unique(label: str, city: str, used_urls: Set[str]) -> Optional[str]:
+    for lang in WIKI_LANGS_ORDER:
+        fn = await wikidata_image_filename(label, city, lang)
+        if fn:
+            url = commons_thumb_from_filename(fn, width=800)
+            if url not in used_urls:
+                used_urls.add(url)
+                return url
+    return None
+
+async def _candidates(label: str, city: str, gate: asyncio.Semaphore, want: int = IMAGE_CANDIDATES) -> tuple:
+    """
+    Premières URLs distinctes pour un POI, dans l'ordre de préférence de unique_place_image ;
+    renvoie (urls, exhaustive) — exhaustive : toutes les recherches Wikipedia ont été faites.
+    """
+    out: List[str] = []
+    async with gate:
+        for lang in WIKI_LANGS_ORDER:
+            for q in _variants(label, city):
+                for url, _, _ in await wiki_search_image_candidates(q, lang=lang, limit=8):
+                    if url not in out:
+                        out.append(url)
+                if len(out) >= want:
+                    return out, False
+    return out, True
+
+def _day_pois(day: dict) -> List[dict]:
+    return day.get("pois") or [{"label": s.get("name", ""), "address": s.get("notes", "")}
+                               for s in day.get("stops", [])]
+
+def images_key(itin: dict) -> str:
+    """Empreinte de ce qui détermine les images : ville(s), jours de transfert, libellés et adresses des POIs."""
+    sig = [itin.get("city", "")]
+    for day in itin.get("days", []):
+        sig.append([day.get("city") or "", bool(day.get("transfer")),
+                    [[p.get("label") or p.get("name") or "", p.get("address") or ""] for p in _day_pois(day)]])
+    return hashlib.sha1(json.dumps(sig, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+async def aresolve_place_images(itin: dict) -> dict:
+    """
+    Une recherche d'image par POI unique du voyage (clé canonique, rapprochement approximatif),
+    images distinctes entre POIs. Résultat mémorisé par images_key() : pas de refetch aux reruns.
+    """
+    key = images_key(itin)
+    images = _TRIP_IMAGES.get(key)
+    if images is not None:
+        return images
+    index = PoiIndex()
+    city = itin.get("city", "")
+    order: List[tuple] = []           # (pid, label, ville) dans l'ordre du voyage
+    aliases: Dict[str, str] = {}      # poi_key(label) -> pid
+    seen: Set[str] = set()
+    no_image: Set[str] = set()        # jours de transfert (voyage multi-villes) : pas de recherche
+    for day in itin.get("days", []):
+        if day.get("transfer"):
+            no_image.update(k for k in (poi_key(s.get("name", "")) for s in day.get("stops", [])) if k)
+            continue
+        day_city = day.get("city") or city
+        for p in _day_pois(day):
+            label = p.get("label") or p.get("name") or "POI"
+            pid = index.add(label, p.get("address") or "")
+            if pid not in seen:
+                seen.add(pid)
+                order.append((pid, label, day_city))
+            if poi_key(label):
+                aliases.setdefault(poi_key(label), pid)
+
+    gate = asyncio.Semaphore(max(1, IMAGE_CONCURRENCY))
+    found = await asyncio.gather(*(_candidates(label, where, gate) for _, label, where in order))
+    used_urls: Set[str] = set()
+    images = {}
+    for (pid, label, where), (cands, exhaustive) in zip(order, found):
+        url = next((u for u in cands if u not in used_urls), None)
+        if url is not None:
+            used_urls.add(url)
+        elif exhaustive:
+            url = await _wikidata_unique(label, where, used_urls)
+        else:
+            url = await unique_place_image(label, where, used_urls)
+        images[pid] = url
+    for k, pid in aliases.items():
+        images.setdefault(k, images.get(pid))
+    for k in no_image:
+        images.setdefault(k, None)
+    _TRIP_IMAGES.set(key, images)
+    return images
+
+# =================== Adaptateurs synchrones (Streamlit) ===================
+def resolve_place_images(itin: dict) -> dict:
+    images = _TRIP_IMAGES.get(images_key(itin))
+    return images if images is not None else aio.run_sync(aresolve_place_images(itin))
+
+def place_image(itin: dict, label: str, images: Optional[dict] = None) -> Optional[str]:
+    """`images` : résultat de resolve_place_images() déjà obtenu pendant ce rendu (évite de recalculer la clé)."""
+    images = images if images is not None else resolve_place_images(itin)
+    key = poi_key(label)
+    if key in images:
+        return images[key]
+    # POI ajouté à la main après coup (mémorisé seulement sous une clé non vide)
+    used = set(u for u in images.values() if u)
+    url = aio.run_sync(unique_place_image(label, itin.get("city", ""), used))
+    if key:
+        images[key] = url
+    return url
@@ -0,0 +1,154 @@
+# src/Core/json_patch.py
+"""
+Différences minimales entre deux versions d'un itinéraire, au format JSON Patch
+(RFC 6902 : add / remove / replace / move / test, chemins JSON Pointer).
+
+    ops = diff(old, new)          # [{"op": "replace", "path": "/days/0/stops/2/time", "value": "10:00"}]
+    doc = apply_patch(old, ops)   # == new
+    conflicts(ours, theirs)       # chemins en conflit entre deux patchs faits sur la même version
+"""
+import copy
+from typing import Any, Dict, List
+
+def _esc(token: Any) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+def _unesc(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+def split_path(path: str) -> List[str]:
+    if not path:
+        return []
+    if not path.startswith("/"):
+        raise ValueError(f"Invalid JSON pointer: {path!r}")
+    return [_unesc(t) for t in path[1:].split("/")]
+
+# =================== Diff ===================
+def _is_number(x: Any) -> bool:
+    # 90 et 90.0 sont égaux (st.data_editor renvoie des flottants)
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+def diff(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """Opérations transformant `old` en `new` (récursif sur dicts et listes)."""
+    if _is_number(old) and _is_number(new):
+        return [] if old == new else [{"op": "replace", "path": path, "value": new}]
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
+    if isinstance(old, dict):
+        ops: List[Dict[str, Any]] = []
+        for k in old:
+            if k not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_esc(k)}"})
+        for k, v in new.items():
+            if k not in old:
+                ops.append({"op": "add", "path": f"{path}/{_esc(k)}", "value": copy.deepcopy(v)})
+            else:
+                ops.extend(diff(old[k], v, f"{path}/{_esc(k)}"))
+        return ops
+    if isinstance(old, list):
+        ops = []
+        common = min(len(old), len(new))
+        for i in range(common):
+            ops.extend(diff(old[i], new[i], f"{path}/{i}"))
+        for i in range(common, len(new)):
+            ops.append({"op": "add", "path": f"{path}/{i}", "value": copy.deepcopy(new[i])})
+        for i in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+        return ops
+    if old != new:
+        return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
+    return []
+
+# =================== Application ===================
+def _parent(doc: Any, tokens: List[str]) -> Any:
+    cur = doc
+    for t in tokens:
+        cur = cur[int(t)] if isinstance(cur, list) else cur[t]
+    return cur
+
+def _get(doc: Any, path: str) -> Any:
+    return _parent(doc, split_path(path))
+
+def apply_op(doc: Any, op: Dict[str, Any]) -> Any:
+    """Applique une opération (en place quand c'est possible) et renvoie le document."""
+    kind = op["op"]
+    if kind == "test":
+        if _get(doc, op["path"]) != op["value"]:
+            raise ValueError(f"Test failed at {op['path']}")
+        return doc
+    if kind == "move":
+        value = _get(doc, op["from"])
+        doc = apply_op(doc, {"op": "remove", "path": op["from"]})
+        return apply_op(doc, {"op": "add", "path": op["path"], "value": value})
+    tokens = split_path(op["path"])
+    if not tokens:
+        if kind in ("add", "replace"):
+            return copy.deepcopy(op["value"])
+        raise ValueError("Cannot remove the document root")
+    parent, last = _parent(doc, tokens[:-1]), tokens[-1]
+    if isinstance(parent, list):
+        idx = len(parent) if last == "-" else int(last)
+        if kind == "add":
+            parent.insert(idx, copy.deepcopy(op["value"]))
+        elif kind == "replace":
+            parent[idx] = copy.deepcopy(op["value"])
+        elif kind == "remove":
+            del parent[idx]
+        else:
+            raise ValueError(f"Unsupported op {kind!r}")
+    else:
+        if kind in ("add", "replace"):
+            if kind == "replace" and last not in parent:
+                raise KeyError(op["path"])
+            parent[last] = copy.deepcopy(op["value"])
+        elif kind == "remove":
+            del parent[last]
+        else:
+            raise ValueError(f"Unsupported op {kind!r}")
+    return doc
+
+def apply_patch(doc: Any, ops: List[Dict[str, Any]], in_place: bool = False) -> Any:
+    doc = doc if in_place else copy.deepcopy(doc)
+    for op in ops or []:
+        doc = apply_op(doc, op)
+    return doc
+
+# =================== Conflits ===================
+def _index(token: str) -> bool:
+    return token == "-" or token.isdigit()
+
+def _footprint(ops: List[Dict[str, Any]]) -> tuple:
+    """
+    (chemins lus ou écrits, listes dont les index changent). Un ajout en fin de liste
+    (« /- ») ne décale rien : il ne compte ni comme chemin ni comme changement de structure.
+    """
+    touched, shifted = set(), set()
+    for op in ops or []:
+        for key in ("from", "path"):
+            path = op.get(key)
+            if path is None:
+                continue
+            parent, _, last = path.rpartition("/")
+            if last == "-":
+                continue
+            touched.add(path)
+            if _index(last) and (key == "from" or op["op"] in ("add", "remove")):
+                shifted.add(parent)
+    return touched, shifted
+
+def _under(path: str, prefix: str) -> bool:
+    return path == prefix or path.startswith(prefix + "/")
+
+def conflicts(ours: List[Dict[str, Any]], theirs: List[Dict[str, Any]]) -> List[str]:
+    """
+    Chemins de `ours` en conflit avec `theirs` (deux patchs faits sur la même version).
+    Vide : `ours` s'applique tel quel après `theirs` (rebase sans risque). Conflit quand
+    un chemin est l'ancêtre d'un autre, ou quand une liste dont l'autre patch utilise
+    les index change de structure (insertion, suppression, déplacement).
+    """
+    t_ours, s_ours = _footprint(ours)
+    t_theirs, s_theirs = _footprint(theirs)
+    out = {a for a in t_ours for b in t_theirs if _under(a, b) or _under(b, a)}
+    out.update(a for a in t_ours for lst in s_theirs if _under(a, lst))
+    out.update(lst for lst in s_ours if any(_under(b, lst) for b in t_theirs))
+    return sorted(out)
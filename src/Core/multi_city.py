@@ -0,0 +1,266 @@
+# src/Core/multi_city.py
+"""
+Voyage multi-villes (Paris:3 -> Lyon:2 -> Nice:2).
+
+Chaque étape est un TravelPlanner ordinaire (jours enchaînés, POIs dédoublonnés dans
+la ville). Les étapes sont générées en parallèle, au plus MULTI_CITY_CONCURRENCY à la
+fois et jamais plus que la rafale du limiteur LLM. Tous leurs jours passent par
+l'ordonnanceur au niveau multi-jours, sous le même utilisateur : le round-robin fait
+avancer le voyage d'un jour par tour quel que soit le nombre d'étapes. Un seau à jetons
+propre au voyage limite en plus ses appels à MULTI_CITY_RATE_SHARE du débit du limiteur
+LLM (commun aux pods avec SHARED_STORE_URL) : le reste du quota reste aux autres
+utilisateurs, qui sinon attendraient leurs jetons derrière les étapes.
+
+Entre deux étapes, un jour de transfert porte le trajet inter-villes (lien Google Maps,
+évènement ICS). Le résultat a la forme d'un itinéraire simple (days, language_code,
+usage), avec en plus "city" par jour, "legs" et "maps" (trajet complet).
+
+    MULTI_CITY_CONCURRENCY=3        étapes générées en même temps
+    MULTI_CITY_RATE_SHARE=0.5       part du débit LLM pour un voyage (0 : pas de limite propre)
+    MULTI_CITY_MAX_LEGS=6
+    MULTI_CITY_TRANSFER_DAYS=on     off : l'étape suivante commence le lendemain, sans jour dédié
+    MULTI_CITY_TRANSFER_MODE=transit
+    MULTI_CITY_TRANSFER_MIN=180     durée de l'évènement ICS du transfert
+"""
+import asyncio
+import os
+import re
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.Chains.Itinerary_chain import build_dir_link
+from src.Core.planner import TravelPlanner
+from src.Core.scheduler import PRIORITY_MULTI_DAY
+from src.Utils import rate_limit
+from src.Utils.rate_limit import RateLimiter
+from src.Utils.custom_exception import CustomException
+from src.Utils.logger import get_logger, request_context
+from src.Utils.metrics import REGISTRY
+from src.Utils.tracing import span
+
+logger = get_logger(__name__)
+
+MULTI_CITY_CONCURRENCY = int(os.getenv("MULTI_CITY_CONCURRENCY", "3"))
+MULTI_CITY_RATE_SHARE = float(os.getenv("MULTI_CITY_RATE_SHARE", "0.5"))
+MULTI_CITY_MAX_LEGS = int(os.getenv("MULTI_CITY_MAX_LEGS", "6"))
+MULTI_CITY_TRANSFER_DAYS = os.getenv("MULTI_CITY_TRANSFER_DAYS", "on").lower() in ("1", "on", "true", "yes")
+MULTI_CITY_TRANSFER_MODE = os.getenv("MULTI_CITY_TRANSFER_MODE", "transit")
+MULTI_CITY_TRANSFER_MIN = int(os.getenv("MULTI_CITY_TRANSFER_MIN", "180"))
+MAX_LEG_DAYS = 14
+
+TRANSPORT_MODES = {"walking", "bicycling", "driving", "transit"}
+
+class Leg(NamedTuple):
+    city: str
+    days: int
+
+# =================== Saisie ===================
+_LEG_SEP = re.compile(r"\s*(?:→|->|;|\||\n)\s*")
+_LEG_RE = re.compile(r"^(.*?)(?:\s*:\s*(\d+)\s*(?:d|j|days?|jours?)?)?$", re.I)
+
+def parse_legs(text: str) -> List[Leg]:
+    """« Paris:3 -> Lyon:2 ; Nice » -> [Leg('Paris', 3), Leg('Lyon', 2), Leg('Nice', 1)]."""
+    legs = []
+    for part in _LEG_SEP.split(text or ""):
+        m = _LEG_RE.match(part.strip())
+        city = (m.group(1) if m else part).strip()
+        if city:
+            legs.append(Leg(city, int(m.group(2)) if m and m.group(2) else 1))
+    return legs
+
+def _as_legs(legs: Union[str, Iterable[Union[Leg, Tuple[str, int]]]]) -> List[Leg]:
+    if isinstance(legs, str):
+        return parse_legs(legs)
+    return [Leg(str(city).strip(), int(days)) for city, days in legs]
+
+# =================== Fusion ===================
+def merge_usage(summaries: Sequence[Dict[str, Any]], city: str, days: int, wall_s: float) -> Dict[str, Any]:
+    """Cumul des TripUsage.summary() des étapes ; wall_s est celui du voyage (étapes en parallèle)."""
+    out: Dict[str, Any] = {"city": city, "days": days}
+    for k in ("llm_calls", "cache_hits", "retries", "prompt_tokens", "completion_tokens"):
+        out[k] = sum(int(s.get(k, 0)) for s in summaries)
+    out["cost_usd"] = round(sum(s.get("cost_usd", 0.0) for s in summaries), 6)
+    out["llm_latency_s"] = round(sum(s.get("llm_latency_s", 0.0) for s in summaries), 3)
+    out["wall_s"] = round(wall_s, 3)
+    out["models"] = sorted({m for s in summaries for m in s.get("models", [])})
+    return out
+
+def transfer_day(the_date: date, origin: str, destination: str, mode: str) -> Dict[str, Any]:
+    """Jour de transfert : pas d'appel LLM, un trajet et son lien Google Maps."""
+    return {
+        "date": the_date.isoformat(),
+        "theme": "transfer",
+        "source": "transfer",
+        "city": origin,
+        "transfer": {"from": origin, "to": destination, "mode": mode, "duration_min": MULTI_CITY_TRANSFER_MIN},
+        "sections": {},
+        "pois": [],
+        "maps": {"dir_link": build_dir_link([origin, destination], mode), "transport_mode": mode},
+    }
+
+# =================== Planner ===================
+class MultiCityPlanner(TravelPlanner):
+    def __init__(self):
+        super().__init__()
+        self.legs: List[Leg] = []
+        self.transfer_days: bool = MULTI_CITY_TRANSFER_DAYS
+        self.transfer_mode: str = MULTI_CITY_TRANSFER_MODE
+
+    # ---------- setters ----------
+    def set_legs(self, legs: Union[str, Iterable[Union[Leg, Tuple[str, int]]]]):
+        try:
+            legs = _as_legs(legs)
+            if not legs:
+                raise ValueError("At least one leg is required")
+            if len(legs) > MULTI_CITY_MAX_LEGS:
+                raise ValueError(f"At most {MULTI_CITY_MAX_LEGS} legs")
+            for leg in legs:
+                if not 1 <= leg.days <= MAX_LEG_DAYS:
+                    raise ValueError(f"Days for {leg.city} must be between 1 and {MAX_LEG_DAYS}")
+            self.legs = legs
+            self.city = " → ".join(leg.city for leg in legs)
+            self.trip_days = self.total_days()
+            self.messages.append(HumanMessage(content=self.city))
+            logger.info("Legs set successfully")
+        except Exception as e:
+            logger.error("Error while setting legs: %s", e)
+            raise CustomException("Failed to set legs", e)
+
+    def set_transfer_days(self, enabled: bool):
+        self.transfer_days = bool(enabled)
+        self.trip_days = self.total_days()
+
+    def set_transfer_mode(self, mode: str):
+        try:
+            mode = (mode or "").lower().strip()
+            if mode not in TRANSPORT_MODES:
+                raise ValueError("Invalid transfer mode")
+            self.transfer_mode = mode
+        except Exception as e:
+            logger.error("Error while setting transfer_mode: %s", e)
+            raise CustomException("Failed to set transfer_mode", e)
+
+    # ---------- helpers ----------
+    def total_days(self) -> int:
+        transfers = max(len(self.legs) - 1, 0) if self.transfer_days else 0
+        return max(1, sum(leg.days for leg in self.legs) + transfers)
+
+    def _leg_starts(self) -> List[date]:
+        starts, cursor = [], self.start_date
+        for i, leg in enumerate(self.legs):
+            if i and self.transfer_days:
+                cursor += timedelta(days=1)
+            starts.append(cursor)
+            cursor += timedelta(days=leg.days)
+        return starts
+
+    @staticmethod
+    def _trip_pacer() -> Optional[RateLimiter]:
+        """Seau à jetons du voyage : MULTI_CITY_RATE_SHARE du débit et de la rafale du limiteur LLM."""
+        if MULTI_CITY_RATE_SHARE <= 0:
+            return None
+        shared = rate_limit.LLM_RATE_LIMITER
+        share = min(MULTI_CITY_RATE_SHARE, 1.0)
+        return RateLimiter(shared.rate * share, burst=max(1.0, shared.burst * share))
+
+    def _leg_planner(self, leg: Leg, start: date, language: Optional[str],
+                     pacer: Optional[RateLimiter] = None) -> TravelPlanner:
+        """Planner d'une étape : mêmes réglages, niveau multi-jours, pas de préchargement du jour suivant."""
+        p = TravelPlanner()
+        p.set_city(leg.city)
+        p.set_interests(", ".join(self.interests))
+        p.set_days(leg.days)
+        p.start_date = start
+        p.preferences = self.preferences
+        p.transport_mode = self.transport_mode
+        p.set_session(self.user_id, self.session_id, alive=self.session_alive)
+        p.set_refine(self.refine)
+        p.set_language(language)
+        p.priority = PRIORITY_MULTI_DAY
+        p.prefetch_next = False
+        p.pacer = pacer
+        return p
+
+    def speculate_first_day(self):
+        """Pas de spéculation : self.city désigne tout le voyage (« Paris → Lyon »), pas une ville."""
+        return None
+
+    # ---------- main ----------
+    async def acreate_itinerary(self):
+        with request_context(city=self.city, days=self.trip_days), REGISTRY.inflight("planner_inflight_requests"), \
+                span("planner.create_multi_city", legs=len(self.legs), days=self.trip_days, mode=self.transport_mode):
+            return await self._acreate_itinerary()
+
+    async def _run_legs(self, language: Optional[str]) -> List[Dict[str, Any]]:
+        # Pas plus d'étapes en vol que la rafale du limiteur : un long voyage ne vide pas le seau d'un coup
+        limit = max(1, min(MULTI_CITY_CONCURRENCY, int(rate_limit.LLM_RATE_LIMITER.burst)))
+        sem = asyncio.Semaphore(limit)
+        pacer = self._trip_pacer()
+
+        async def run(i: int, leg: Leg, start: date) -> Dict[str, Any]:
+            async with sem:
+                with request_context(city=leg.city, days=leg.days, leg=i + 1), \
+                        span("planner.leg", leg=i + 1, city=leg.city, days=leg.days):
+                    return await self._leg_planner(leg, start, language, pacer)._acreate_itinerary()
+
+        tasks = [asyncio.ensure_future(run(i, leg, start))
+                 for i, (leg, start) in enumerate(zip(self.legs, self._leg_starts()))]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for t in tasks:  # les jours encore en file sont retirés de l'ordonnanceur
+                t.cancel()
+            raise
+
+    async def _acreate_itinerary(self):
+        try:
+            if not self.legs or not self.interests:
+                raise ValueError("Legs and interests must be set before creating an itinerary.")
+
+            logger.info(
+                "Generating multi-city itinerary | legs=%s | interests=%s | start_date=%s | mode=%s",
+                ", ".join(f"{leg.city}:{leg.days}" for leg in self.legs), self.interests, self.start_date,
+                self.transport_mode
+            )
+            t0 = time.perf_counter()
+            language = self._language()
+            results = await self._run_legs(language)
+
+            days: List[Dict[str, Any]] = []
+            for i, (leg, start, itin) in enumerate(zip(self.legs, self._leg_starts(), results)):
+                if i and self.transfer_days:
+                    days.append(transfer_day(start - timedelta(days=1), self.legs[i - 1].city, leg.city,
+                                             self.transfer_mode))
+                days.extend({**d, "city": leg.city, "leg": i} for d in itin.get("days", []))
+
+            cities = [leg.city for leg in self.legs]
+            itinerary = {
+                "city": self.city,
+                "language_code": language or results[0].get("language_code") or "fr",
+                "legs": [{"city": leg.city, "days": leg.days, "start_date": start.isoformat()}
+                         for leg, start in zip(self.legs, self._leg_starts())],
+                "days": days,
+                "maps": {"dir_link": build_dir_link(cities, self.transfer_mode), "transport_mode": self.transfer_mode},
+                "usage": merge_usage([r.get("usage") or {} for r in results], self.city, len(days),
+                                     time.perf_counter() - t0),
+            }
+            REGISTRY.inc("multi_city_trips_total")
+            REGISTRY.inc("multi_city_legs_total", len(self.legs))
+
+            self.itinerary = itinerary
+            self.messages.append(AIMessage(content=str(itinerary)))
+            summary = itinerary["usage"]
+            logger.info("Multi-city itinerary generated successfully", extra={
+                "latency_s": summary["wall_s"], "prompt_tokens": summary["prompt_tokens"],
+                "completion_tokens": summary["completion_tokens"], "usage": summary
+            })
+            return itinerary
+
+        except Exception as e:
+            err = e if isinstance(e, CustomException) else CustomException("Failed to create itinerary", e)
+            REGISTRY.inc("errors_total", category=err.category)
+            logger.error("Error while creating multi-city itinerary: %s", e, extra={"error_code": err.code})
+            raise err
@@ -1,56 +1,72 @@
-<<<<<<< HEAD
-from datetime import date, timedelta
-from typing import Optional, Dict, Any, List, Union
-from langchain_core.messages import HumanMessage, AIMessage
-from src.Chains.Itinerary_chain import generate_itineary
-from src.Utils.logger import get_logger
-from src.Utils.custom_exception import CustomException
-import re
-=======
 # src/Core/planner.py
 from datetime import date, timedelta
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List, Union, Callable
 from langchain_core.messages import HumanMessage, AIMessage
-from src.Utils.logger import get_logger
+from src.Utils.logger import get_logger, request_context
 from src.Utils.custom_exception import CustomException
-from src.Chains.Itinerary_chain import generate_itinerary_payload
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
+from src.Utils.metrics import trip_scope, REGISTRY
+from src.Utils.tracing import span
+from src.Utils import aio
+import asyncio
+from src.Chains.Itinerary_chain import agenerate_itinerary_payload, poi_dir_link, itinerary_cache_key
+from src.Chains.itinerary_cache import ITINERARY_CACHE
+from src.Chains.language import LANGUAGE_DETECT, detect_language
+from src.Core.fragments import DAY_COMPOSER
+from src.Core.poi_index import PoiIndex
+from src.Core.scheduler import LLM_SCHEDULER, PRIORITY_INTERACTIVE, PRIORITY_MULTI_DAY
+from src.Core.speculative import SPECULATOR, day_key
 
 logger = get_logger(__name__)
 
+# Thèmes tournants pour varier les journées (aussi utilisés par le préchauffage du cache)
+DAY_THEMES = [
+    "museums & landmarks",
+    "neighborhoods & hidden gems",
+    "parks & outdoors",
+    "food & markets",
+    "architecture & photography spots",
+    "family-friendly activities",
+    "nightlife & entertainment",
+]
+
+def day_theme(idx: int) -> str:
+    return DAY_THEMES[idx % len(DAY_THEMES)]
+
+def day_interests(interests: List[str], idx: int) -> List[str]:
+    """Intérêts envoyés au LLM pour le jour idx (ordre gardé, sans doublon)."""
+    return list(dict.fromkeys(list(interests) + [day_theme(idx)]))
+
 class TravelPlanner:
     def __init__(self):
         self.messages: List[Union[HumanMessage, AIMessage]] = []
         self.city: str = ""
         self.interests: List[str] = []
-<<<<<<< HEAD
-        self.itineary: Union[str, Dict[str, Any]] = ""
-        # NEW:
-        self.trip_days: int = 1
-        self.start_date: date = date.today()
-        self.preferences: Dict[str, Any] = {}
-
-=======
         self.itinerary: Union[str, Dict[str, Any]] = ""
         self.trip_days: int = 1
         self.start_date: date = date.today()
         self.preferences: Dict[str, Any] = {}
         self.transport_mode: str = "walking"
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
+        self.composer = DAY_COMPOSER
+        self.scheduler = LLM_SCHEDULER
+        self.speculator = SPECULATOR
+        self.user_id: str = ""
+        self.session_id: Optional[str] = None
+        self.session_alive: Optional[Callable[[], bool]] = None
+        self.refine: bool = False
+        self.language: Optional[str] = None
+        self.priority: Optional[int] = None   # imposée (étapes d'un voyage multi-villes)
+        self.prefetch_next: bool = True
+        self.pacer: Optional[Any] = None      # RateLimiter propre au voyage, pris avant l'ordonnanceur
         logger.info("Initialized TravelPlanner instance")
 
     # ---------- setters ----------
     def set_city(self, city: str):
         try:
-<<<<<<< HEAD
-            self.city = city
-=======
             self.city = city.strip()
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
             self.messages.append(HumanMessage(content=city))
             logger.info("City set successfully")
         except Exception as e:
-            logger.error(f"Error while setting city: {e}")
+            logger.error("Error while setting city: %s", e)
             raise CustomException("Failed to set city", e)
 
     def set_interests(self, interests_str: str):
@@ -59,18 +75,14 @@ class TravelPlanner:
             self.messages.append(HumanMessage(content=interests_str))
             logger.info("Interests set successfully")
         except Exception as e:
-            logger.error(f"Error while setting interests: {e}")
+            logger.error("Error while setting interests: %s", e)
             raise CustomException("Failed to set interests", e)
 
-<<<<<<< HEAD
-    # NEW: optional controls used by your Streamlit UI
-=======
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
     def set_days(self, days: int):
         try:
             self.trip_days = max(1, int(days))
         except Exception as e:
-            logger.error(f"Error while setting days: {e}")
+            logger.error("Error while setting days: %s", e)
             raise CustomException("Failed to set days", e)
 
     def set_start_date(self, start_date_str: str):
@@ -78,66 +90,16 @@ class TravelPlanner:
             y, m, d = map(int, start_date_str.split("-"))
             self.start_date = date(y, m, d)
         except Exception as e:
-            logger.error(f"Error while setting start_date: {e}")
+            logger.error("Error while setting start_date: %s", e)
             raise CustomException("Failed to set start_date", e)
 
     def set_preferences(self, prefs: Dict[str, Any]):
         try:
             self.preferences = prefs or {}
         except Exception as e:
-            logger.error(f"Error while setting preferences: {e}")
+            logger.error("Error while setting preferences: %s", e)
             raise CustomException("Failed to set preferences", e)
 
-<<<<<<< HEAD
-    # ---------- helpers ----------
-    def _text_to_stops(self, text: str) -> List[Dict[str, Any]]:
-        """
-        Heuristic: split lines, try to capture times, build simple stop rows.
-        Works with bullet/numbered lists or plain paragraphs.
-        """
-        lines = [l.strip("•-–— ").strip() for l in text.splitlines() if l.strip()]
-        stops: List[Dict[str, Any]] = []
-        for l in lines:
-            # Capture 09:00 / 9:00 AM / 9 AM patterns
-            m = re.search(r'(\b\d{1,2}(:\d{2})?\s*(AM|PM)?\b)', l, flags=re.I)
-            t = m.group(1) if m else ""
-            name = l.split(":")[0][:60] if ":" in l else (l[:60] or "Stop")
-            stops.append({
-                "time": t,
-                "name": name,
-                "category": "general",
-                "lat": None, "lon": None,
-                "duration_min": None,
-                "cost_est": None,
-                "notes": l
-            })
-        if not stops:
-            stops = [{
-                "time": "09:00",
-                "name": "Your plan",
-                "category": "general",
-                "lat": None, "lon": None,
-                "duration_min": None,
-                "cost_est": None,
-                "notes": text
-            }]
-        return stops
-
-    def _normalize_day_payload(self, raw_day: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
-        """
-        Accept dict (must contain 'stops') or string (parse into stops).
-        """
-        if isinstance(raw_day, dict):
-            raw_day.setdefault("summary", "")
-            raw_day.setdefault("stops", [])
-            return raw_day
-        return {
-            "summary": "Generated itinerary",
-            "stops": self._text_to_stops(raw_day)
-        }
-
-    # Themes to avoid repeating the same plan every day
-=======
     def set_transport_mode(self, mode: str):
         try:
             mode = (mode or "").lower().strip()
@@ -145,130 +107,188 @@ class TravelPlanner:
                 raise ValueError("Invalid transport mode")
             self.transport_mode = mode
         except Exception as e:
-            logger.error(f"Error while setting transport_mode: {e}")
+            logger.error("Error while setting transport_mode: %s", e)
             raise CustomException("Failed to set transport_mode", e)
 
+    def set_session(self, user_id: str, session_id: Optional[str] = None,
+                    alive: Optional[Callable[[], bool]] = None):
+        """Propriétaire des appels LLM (équité de l'ordonnanceur) et test de vie de sa session."""
+        self.user_id = user_id or ""
+        self.session_id = session_id
+        self.session_alive = alive
+
+    def set_refine(self, refine: bool):
+        """Régénère avec le grand modèle, sans réutiliser cache ni fragments."""
+        self.refine = bool(refine)
+
+    def set_language(self, language: Optional[str]):
+        """Langue imposée (code ISO) ; None : détectée localement sur la ville et les intérêts."""
+        self.language = (language or "").strip().lower()[:2] or None
+
     # ---------- helpers ----------
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
     def _day_theme(self, idx: int) -> str:
-        pool = [
-            "museums & landmarks",
-            "neighborhoods & hidden gems",
-            "parks & outdoors",
-            "food & markets",
-            "architecture & photography spots",
-            "family-friendly activities",
-            "nightlife & entertainment",
-        ]
-        return pool[idx % len(pool)]
+        return day_theme(idx)
+
+    def _language(self) -> Optional[str]:
+        """Langue fixée avant l'appel (prompt, clé de cache, titres) ; None : le modèle la détecte."""
+        if self.language or not LANGUAGE_DETECT:
+            return self.language
+        return detect_language(self.city, ", ".join(self.interests))
+
+    def _priority(self) -> int:
+        if self.priority is not None:
+            return self.priority
+        return PRIORITY_INTERACTIVE if self.trip_days == 1 else PRIORITY_MULTI_DAY
+
+    def _dedup_day(self, payload: Dict[str, Any], used_pois: PoiIndex) -> Dict[str, Any]:
+        """
+        Retire les POIs déjà programmés un jour précédent (rapprochement approximatif),
+        indexe les autres et reconstruit le lien d'itinéraire si la liste a changé
+        (le Markdown est rendu plus tard, à la demande, par src.Chains.renderer).
+        """
+        pois = payload.get("pois", []) or []
+        kept = []
+        for p in pois:
+            label, addr = p.get("label") or p.get("name") or "", p.get("address") or ""
+            if used_pois.match(label, addr) is not None:
+                continue
+            p["poi_id"] = used_pois.add(label, addr)
+            kept.append(p)
+        if len(kept) == len(pois):
+            return payload
+
+        REGISTRY.inc("poi_duplicates_removed_total", len(pois) - len(kept))
+        mode = (payload.get("maps") or {}).get("transport_mode") or self.transport_mode
+        dir_link = poi_dir_link(kept, mode)
+        return {**payload, "pois": kept, "maps": {"dir_link": dir_link, "transport_mode": mode}}
+
+    def _day_call(self, idx: int, exclude: List[str]) -> Callable[[], Any]:
+        """Fabrique de coroutine pour le jour idx (paramètres figés à l'appel)."""
+        city, interests, mode, refine = self.city, day_interests(self.interests, idx), self.transport_mode, self.refine
+        language, user_interests = self._language(), list(self.interests)
+        return lambda: agenerate_itinerary_payload(
+            city=city, interests=interests, transport_mode=mode, exclude=exclude, refine=refine, language=language,
+            user_interests=user_interests
+        )
+
+    async def _agenerate_day(self, idx: int, exclude: List[str]) -> Dict[str, Any]:
+        """Appel LLM d'un jour : spéculation correspondante si elle existe, sinon via l'ordonnanceur."""
+        if not self.refine:
+            fut = self.speculator.claim(day_key(self.city, day_interests(self.interests, idx),
+                                                self.transport_mode, exclude, self._language()))
+            if fut is not None:
+                try:
+                    return await asyncio.wrap_future(fut)
+                except Exception as e:
+                    logger.warning("Speculative result unusable, generating again: %s", e)
+        if self.pacer is not None and not ITINERARY_CACHE.contains(
+                itinerary_cache_key(self.city, day_interests(self.interests, idx), self.transport_mode,
+                                    self._language())):
+            await self.pacer.aacquire()
+        return await self.scheduler.arun(
+            self._day_call(idx, exclude),
+            user=self.user_id or self.session_id or "",
+            priority=self._priority(),
+            session=self.session_id,
+            alive=self.session_alive
+        )
+
+    # ---------- spéculation ----------
+    def speculate_first_day(self):
+        """À appeler à chaque rerun du formulaire : prépare le jour 1 si la saisie reste stable."""
+        if self.city and self.interests:
+            self._speculate(0, [], debounce=True)
+
+    def _speculate(self, idx: int, exclude: List[str], debounce: bool = False):
+        if not self.speculator.enabled or not self.session_id or self.refine:
+            return
+        interests, language = day_interests(self.interests, idx), self._language()
+        if ITINERARY_CACHE.contains(itinerary_cache_key(self.city, interests, self.transport_mode, language)):
+            return  # la vraie requête sera servie par le cache
+        submit = self.speculator.observe if debounce else self.speculator.start
+        submit(self.session_id, day_key(self.city, interests, self.transport_mode, exclude, language),
+               self._day_call(idx, list(exclude)), user=self.user_id, alive=self.session_alive)
 
     # ---------- main ----------
-<<<<<<< HEAD
-    def create_itineary(self):
-=======
     def create_itinerary(self):
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
+        """Adaptateur synchrone (Streamlit) de acreate_itinerary."""
+        return aio.run_sync(self.acreate_itinerary())
+
+    async def acreate_itinerary(self):
+        with request_context(city=self.city, days=self.trip_days), REGISTRY.inflight("planner_inflight_requests"), \
+                span("planner.create_itinerary", city=self.city, days=self.trip_days, mode=self.transport_mode):
+            return await self._acreate_itinerary()
+
+    async def _acreate_itinerary(self):
         try:
             if not self.city or not self.interests:
                 raise ValueError("City and interests must be set before creating an itinerary.")
 
             logger.info(
-                f"Generating itinerary | city={self.city} | interests={self.interests} | "
-<<<<<<< HEAD
-                f"days={self.trip_days} | start_date={self.start_date}"
+                "Generating itinerary | city=%s | interests=%s | days=%s | start_date=%s | mode=%s",
+                self.city, self.interests, self.trip_days, self.start_date, self.transport_mode
             )
 
-            # Build one day at a time so each day can be different
             days_payload: List[Dict[str, Any]] = []
-=======
-                f"days={self.trip_days} | start_date={self.start_date} | mode={self.transport_mode}"
-            )
+            language_code: Optional[str] = self._language()
+            used_pois = PoiIndex()
 
-            days_payload: List[Dict[str, Any]] = []
-            all_markdown: List[str] = []
-            language_code: Optional[str] = None
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
-
-            for d in range(self.trip_days):
-                the_date = (self.start_date + timedelta(days=d)).isoformat()
-                theme = self._day_theme(d)
-<<<<<<< HEAD
-
-                # Mix user's interests with the day's theme
-                day_interests = list(dict.fromkeys(self.interests + [theme]))  # keep order, deduplicate
-
-                # Call your existing chain. Signature is (city, interests).
-                # We vary interests by day to force different content.
-                raw = generate_itineary(self.city, day_interests)
-
-                # If your chain ever returns a full itinerary dict with "days", return it as-is.
-                if isinstance(raw, dict) and "days" in raw:
-                    self.itineary = raw
-                    self.messages.append(AIMessage(content=str(raw)))
-                    logger.info("Itinerary generated (structured multi-day) successfully")
-                    return raw
-
-                day_obj = self._normalize_day_payload(raw)
-                days_payload.append({
-                    "date": the_date,
-                    "summary": f"Day {d+1}: Focus on {theme}",
-                    "stops": day_obj.get("stops", [])
-                })
+            with trip_scope(city=self.city, days=self.trip_days) as usage:
+                for d in range(self.trip_days):
+                    the_date = (self.start_date + timedelta(days=d)).isoformat()
+                    theme = self._day_theme(d)
 
-            itinerary = {
-                "city": self.city,
-                "days": days_payload
-            }
+                    with span("planner.day", day=d + 1, theme=theme) as sp:
+                        payload, source = await self.composer.aday_payload(
+                            self.city, theme, self.interests, self.transport_mode,
+                            used_pois=used_pois, language=language_code, reuse=not self.refine,
+                            agenerate=lambda: self._agenerate_day(d, used_pois.labels())
+                        )
+                        sp.set_attribute("source", source)
+                    if source == "fragment":
+                        REGISTRY.inc("fragment_reuse_total")
+                    payload = self._dedup_day(payload, used_pois)
 
-            self.itineary = itinerary
-            self.messages.append(AIMessage(content=str(itinerary)))
-            logger.info("Itinerary generated (normalized per-day) successfully")
-=======
-                day_interests = list(dict.fromkeys(self.interests + [theme]))
-
-                payload = generate_itinerary_payload(
-                    city=self.city,
-                    interests=day_interests,
-                    transport_mode=self.transport_mode
-                )
-
-                language_code = language_code or payload.get("language_code", "fr")
-                markdown = payload.get("markdown", "")
-                sections = payload.get("sections", {}) or {}
-                pois = payload.get("pois", []) or []
-                maps = payload.get("maps", {}) or {}
-
-                days_payload.append({
-                    "date": the_date,
-                    "theme": theme,
-                    "sections": sections,
-                    "pois": pois,
-                    "maps": maps
-                })
-
-                title = f"# Jour {d+1} — {the_date}"
-                all_markdown.append(f"{title}\n\n{markdown}\n")
+                    language_code = language_code or payload.get("language_code", "fr")
+                    sections = payload.get("sections", {}) or {}
+                    pois = payload.get("pois", []) or []
+                    maps = payload.get("maps", {}) or {}
+
+                    days_payload.append({
+                        "date": the_date,
+                        "theme": theme,
+                        "source": source,
+                        "sections": sections,
+                        "pois": pois,
+                        "maps": maps
+                    })
+
+            if self.prefetch_next and self.trip_days < 14:
+                # le jour suivant est souvent demandé juste après
+                self._speculate(self.trip_days, used_pois.labels())
 
             itinerary = {
                 "city": self.city,
                 "language_code": language_code or "fr",
                 "days": days_payload,
-                "markdown": "\n---\n".join(all_markdown)
+                "usage": usage.summary()
             }
 
             self.itinerary = itinerary
             self.messages.append(AIMessage(content=str(itinerary)))
-            logger.info("Itinerary generated successfully (multilang + maps)")
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
+            summary = itinerary["usage"]
+            logger.info("Itinerary generated successfully (multilang + maps)", extra={
+                "latency_s": summary["wall_s"], "prompt_tokens": summary["prompt_tokens"],
+                "completion_tokens": summary["completion_tokens"], "usage": summary
+            })
             return itinerary
 
         except Exception as e:
-            logger.error(f"Error while creating itinerary: {e}")
-            raise CustomException("Failed to create itinerary", e)
-<<<<<<< HEAD
-=======
+            err = e if isinstance(e, CustomException) else CustomException("Failed to create itinerary", e)
+            REGISTRY.inc("errors_total", category=err.category)
+            logger.error("Error while creating itinerary: %s", e, extra={"error_code": err.code})
+            raise err
 
     # Compat nom historique
     def create_itineary(self):
         return self.create_itinerary()
->>>>>>> bf39601136ce8923cfbc7e0af62dfcd38c3f6192
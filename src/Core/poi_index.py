@@ -0,0 +1,132 @@
+# src/Core/poi_index.py
+"""
+Index des POIs d'un voyage : nom + adresse canonisés, rapprochement approximatif
+("Musée du Louvre" ~ "Louvre Museum"), un identifiant par lieu unique.
+
+Le type du lieu (musée, parc, marché, pont...) reste discriminant : "Musée d'Orsay" et
+"Gare d'Orsay" sont deux lieux. Un rapprochement qui ne repose que sur un mot
+("The Louvre" ~ "Musée du Louvre") exige des adresses concordantes.
+"""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Optional, Dict, Any, List, Set, Tuple
+
+# Mots qui ne distinguent pas un lieu d'un autre
+_ARTICLES = {
+    "the", "a", "an", "of", "de", "du", "des", "la", "le", "les", "l", "d", "el", "los", "las", "il",
+    "lo", "di", "del", "della", "do", "da", "dos", "das",
+}
+
+# Types de lieux (toutes langues) -> type canonique
+_TYPES: Dict[str, str] = {word: kind for kind, words in {
+    "museum": "museum musee museo museu", "church": "church eglise iglesia chiesa igreja",
+    "cathedral": "cathedral cathedrale catedral cattedrale duomo", "park": "park parc parque parco",
+    "garden": "garden gardens jardin jardins giardino jardim", "square": "place plaza piazza square praca platz",
+    "tower": "tower tour torre", "market": "market marche mercado mercato", "bridge": "bridge pont ponte puente",
+    "station": "station gare estacion stazione", "street": "street rue calle via avenue boulevard",
+    "palace": "palace palais palacio palazzo", "castle": "castle chateau castillo castello",
+}.items() for word in words.split()}
+
+NAME_THRESHOLD = 0.86
+SUBSET_RATIO = 0.8       # nom inclus dans l'autre (>= 2 mots) : ressemblance minimale
+ADDRESS_MISMATCH = 0.45
+ADDRESS_MATCH = 0.7      # concordance exigée pour un rapprochement sur un seul mot
+
+# Marques combinantes gardées : (han)dakuten des kana (ガ ≠ カ)
+_KEEP_MARKS = {"\u3099", "\u309a"}
+_WORD_RE = re.compile(r"[^\W_]+")
+
+def norm_text(s: str) -> str:
+    """
+    Casse repliée, sans accents ni ponctuation, mots séparés par un espace. Toutes écritures :
+    "Musée" -> "musee", "Красная площадь" -> "красная площадь", "東京タワー" inchangé.
+    """
+    s = unicodedata.normalize("NFKD", s or "")
+    s = "".join(c for c in s if not unicodedata.combining(c) or c in _KEEP_MARKS)
+    return " ".join(_WORD_RE.findall(unicodedata.normalize("NFC", s).casefold()))
+
+def _parse(label: str) -> Tuple[frozenset, frozenset]:
+    """(types canoniques, autres mots) ; un nom fait seulement d'un type ("The Market") reste son propre nom."""
+    toks = [t for t in norm_text(label).split() if t not in _ARTICLES]
+    types = frozenset(_TYPES[t] for t in toks if t in _TYPES)
+    rest = frozenset(t for t in toks if t not in _TYPES)
+    return (types, rest) if rest else (frozenset(), types)
+
+def canonical_name(label: str) -> str:
+    types, rest = _parse(label)
+    return " ".join(sorted(types | rest)) or norm_text(label)
+
+def canonical_address(address: str) -> str:
+    return norm_text(address)
+
+def poi_key(label: str) -> str:
+    """
+    Clé exacte (sans rapprochement) ; suffisante pour relire un index déjà dédupliqué.
+    "" pour un libellé sans lettre ni chiffre : ce n'est pas une clé utilisable.
+    """
+    return canonical_name(label)
+
+def _similar(a: frozenset, b: frozenset) -> float:
+    if a == b:
+        return 1.0
+    ratio = SequenceMatcher(None, " ".join(sorted(a)), " ".join(sorted(b))).ratio()
+    if min(len(a), len(b)) >= 2 and (a <= b or b <= a) and ratio >= SUBSET_RATIO:
+        return max(ratio, 0.95)
+    return ratio
+
+class PoiIndex:
+    def __init__(self, threshold: float = NAME_THRESHOLD):
+        self.threshold = threshold
+        self._ids: Set[str] = set()
+        self._entries: List[Tuple[str, frozenset, frozenset, str, str]] = []  # (id, types, mots, adresse, label)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def match(self, label: str, address: str = "") -> Optional[str]:
+        """Identifiant du lieu déjà indexé correspondant, sinon None."""
+        types, rest = _parse(label)
+        addr = canonical_address(address)
+        if not rest:
+            return None
+        for pid, e_types, e_rest, e_addr, _ in self._entries:
+            # Deux types connus et différents : deux lieux (musée / gare, place / pont)
+            if types and e_types and types != e_types:
+                continue
+            score = _similar(rest, e_rest)
+            if score < self.threshold:
+                continue
+            addr_ratio = SequenceMatcher(None, addr, e_addr).ratio() if addr and e_addr else None
+            # Même nom mais adresses clairement différentes : deux lieux (ex. chaînes)
+            if addr_ratio is not None and addr_ratio < ADDRESS_MISMATCH:
+                continue
+            exact = score == 1.0 and types == e_types
+            if not exact and min(len(rest), len(e_rest)) < 2 and (addr_ratio is None or addr_ratio < ADDRESS_MATCH):
+                continue
+            return pid
+        return None
+
+    def add(self, label: str, address: str = "") -> str:
+        pid = self.match(label, address)
+        if pid is not None:
+            return pid
+        types, rest = _parse(label)
+        name = canonical_name(label) or "poi"
+        pid = name if name not in self._ids else f"{name}#{len(self._entries)}"
+        self._ids.add(pid)
+        self._entries.append((pid, types, rest, canonical_address(address), label))
+        return pid
+
+    def __contains__(self, label: str) -> bool:
+        return self.match(label) is not None
+
+    def overlaps(self, pois: List[Dict[str, Any]]) -> bool:
+        return any(self.match(p.get("label") or p.get("name") or "", p.get("address") or "") for p in pois or [])
+
+    def labels(self) -> List[str]:
+        """Libellés d'origine, pour les exclusions dans le prompt."""
+        return [label for *_, label in self._entries]
+
+    def ids(self) -> Set[str]:
+        return set(self._ids)
@@ -0,0 +1,163 @@
+# src/Core/prewarm.py
+"""
+Préchauffage hors-ligne du cache d'itinéraires pour les destinations populaires.
+
+    python -m src.Core.prewarm combos.csv --days 3 --concurrency 4 --rpm 30
+    python -m src.Core.prewarm combos.jsonl --fake          # sans appel réseau
+
+Entrée : CSV (colonnes city, interests, transport_mode, language facultative) ou JSONL
+avec les mêmes clés ; interests = "museums, coffee" ou liste. Sans `language`, la langue
+est détectée comme dans TravelPlanner, pour que les clés de cache correspondent. Pour chaque combinaison, on génère les payloads
+des `--days` premiers jours (intérêts + thème du jour, comme TravelPlanner) via
+agenerate_itinerary_payload, qui les écrit dans le cache.
+Les clés terminées sont ajoutées au fichier --checkpoint : une relance reprend où elle s'était arrêtée.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, List, Iterator, Set
+
+from src.Chains.Itinerary_chain import agenerate_itinerary_payload, itinerary_cache_key
+from src.Chains.itinerary_cache import ITINERARY_CACHE
+from src.Chains.language import LANGUAGE_DETECT, detect_language
+from src.Core.planner import day_interests
+from src.Core.scheduler import LLM_SCHEDULER, PRIORITY_BATCH
+from src.Utils import aio
+from src.Utils.logger import get_logger
+from src.Utils.rate_limit import set_llm_rate_limit
+
+logger = get_logger(__name__)
+
+TRANSPORT_MODES = {"walking", "bicycling", "driving", "transit"}
+
+# =================== Entrée ===================
+def _parse_interests(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [str(i).strip() for i in value if str(i).strip()]
+    return [i.strip() for i in str(value or "").split(",") if i.strip()]
+
+def load_combos(path: str) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            raw = (json.loads(line) for line in f if line.strip())
+        else:
+            raw = csv.DictReader(f)
+        for r in raw:
+            city = (r.get("city") or "").strip()
+            interests = _parse_interests(r.get("interests"))
+            mode = (r.get("transport_mode") or "walking").strip().lower()
+            if not city or not interests or mode not in TRANSPORT_MODES:
+                logger.warning("Skipping invalid combo: %s", r)
+                continue
+            language = (r.get("language") or "").strip().lower()[:2] or None
+            if language is None and LANGUAGE_DETECT:
+                language = detect_language(city, ", ".join(interests))
+            rows.append({"city": city, "interests": interests, "transport_mode": mode, "language": language})
+    return rows
+
+def expand_jobs(combos: List[Dict[str, Any]], days: int) -> Iterator[Dict[str, Any]]:
+    """Un job par (combinaison, jour) ; dédupliqué sur la clé de cache."""
+    seen: Set[str] = set()
+    for c in combos:
+        for d in range(days):
+            interests = day_interests(c["interests"], d)
+            key = itinerary_cache_key(c["city"], interests, c["transport_mode"], c.get("language"))
+            if key in seen:
+                continue
+            seen.add(key)
+            yield {"key": key, "city": c["city"], "interests": interests, "transport_mode": c["transport_mode"],
+                   "language": c.get("language")}
+
+# =================== Checkpoint ===================
+class Checkpoint:
+    """Fichier append-only des clés terminées (une par ligne)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done: Set[str] = set()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.done = {line.strip() for line in f if line.strip()}
+
+    def mark(self, key: str) -> None:
+        with self._lock:
+            self.done.add(key)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(key + "\n")
+
+# =================== Exécution ===================
+def run(jobs: List[Dict[str, Any]], concurrency: int = 4, force: bool = False,
+        checkpoint: Checkpoint = None) -> Dict[str, int]:
+    return aio.run_sync(arun(jobs, concurrency, force, checkpoint))
+
+async def arun(jobs: List[Dict[str, Any]], concurrency: int = 4, force: bool = False,
+               checkpoint: Checkpoint = None) -> Dict[str, int]:
+    checkpoint = checkpoint or Checkpoint("")
+    stats = {"total": len(jobs), "skipped": 0, "generated": 0, "failed": 0}
+    todo = []
+    for job in jobs:
+        if not force and (job["key"] in checkpoint.done or ITINERARY_CACHE.contains(job["key"])):
+            stats["skipped"] += 1
+        else:
+            todo.append(job)
+
+    async def work(job):
+        async with gate:
+            try:
+                if force:
+                    ITINERARY_CACHE.delete(job["key"])
+                await LLM_SCHEDULER.arun(
+                    lambda: agenerate_itinerary_payload(job["city"], job["interests"], job["transport_mode"],
+                                                        language=job.get("language")),
+                    user="prewarm", priority=PRIORITY_BATCH
+                )
+                return job, None
+            except Exception as e:
+                return job, e
+
+    t0 = time.perf_counter()
+    gate = asyncio.Semaphore(max(1, concurrency))
+    for done in asyncio.as_completed([work(j) for j in todo]):
+        job, err = await done
+        if err is None:
+            checkpoint.mark(job["key"])
+            stats["generated"] += 1
+        else:
+            stats["failed"] += 1
+            logger.error("Prewarm failed for %s %s: %s", job["city"], job["interests"], err)
+    logger.info("Prewarm finished", extra={"latency_s": round(time.perf_counter() - t0, 3), "usage": stats})
+    return stats
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Pre-generate itinerary payloads into the itinerary cache.")
+    ap.add_argument("combos", help="CSV or JSONL with city, interests, transport_mode[, language]")
+    ap.add_argument("--days", type=int, default=3, help="days (themes) to prewarm per combo")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--rpm", type=float, default=30.0, help="max LLM requests per minute")
+    ap.add_argument("--checkpoint", default="prewarm.checkpoint")
+    ap.add_argument("--force", action="store_true", help="regenerate even if cached/checkpointed")
+    ap.add_argument("--fake", action="store_true", help="use the offline fake LLM")
+    ap.add_argument("--fake-latency", type=float, default=0.0)
+    args = ap.parse_args(argv)
+
+    if not ITINERARY_CACHE.enabled:
+        ap.error("itinerary cache is disabled (ITINERARY_CACHE_PATH is empty)")
+    if args.fake:
+        from src.Chains.fake_llm import install_fake_llm
+        install_fake_llm(latency_s=args.fake_latency)
+    set_llm_rate_limit(args.rpm, burst=max(1.0, args.concurrency))
+
+    jobs = list(expand_jobs(load_combos(args.combos), max(1, args.days)))
+    stats = run(jobs, concurrency=args.concurrency, force=args.force, checkpoint=Checkpoint(args.checkpoint))
+    print(json.dumps(stats))
+    return 0 if stats["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,231 @@
+# src/Core/scheduler.py
+"""
+Ordonnanceur central des appels generate_itinerary_payload.
+
+Quatre niveaux de priorité stricte (interactif > multi-jours > batch > spéculatif) ; dans un niveau,
+round-robin pondéré par utilisateur : un voyage de 14 jours n'avance que d'un jour
+(ou de `weight` jours) par tour et ne bloque plus les utilisateurs d'un seul jour.
+Les jobs dont la session a disparu (`alive()` faux) ou annulés (cancel_session)
+ne sont jamais exécutés.
+
+Les jobs asynchrones (asubmit/arun) occupent un créneau mais pas de thread : le
+worker les lance sur la boucle (src.Utils.aio) et passe au suivant ; le créneau est
+libéré à la fin de la coroutine. SCHEDULER_WORKERS borne donc les appels en cours.
+
+    SCHEDULER_WORKERS=4     # créneaux (appels simultanés) ; 0 : exécution directe, sans file
+    SCHEDULER_THREADS=4     # threads de dispatch (et d'exécution des jobs synchrones)
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from src.Utils import aio
+from src.Utils.logger import get_logger
+from src.Utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+SCHEDULER_THREADS = int(os.getenv("SCHEDULER_THREADS", "4"))
+
+PRIORITY_INTERACTIVE = 0   # voyage d'un jour / régénération d'un jour
+PRIORITY_MULTI_DAY = 1     # jours d'un voyage de plusieurs jours
+PRIORITY_BATCH = 2         # préchauffage, traitements hors-ligne
+PRIORITY_SPECULATIVE = 3   # préchargement spéculatif (src/Core/speculative.py)
+PRIORITY_NAMES = ("interactive", "multi_day", "batch", "speculative")
+
+class JobCancelled(Exception):
+    """Job retiré de la file (session fermée ou annulation explicite)."""
+
+class _Job:
+    __slots__ = ("fn", "is_async", "ctx", "user", "priority", "session", "alive", "future", "enqueued")
+
+    def __init__(self, fn, user, priority, session, alive, is_async=False):
+        self.fn = fn
+        self.is_async = is_async
+        self.ctx = contextvars.copy_context()  # request_context, trip_scope, spans
+        self.user = user
+        self.priority = priority
+        self.session = session
+        self.alive = alive
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+class LLMScheduler:
+    def __init__(self, workers: int = SCHEDULER_WORKERS, user_weights: Optional[Dict[str, int]] = None,
+                 threads: int = SCHEDULER_THREADS):
+        self.workers = max(0, int(workers))
+        self.threads = max(1, min(self.workers, int(threads)))
+        self.user_weights = dict(user_weights or {})
+        self._cv = threading.Condition()
+        # par niveau : utilisateur -> file de jobs, et ordre de passage des utilisateurs
+        self._queues: List[Dict[str, Deque[_Job]]] = [{} for _ in PRIORITY_NAMES]
+        self._turns: List[Deque[str]] = [deque() for _ in PRIORITY_NAMES]
+        self._credit: List[int] = [0 for _ in PRIORITY_NAMES]
+        self._threads: List[threading.Thread] = []
+        self._running = 0  # créneaux occupés (jobs synchrones + coroutines en cours)
+
+    # ---------- API ----------
+    def submit(self, fn: Callable[[], Any], user: str = "", priority: int = PRIORITY_INTERACTIVE,
+               session: Optional[str] = None, alive: Optional[Callable[[], bool]] = None) -> Future:
+        return self._enqueue(_Job(fn, user or "anonymous", self._level(priority), session, alive))
+
+    def asubmit(self, coro_fn: Callable[[], Any], user: str = "", priority: int = PRIORITY_INTERACTIVE,
+                session: Optional[str] = None, alive: Optional[Callable[[], bool]] = None) -> Future:
+        """Comme submit(), pour une fabrique de coroutine exécutée sur la boucle asyncio."""
+        return self._enqueue(_Job(coro_fn, user or "anonymous", self._level(priority), session, alive,
+                                  is_async=True))
+
+    def run(self, fn: Callable[[], Any], **kwargs: Any) -> Any:
+        """submit() puis attente du résultat (les exceptions du job sont relancées)."""
+        return self.submit(fn, **kwargs).result()
+
+    async def arun(self, coro_fn: Callable[[], Any], **kwargs: Any) -> Any:
+        """asubmit() puis attente sans bloquer la boucle."""
+        return await asyncio.wrap_future(self.asubmit(coro_fn, **kwargs))
+
+    def cancel_session(self, session: str) -> int:
+        """Annule les jobs en attente d'une session ; renvoie leur nombre."""
+        n = 0
+        with self._cv:
+            for level in self._queues:
+                for q in level.values():
+                    for job in q:
+                        if job.session == session and job.future.cancel():
+                            n += 1
+        if n:
+            REGISTRY.inc("llm_jobs_cancelled_total", n)
+        return n
+
+    def depth(self) -> Dict[str, int]:
+        with self._cv:
+            return self._depth()
+
+    # ---------- interne ----------
+    @staticmethod
+    def _level(priority: int) -> int:
+        return min(max(int(priority), 0), len(PRIORITY_NAMES) - 1)
+
+    def _enqueue(self, job: _Job) -> Future:
+        if self.workers == 0:
+            with self._cv:
+                self._running += 1
+            self._execute(job)
+            return job.future
+        with self._cv:
+            self._start_workers()
+            q = self._queues[job.priority].get(job.user)
+            if q is None:
+                q = self._queues[job.priority][job.user] = deque()
+                self._turns[job.priority].append(job.user)
+            q.append(job)
+            self._publish_depth()
+            self._cv.notify()
+        return job.future
+
+    def _release(self) -> None:
+        with self._cv:
+            self._running -= 1
+            self._cv.notify()
+
+    def _depth(self) -> Dict[str, int]:
+        return {name: sum(len(q) for q in self._queues[i].values()) for i, name in enumerate(PRIORITY_NAMES)}
+
+    def _publish_depth(self) -> None:
+        for name, n in self._depth().items():
+            REGISTRY.set_gauge("llm_queue_depth", n, priority=name)
+
+    def _start_workers(self) -> None:
+        while len(self._threads) < self.threads:
+            t = threading.Thread(target=self._worker, name=f"llm-scheduler-{len(self._threads)}", daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def _next(self) -> Optional[_Job]:
+        """Priorité stricte entre niveaux, round-robin pondéré entre utilisateurs d'un niveau."""
+        for level, turns in enumerate(self._turns):
+            while turns:
+                user = turns[0]
+                q = self._queues[level][user]
+                job = q.popleft()
+                if self._credit[level] <= 0:
+                    self._credit[level] = max(1, int(self.user_weights.get(user, 1)))
+                self._credit[level] -= 1
+                if not q:
+                    del self._queues[level][user]
+                    turns.popleft()
+                    self._credit[level] = 0
+                elif self._credit[level] <= 0:
+                    turns.rotate(-1)
+                return job
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            with self._cv:
+                job = self._next() if self._running < self.workers else None
+                while job is None:
+                    self._cv.wait()
+                    job = self._next() if self._running < self.workers else None
+                self._running += 1
+                self._publish_depth()
+            self._execute(job)
+
+    def _execute(self, job: _Job) -> None:
+        """Exécute (ou lance, pour une coroutine) un job qui occupe déjà un créneau."""
+        name = PRIORITY_NAMES[job.priority]
+        if not job.future.set_running_or_notify_cancel():
+            REGISTRY.inc("llm_jobs_total", priority=name, status="cancelled")
+            self._release()
+            return
+        if job.alive is not None and not job.alive():
+            job.future.set_exception(JobCancelled(f"session {job.session or job.user} is gone"))
+            REGISTRY.inc("llm_jobs_total", priority=name, status="cancelled")
+            self._release()
+            return
+        REGISTRY.inc("llm_queue_wait_seconds_sum", time.perf_counter() - job.enqueued, priority=name)
+        REGISTRY.inc("llm_queue_wait_seconds_count", priority=name)
+        if job.is_async:
+            try:
+                running = aio.submit(job.ctx.run(job.fn), context=job.ctx)
+            except BaseException as e:
+                self._finish(job, None, e)
+            else:
+                running.add_done_callback(lambda f: self._finish(job, f.result() if not f.exception() else None,
+                                                                 f.exception()))
+            return
+        try:
+            result = job.ctx.run(job.fn)
+        except BaseException as e:
+            self._finish(job, None, e)
+        else:
+            self._finish(job, result, None)
+
+    def _finish(self, job: _Job, result: Any, error: Optional[BaseException]) -> None:
+        name = PRIORITY_NAMES[job.priority]
+        if error is not None:
+            job.future.set_exception(error)
+            REGISTRY.inc("llm_jobs_total", priority=name, status="error")
+        else:
+            job.future.set_result(result)
+            REGISTRY.inc("llm_jobs_total", priority=name, status="ok")
+        self._release()
+
+def _user_weights() -> Dict[str, int]:
+    """SCHEDULER_USER_WEIGHTS="premium-user=3,prewarm=1"."""
+    out = {}
+    for item in os.getenv("SCHEDULER_USER_WEIGHTS", "").split(","):
+        if "=" in item:
+            user, w = item.split("=", 1)
+            try:
+                out[user.strip()] = max(1, int(w))
+            except ValueError:
+                logger.warning("Ignoring invalid scheduler weight: %s", item)
+    return out
+
+LLM_SCHEDULER = LLMScheduler(SCHEDULER_WORKERS, _user_weights())
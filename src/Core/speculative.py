@@ -0,0 +1,209 @@
+# src/Core/speculative.py
+"""
+Génération spéculative : lance en basse priorité la journée que l'utilisateur va
+très probablement demander (jour 1 dès que ville + intérêts sont stables, jour N+1
+après un voyage de N jours), pour que la vraie requête réutilise le résultat.
+
+    SPECULATE=on|off                 défaut off
+    SPECULATE_DEBOUNCE_S=1.5         délai de stabilité des champs avant de lancer
+    SPECULATE_MAX_INFLIGHT=4         spéculations simultanées, tous utilisateurs confondus
+    SPECULATE_SESSION_BUDGET=5       spéculations lancées par session
+    SPECULATE_TTL_S=600              au-delà, un résultat non réclamé est jeté
+
+Une demande qui correspond (même clé) récupère le job en cours ou terminé ; une
+spéculation encore en file au moment de la demande est annulée (la demande passe en
+priorité normale). Quand les champs changent, les spéculations de la session sont
+annulées ou jetées. Métriques : speculative_jobs_total{outcome},
+speculative_results_total{outcome=hit|wasted|cancelled}, speculative_hit_ratio.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from src.Core.poi_index import norm_text
+from src.Core.scheduler import LLM_SCHEDULER, LLMScheduler, PRIORITY_SPECULATIVE
+from src.Utils.logger import get_logger
+from src.Utils.memprof import register_memory_reporter
+from src.Utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+SPECULATE = os.getenv("SPECULATE", "off").lower() in ("1", "on", "true", "yes")
+SPECULATE_DEBOUNCE_S = float(os.getenv("SPECULATE_DEBOUNCE_S", "1.5"))
+SPECULATE_MAX_INFLIGHT = int(os.getenv("SPECULATE_MAX_INFLIGHT", "4"))
+SPECULATE_SESSION_BUDGET = int(os.getenv("SPECULATE_SESSION_BUDGET", "5"))
+SPECULATE_TTL_S = float(os.getenv("SPECULATE_TTL_S", "600"))
+
+def _key_part(s: str) -> str:
+    """Forme normalisée, ou le texte brut replié si la normalisation ne laisse rien ("!!!")."""
+    return norm_text(s) or (s or "").strip().casefold()
+
+def day_key(city: str, interests: List[str], transport_mode: str, exclude: Optional[List[str]] = None,
+            language: Optional[str] = None) -> str:
+    """Clé d'une journée : mêmes entrées que generate_itinerary_payload, exclusions et langue comprises."""
+    city_part = _key_part(city)
+    if not city_part:
+        raise ValueError("day_key: empty city")
+    raw = json.dumps([
+        city_part, [_key_part(i) for i in interests or []], transport_mode,
+        sorted(_key_part(x) for x in exclude or []), language or "",
+    ], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+class _Spec:
+    __slots__ = ("key", "session", "future", "started")
+
+    def __init__(self, key: str, session: str, future: Future):
+        self.key = key
+        self.session = session
+        self.future = future
+        self.started = time.time()
+
+class Speculator:
+    def __init__(self, scheduler: LLMScheduler, enabled: bool = SPECULATE,
+                 debounce_s: float = SPECULATE_DEBOUNCE_S, max_inflight: int = SPECULATE_MAX_INFLIGHT,
+                 session_budget: int = SPECULATE_SESSION_BUDGET, ttl_s: float = SPECULATE_TTL_S):
+        self.scheduler = scheduler
+        self.enabled = enabled
+        self.debounce_s = debounce_s
+        self.max_inflight = max_inflight
+        self.session_budget = session_budget
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._specs: Dict[str, _Spec] = {}
+        self._intent: Dict[str, str] = {}          # session -> dernière clé observée
+        self._timers: Dict[str, threading.Timer] = {}
+        self._spent: Dict[str, list] = {}          # session -> [nb lancées, dernier ts]
+        self._claimed: Dict[str, float] = {}       # clés déjà servies : pas de re-spéculation
+        self._hits = 0
+        self._started = 0
+
+    # ---------- API ----------
+    def observe(self, session: str, key: str, coro_fn: Callable[[], Any], user: str = "",
+                alive: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Champs du formulaire vus à ce rerun : spécule après `debounce_s` s'ils n'ont pas changé.
+        `coro_fn` : fabrique de coroutine (lancée via LLMScheduler.asubmit).
+        """
+        self._schedule(session, key, coro_fn, user, alive, self.debounce_s)
+
+    def start(self, session: str, key: str, coro_fn: Callable[[], Any], user: str = "",
+              alive: Optional[Callable[[], bool]] = None) -> None:
+        """Spécule tout de suite (ex. jour suivant juste après une génération)."""
+        self._schedule(session, key, coro_fn, user, alive, 0.0)
+
+    def claim(self, key: str) -> Optional[Future]:
+        """Future de la spéculation correspondante (en cours ou terminée), sinon None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._sweep()
+            spec = self._specs.pop(key, None)
+            if spec is None:
+                return None
+            self._claimed[key] = time.time()
+            if spec.future.cancel():
+                # encore en file, en priorité spéculative : la demande réelle repart en normal
+                self._outcome("cancelled")
+                return None
+            if spec.future.done() and spec.future.exception() is not None:
+                self._outcome("wasted")
+                return None
+            self._hits += 1
+            self._outcome("hit")
+            return spec.future
+
+    def discard(self, session: str) -> int:
+        """Annule/jette les spéculations non réclamées d'une session."""
+        with self._lock:
+            self._intent.pop(session, None)
+            timer = self._timers.pop(session, None)
+            if timer is not None:
+                timer.cancel()
+            return self._drop(lambda s: s.session == session)
+
+    def results(self) -> List[Any]:
+        """Résultats terminés et pas encore réclamés (gardés en mémoire jusqu'au TTL)."""
+        with self._lock:
+            futures = [s.future for s in self._specs.values()]
+        return [f.result() for f in futures if f.done() and not f.cancelled() and f.exception() is None]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"started": self._started, "hits": self._hits, "pending": len(self._specs),
+                    "hit_ratio": round(self._hits / self._started, 4) if self._started else 0.0}
+
+    # ---------- interne ----------
+    def _schedule(self, session, key, fn, user, alive, delay: float) -> None:
+        if not self.enabled or not session:
+            return
+        with self._lock:
+            if self._intent.get(session) != key:
+                # les champs ont changé : ce qui était spéculé pour l'ancienne saisie ne servira plus
+                self._drop(lambda s: s.session == session and s.key != key)
+            self._intent[session] = key
+            old = self._timers.pop(session, None)
+            if old is not None:
+                old.cancel()
+            timer = threading.Timer(delay, self._fire, (session, key, fn, user, alive))
+            timer.daemon = True
+            self._timers[session] = timer
+        timer.start()
+
+    def _fire(self, session, key, fn, user, alive) -> None:
+        with self._lock:
+            self._timers.pop(session, None)
+            if self._intent.get(session) != key:
+                return
+            self._sweep()
+            if key in self._specs or key in self._claimed:
+                return
+            if sum(1 for s in self._specs.values() if not s.future.done()) >= self.max_inflight:
+                REGISTRY.inc("speculative_jobs_total", outcome="skipped_busy")
+                return
+            spent = self._spent.setdefault(session, [0, 0.0])
+            if spent[0] >= self.session_budget:
+                REGISTRY.inc("speculative_jobs_total", outcome="skipped_budget")
+                return
+            spent[0] += 1
+            spent[1] = time.time()
+            future = self.scheduler.asubmit(fn, user=user or session, priority=PRIORITY_SPECULATIVE,
+                                            session=session, alive=alive)
+            self._specs[key] = _Spec(key, session, future)
+            self._started += 1
+            REGISTRY.inc("speculative_jobs_total", outcome="started")
+            self._publish()
+        logger.info("Speculative generation started", extra={"session": session})
+
+    def _drop(self, pred: Callable[[_Spec], bool]) -> int:
+        dropped = [k for k, s in self._specs.items() if pred(s)]
+        for k in dropped:
+            spec = self._specs.pop(k)
+            self._outcome("cancelled" if spec.future.cancel() else "wasted")
+        if dropped:
+            self._publish()
+        return len(dropped)
+
+    def _sweep(self) -> None:
+        now = time.time()
+        self._drop(lambda s: now - s.started > self.ttl_s)
+        for k in [k for k, ts in self._claimed.items() if now - ts > self.ttl_s]:
+            del self._claimed[k]
+        for sid in [sid for sid, (_, ts) in self._spent.items() if now - ts > self.ttl_s]:
+            del self._spent[sid]
+
+    def _outcome(self, outcome: str) -> None:
+        REGISTRY.inc("speculative_results_total", outcome=outcome)
+        self._publish()
+
+    def _publish(self) -> None:
+        REGISTRY.set_gauge("speculative_pending", len(self._specs))
+        if self._started:
+            REGISTRY.set_gauge("speculative_hit_ratio", self._hits / self._started)
+
+SPECULATOR = Speculator(LLM_SCHEDULER)
+register_memory_reporter("speculative", SPECULATOR.results)
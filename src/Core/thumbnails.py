@@ -0,0 +1,307 @@
+# src/Core/thumbnails.py
+"""
+Vignettes locales des images de POIs : au lieu de laisser chaque navigateur charger
+les miniatures 800 px de Wikimedia pour des cartes de 180 px, l'app télécharge
+l'image une fois, la réduit à la taille d'affichage, l'écrit en WebP (ou JPEG) sous un
+nom dérivé de son contenu et la sert avec des en-têtes de cache longs.
+
+    THUMB_DIR=cache/thumbs           dossier des vignettes (vide : désactivé, URLs d'origine)
+    THUMB_PORT=8502                  serveur des vignettes (/thumbs/<sha>.webp, /healthz)
+    THUMB_PUBLIC_URL=http://localhost:8502   base vue par le navigateur
+    THUMB_FORMAT=webp|jpeg   THUMB_QUALITY=80
+    THUMB_CARD_WIDTH=360  THUMB_TABLE_WIDTH=160   (px, 2x pour les écrans haute densité)
+
+Index (URL d'origine, largeur) -> fichier : BoundedCache « thumbs » devant le store
+partagé (SHARED_STORE_URL) s'il existe, sinon THUMB_DIR/index.sqlite. Les fichiers ne
+changent jamais (nom = hash du contenu) : Cache-Control immutable, ETag = hash. Un échec
+(réseau, image illisible) rend l'URL d'origine, retentée après THUMB_RETRY_S.
+
+Plusieurs pods : THUMB_DIR sur un volume partagé, /thumbs/ routé par l'ingress sous
+l'origine de l'app (THUMB_PUBLIC_URL = https://<hôte de l'app>). Une vignette absente
+du pod qui reçoit la requête redirige (302) vers l'image d'origine au lieu d'un 404.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Optional, Tuple
+
+from src.Chains.itinerary_cache import SQLiteStore
+from src.Utils import aio, shared_store
+from src.Utils.bounded_cache import cache_from_env
+from src.Utils.logger import get_logger
+from src.Utils.metrics import REGISTRY
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+logger = get_logger(__name__)
+
+THUMB_DIR = os.getenv("THUMB_DIR", "cache/thumbs")
+THUMB_PORT = int(os.getenv("THUMB_PORT", "8502"))
+THUMB_PUBLIC_URL = os.getenv("THUMB_PUBLIC_URL", f"http://localhost:{THUMB_PORT}").rstrip("/")
+THUMB_FORMAT = os.getenv("THUMB_FORMAT", "webp").lower()
+THUMB_QUALITY = int(os.getenv("THUMB_QUALITY", "80"))
+THUMB_CARD_WIDTH = int(os.getenv("THUMB_CARD_WIDTH", "360"))
+THUMB_TABLE_WIDTH = int(os.getenv("THUMB_TABLE_WIDTH", "160"))
+THUMB_MAX_SOURCE_BYTES = int(os.getenv("THUMB_MAX_SOURCE_BYTES", str(10 * 1024 * 1024)))
+THUMB_RETRY_S = float(os.getenv("THUMB_RETRY_S", "600"))
+THUMB_CONCURRENCY = int(os.getenv("THUMB_CONCURRENCY", "8"))
+
+# Largeurs de miniatures pré-générées par Wikimedia : on demande la plus petite suffisante
+WIKIMEDIA_STEPS = (120, 250, 330, 500, 960)
+MAX_AGE_S = 365 * 24 * 3600
+_NAME_RE = re.compile(r"^/thumbs/([0-9a-f]{2})([0-9a-f]{30})\.(webp|jpg)$")
+_MIME = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+def enabled() -> bool:
+    return bool(THUMB_DIR) and Image is not None
+
+def _ext() -> str:
+    if THUMB_FORMAT == "webp" and Image is not None and features.check("webp"):
+        return "webp"
+    return "jpg"
+
+# =================== Index et fichiers ===================
+_INDEX = None
+_FAILED = cache_from_env("thumb_failures", max_entries=4096, ttl_s=THUMB_RETRY_S)
+_index_lock = threading.Lock()
+
+def _index():
+    """
+    (largeur|url) -> nom de fichier et src|nom -> URL d'origine ; mémoire bornée devant
+    le store partagé (commun aux pods) ou THUMB_DIR/index.sqlite.
+    """
+    global _INDEX
+    with _index_lock:
+        if _INDEX is None:
+            if shared_store.SHARED is not None:
+                store = shared_store.SharedKVStore(shared_store.SHARED, "thumbs")
+            else:
+                store = SQLiteStore(os.path.join(THUMB_DIR, "index.sqlite"))
+            _INDEX = cache_from_env("thumbs", max_entries=8192, max_bytes=2 * 1024 * 1024, store=store,
+                                    decode=lambda v: v.decode("utf-8") if isinstance(v, bytes) else v)
+        return _INDEX
+
+def source_of(name: str) -> Optional[str]:
+    """URL d'origine d'une vignette (repli du serveur quand le fichier manque sur ce pod)."""
+    return _index().get(f"src|{name}")
+
+def _path(name: str) -> str:
+    return os.path.join(THUMB_DIR, name[:2], name)
+
+def _public(name: str) -> str:
+    return f"{THUMB_PUBLIC_URL}/thumbs/{name}"
+
+def _write(data: bytes, ext: str) -> str:
+    """Écrit la vignette sous son hash (écriture atomique, idempotente) ; renvoie le nom."""
+    name = f"{hashlib.sha256(data).hexdigest()[:32]}.{ext}"
+    path = _path(name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return name
+
+# =================== Réduction ===================
+def source_url(url: str, width: int) -> str:
+    """Miniature Wikimedia la plus petite couvrant `width` (…/800px-X.jpg, thumb.php?w=800)."""
+    step = next((s for s in WIKIMEDIA_STEPS if s >= width), None)
+    if step is None:
+        return url
+    m = re.search(r"/(\d+)px-[^/]+$", url)
+    if m and "/thumb/" in url and int(m.group(1)) > step:
+        return url[:m.start(1)] + str(step) + url[m.end(1):]
+    m = re.search(r"([?&]w=)(\d+)", url)
+    if m and "thumb.php" in url and int(m.group(2)) > step:
+        return url[:m.start(2)] + str(step) + url[m.end(2):]
+    return url
+
+def downsize(data: bytes, width: int, ext: str = "webp", quality: int = THUMB_QUALITY) -> bytes:
+    """Réduit à `width` px de large au plus (jamais agrandi), orientation EXIF appliquée."""
+    with Image.open(io.BytesIO(data)) as im:
+        im = ImageOps.exif_transpose(im)
+        im.thumbnail((width, width * 4), Image.LANCZOS)
+        if ext == "jpg" or im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if ext == "webp" and "A" in im.getbands() else "RGB")
+        out = io.BytesIO()
+        if ext == "webp":
+            im.save(out, "WEBP", quality=quality, method=4)
+        else:
+            im.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+        return out.getvalue()
+
+async def _download(url: str) -> bytes:
+    client = aio.http_client()
+    async with client.stream("GET", url, follow_redirects=True) as r:
+        r.raise_for_status()
+        chunks, size = [], 0
+        async for chunk in r.aiter_bytes():
+            size += len(chunk)
+            if size > THUMB_MAX_SOURCE_BYTES:
+                raise ValueError(f"image larger than {THUMB_MAX_SOURCE_BYTES} bytes")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+# Une seule génération par (largeur, url) en cours, même si plusieurs sessions la demandent
+_inflight: Dict[str, asyncio.Future] = {}
+
+async def _generate(key: str, url: str, width: int) -> Optional[str]:
+    src = source_url(url, width)
+    try:
+        try:
+            data = await _download(src)
+        except Exception:
+            if src == url:
+                raise
+            data = await _download(url)
+        ext = _ext()
+        out = await asyncio.to_thread(downsize, data, width, ext)
+        name = await asyncio.to_thread(_write, out, ext)
+    except Exception as e:
+        logger.warning("Thumbnail failed for %s: %s", url, e)
+        REGISTRY.inc("thumbnails_total", result="failed")
+        _FAILED.set(key, True)
+        return None
+    REGISTRY.inc("thumbnails_total", result="generated")
+    REGISTRY.inc("thumbnail_bytes_total", len(data), kind="source")
+    REGISTRY.inc("thumbnail_bytes_total", len(out), kind="thumbnail")
+    _index().set(f"src|{name}", url)
+    _index().set(key, name)
+    return name
+
+def _lookup(url: str, width: int) -> Tuple[str, Optional[str]]:
+    key = f"{width}|{url}"
+    name = _index().get(key)
+    if name and not os.path.exists(_path(name)):   # dossier vidé : on régénère
+        _index().delete(key)
+        name = None
+    return key, name
+
+async def athumbnail_url(url: Optional[str], width: int) -> Optional[str]:
+    """URL de la vignette locale (créée au besoin) ; l'URL d'origine si désactivé ou en échec."""
+    if not url or not enabled():
+        return url
+    key, name = _lookup(url, width)
+    if name is None:
+        if key in _FAILED:
+            return url
+        fut = _inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(_generate(key, url, width))
+            _inflight[key] = fut
+            fut.add_done_callback(lambda _f: _inflight.pop(key, None))
+        name = await asyncio.shield(fut)
+    else:
+        REGISTRY.inc("thumbnails_total", result="hit")
+    return _public(name) if name else url
+
+async def athumbnail_urls(urls: Iterable[Optional[str]], width: int) -> Dict[str, str]:
+    """{url d'origine: url servie} pour plusieurs images, THUMB_CONCURRENCY à la fois."""
+    todo = sorted({u for u in urls if u})
+    gate = asyncio.Semaphore(max(1, THUMB_CONCURRENCY))
+
+    async def one(u: str) -> Optional[str]:
+        async with gate:
+            return await athumbnail_url(u, width)
+
+    results = await asyncio.gather(*(one(u) for u in todo))
+    return dict(zip(todo, results))
+
+# =================== Adaptateurs synchrones (Streamlit) ===================
+def thumbnail_urls(urls: Iterable[Optional[str]], width: int) -> Dict[str, str]:
+    """Comme athumbnail_urls ; sans passer par la boucle quand tout est déjà indexé (reruns)."""
+    urls = [u for u in urls if u]
+    if not enabled():
+        return {u: u for u in urls}
+    out: Dict[str, str] = {}
+    for u in urls:
+        _, name = _lookup(u, width)
+        if name is None:
+            return aio.run_sync(athumbnail_urls(urls, width))
+        out[u] = _public(name)
+    REGISTRY.inc("thumbnails_total", len(out), result="hit")
+    return out
+
+def thumbnail_url(url: Optional[str], width: int) -> Optional[str]:
+    return thumbnail_urls([url], width).get(url, url) if url else url
+
+# =================== Serveur /thumbs ===================
+class _ThumbHandler(BaseHTTPRequestHandler):
+    def _file(self) -> Optional[Tuple[str, str, str, str]]:
+        m = _NAME_RE.match(self.path.split("?")[0])
+        if not m:
+            return None
+        name = f"{m.group(1)}{m.group(2)}.{m.group(3)}"
+        return name, _path(name), _MIME[m.group(3)], f'"{m.group(1)}{m.group(2)}"'
+
+    def _serve(self, body: bool) -> None:
+        if self.path.split("?")[0] == "/healthz":
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        found = self._file()
+        if found is not None and not os.path.exists(found[1]):
+            # Vignette créée par un autre pod (ou dossier vidé) : l'image d'origine plutôt qu'un trou
+            origin = source_of(found[0])
+            if origin:
+                REGISTRY.inc("thumbnail_requests_total", status="302")
+                self.send_response(302)
+                self.send_header("Location", origin)
+                self.send_header("Cache-Control", "no-store")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        if found is None or not os.path.exists(found[1]):
+            REGISTRY.inc("thumbnail_requests_total", status="404")
+            self.send_error(404)
+            return
+        _, path, mime, etag = found
+        headers = {
+            "Cache-Control": f"public, max-age={MAX_AGE_S}, immutable",
+            "ETag": etag,
+            "Access-Control-Allow-Origin": "*",
+            "X-Content-Type-Options": "nosniff",
+        }
+        if etag in (self.headers.get("If-None-Match") or ""):
+            REGISTRY.inc("thumbnail_requests_total", status="304")
+            self.send_response(304)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.end_headers()
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        REGISTRY.inc("thumbnail_requests_total", status="200")
+        self.send_response(200)
+        self.send_header("Content-Type", mime)
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        if body:
+            self.wfile.write(data)
+
+    def do_GET(self):
+        self._serve(True)
+
+    def do_HEAD(self):
+        self._serve(False)
+
+    def log_message(self, *args):  # pas de bruit sur stderr
+        pass
+
+def start_thumbnail_server(port: Optional[int] = None, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Sert THUMB_DIR sous /thumbs/ dans un thread démon (port: THUMB_PORT, défaut 8502)."""
+    port = int(port if port is not None else THUMB_PORT)
+    server = ThreadingHTTPServer((host, port), _ThumbHandler)
+    threading.Thread(target=server.serve_forever, name="thumbnail-server", daemon=True).start()
+    return server
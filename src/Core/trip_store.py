@@ -0,0 +1,415 @@
+# src/Core/trip_store.py
+"""
+Persistance des voyages : un identifiant court partageable (?trip=<id>), le payload
+initial, puis les modifications ("Save Edits") ajoutées comme deltas JSON Patch —
+le voyage n'est jamais réécrit. Relecture = payload + deltas rejoués dans l'ordre.
+
+Édition à plusieurs : apply_edits() ajoute un patch sur une version de base
+(concurrence optimiste). Si d'autres deltas ont été ajoutés depuis et ne touchent pas
+les mêmes stops, le patch est rejoué sur la dernière version ; sinon EditConflict.
+Les autres vues rattrapent leur retard avec edits_since() (deltas seulement).
+
+    TRIP_STORE_BACKEND=sqlite|memory|shared   TRIP_STORE_PATH=cache/trips.sqlite ("" désactive)
+"""
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+from src.Core.json_patch import apply_patch, conflicts
+from src.Core.poi_index import norm_text
+from src.Utils.logger import get_logger
+from src.Utils.memprof import register_memory_reporter
+from src.Utils.metrics import REGISTRY
+from src.Utils.serializer import pack, unpack
+from src.Utils import shared_store
+
+logger = get_logger(__name__)
+
+TRIP_STORE_BACKEND = os.getenv("TRIP_STORE_BACKEND", "sqlite").lower()
+TRIP_STORE_PATH = os.getenv("TRIP_STORE_PATH", os.path.join("cache", "trips.sqlite"))
+TRIP_ID_BYTES = 6  # 8 caractères base64url
+EDIT_CLAIM_TTL_S = 60  # backend partagé : réservation d'un numéro de version
+
+# Clés de session/rendu non persistées
+_TRANSIENT_KEYS = {"markdown", "images"}
+
+class VersionConflict(Exception):
+    """Le voyage a avancé depuis la version de base (écriture concurrente)."""
+
+    def __init__(self, trip_id: str, expected: int, current: int):
+        super().__init__(f"trip {trip_id} is at version {current}, not {expected}")
+        self.trip_id, self.expected, self.current = trip_id, expected, current
+
+class EditConflict(Exception):
+    """Modification concurrente des mêmes stops : le patch n'a pas été enregistré."""
+
+    def __init__(self, trip_id: str, version: int, paths: List[str]):
+        super().__init__(f"trip {trip_id}: conflicting edits at version {version} ({', '.join(paths[:3])})")
+        self.trip_id, self.version, self.paths = trip_id, version, paths
+
+def new_trip_id() -> str:
+    return secrets.token_urlsafe(TRIP_ID_BYTES)
+
+def trip_meta(itin: Dict[str, Any], user_id: str = "") -> Dict[str, Any]:
+    days = itin.get("days", []) or []
+    return {
+        "user_id": user_id or "",
+        "city": itin.get("city", ""),
+        "start_date": (days[0].get("date") if days else "") or "",
+        "days": len(days),
+        "language_code": itin.get("language_code", ""),
+    }
+
+def _persistable(itin: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in itin.items() if k not in _TRANSIENT_KEYS}
+
+# =================== Backends ===================
+class SQLiteTripBackend:
+    """Tables trips (métadonnées + payload initial) et trip_edits (deltas append-only)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._conn() as c:
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS trips ("
+                " id TEXT PRIMARY KEY, user_id TEXT NOT NULL, city TEXT NOT NULL, city_key TEXT NOT NULL,"
+                " start_date TEXT NOT NULL, days INTEGER NOT NULL, language_code TEXT NOT NULL,"
+                " version INTEGER NOT NULL, created_ts REAL NOT NULL, updated_ts REAL NOT NULL,"
+                " payload BLOB NOT NULL)"
+            )
+            c.execute("CREATE INDEX IF NOT EXISTS ix_trips_user_city_date ON trips (user_id, city_key, start_date)")
+            c.execute("CREATE INDEX IF NOT EXISTS ix_trips_city_date ON trips (city_key, start_date)")
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS trip_edits ("
+                " trip_id TEXT NOT NULL, version INTEGER NOT NULL, ts REAL NOT NULL, delta BLOB NOT NULL,"
+                " PRIMARY KEY (trip_id, version))"
+            )
+            # Clés de ville calculées avant la normalisation Unicode (villes non latines -> "")
+            for trip_id, city in c.execute("SELECT id, city FROM trips WHERE city_key = '' AND city != ''").fetchall():
+                c.execute("UPDATE trips SET city_key = ? WHERE id = ?", (norm_text(city), trip_id))
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, trip_id: str, meta: Dict[str, Any], payload: bytes) -> bool:
+        now = time.time()
+        try:
+            with self._conn() as c:
+                c.execute(
+                    "INSERT INTO trips (id, user_id, city, city_key, start_date, days, language_code,"
+                    " version, created_ts, updated_ts, payload) VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                    (trip_id, meta["user_id"], meta["city"], norm_text(meta["city"]), meta["start_date"],
+                     meta["days"], meta["language_code"], now, now, payload),
+                )
+            return True
+        except sqlite3.IntegrityError:
+            return False  # identifiant déjà pris
+
+    def append(self, trip_id: str, delta: bytes, expected_version: Optional[int] = None) -> int:
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT version FROM trips WHERE id = ?", (trip_id,)).fetchone()
+            if row is None:
+                raise KeyError(trip_id)
+            if expected_version is not None and row[0] != expected_version:
+                raise VersionConflict(trip_id, expected_version, row[0])
+            version = row[0] + 1
+            now = time.time()
+            conn.execute("INSERT INTO trip_edits (trip_id, version, ts, delta) VALUES (?, ?, ?, ?)",
+                         (trip_id, version, now, delta))
+            conn.execute("UPDATE trips SET version = ?, updated_ts = ? WHERE id = ?", (version, now, trip_id))
+        return version
+
+    def get(self, trip_id: str) -> Optional[Tuple[Dict[str, Any], bytes, List[bytes]]]:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT user_id, city, start_date, days, language_code, version, created_ts, updated_ts, payload"
+            " FROM trips WHERE id = ?", (trip_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        deltas = [d for (d,) in conn.execute(
+            "SELECT delta FROM trip_edits WHERE trip_id = ? ORDER BY version", (trip_id,)
+        )]
+        keys = ("user_id", "city", "start_date", "days", "language_code", "version", "created_ts", "updated_ts")
+        return {"id": trip_id, **dict(zip(keys, row[:-1]))}, row[-1], deltas
+
+    def version(self, trip_id: str) -> Optional[int]:
+        row = self._conn().execute("SELECT version FROM trips WHERE id = ?", (trip_id,)).fetchone()
+        return row[0] if row else None
+
+    def since(self, trip_id: str, version: int) -> List[Tuple[int, bytes]]:
+        return self._conn().execute(
+            "SELECT version, delta FROM trip_edits WHERE trip_id = ? AND version > ? ORDER BY version",
+            (trip_id, version)
+        ).fetchall()
+
+    def query(self, user_id: Optional[str] = None, city: Optional[str] = None,
+              start_from: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        sql = "SELECT id, user_id, city, start_date, days, version, updated_ts FROM trips WHERE 1 = 1"
+        args: list = []
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            args.append(user_id)
+        if city:
+            sql += " AND city_key = ?"
+            args.append(norm_text(city))
+        if start_from:
+            sql += " AND start_date >= ?"
+            args.append(start_from)
+        sql += " ORDER BY start_date DESC, updated_ts DESC LIMIT ?"
+        args.append(limit)
+        keys = ("id", "user_id", "city", "start_date", "days", "version", "updated_ts")
+        return [dict(zip(keys, r)) for r in self._conn().execute(sql, args)]
+
+class MemoryTripBackend:
+    """Même interface en mémoire (tests, démo, process unique)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trips: Dict[str, Dict[str, Any]] = {}
+
+    def create(self, trip_id: str, meta: Dict[str, Any], payload: bytes) -> bool:
+        with self._lock:
+            if trip_id in self._trips:
+                return False
+            now = time.time()
+            self._trips[trip_id] = {"meta": {"id": trip_id, **meta, "version": 0, "created_ts": now,
+                                             "updated_ts": now}, "payload": payload, "deltas": []}
+            return True
+
+    def append(self, trip_id: str, delta: bytes, expected_version: Optional[int] = None) -> int:
+        with self._lock:
+            trip = self._trips[trip_id]
+            if expected_version is not None and len(trip["deltas"]) != expected_version:
+                raise VersionConflict(trip_id, expected_version, len(trip["deltas"]))
+            trip["deltas"].append(delta)
+            trip["meta"]["version"] = len(trip["deltas"])
+            trip["meta"]["updated_ts"] = time.time()
+            return trip["meta"]["version"]
+
+    def get(self, trip_id: str) -> Optional[Tuple[Dict[str, Any], bytes, List[bytes]]]:
+        with self._lock:
+            trip = self._trips.get(trip_id)
+            return (dict(trip["meta"]), trip["payload"], list(trip["deltas"])) if trip else None
+
+    def version(self, trip_id: str) -> Optional[int]:
+        with self._lock:
+            trip = self._trips.get(trip_id)
+            return len(trip["deltas"]) if trip else None
+
+    def since(self, trip_id: str, version: int) -> List[Tuple[int, bytes]]:
+        with self._lock:
+            deltas = self._trips[trip_id]["deltas"] if trip_id in self._trips else []
+            return [(v, d) for v, d in enumerate(deltas[version:], start=version + 1)]
+
+    def query(self, user_id: Optional[str] = None, city: Optional[str] = None,
+              start_from: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            metas = [dict(t["meta"]) for t in self._trips.values()]
+        metas = [m for m in metas
+                 if (user_id is None or m["user_id"] == user_id)
+                 and (not city or norm_text(m["city"]) == norm_text(city))
+                 and (not start_from or m["start_date"] >= start_from)]
+        metas.sort(key=lambda m: (m["start_date"], m["updated_ts"]), reverse=True)
+        return metas[:limit]
+
+class SharedTripBackend:
+    """
+    Même interface dans le store partagé (SHARED_STORE_URL), pour les déploiements
+    multi-réplicas : trip:<id>:meta / :payload, deltas en liste (RPUSH => version
+    atomique), index par ensembles user / city. Avec une version attendue, le numéro
+    suivant est d'abord réservé (SET NX trip:<id>:claim:<n>) puis la longueur vérifiée :
+    deux écrivains sur la même base ne peuvent pas ajouter tous les deux.
+    """
+
+    def __init__(self, client: Any):
+        if client is None:
+            raise ValueError("TRIP_STORE_BACKEND=shared requires SHARED_STORE_URL")
+        self.client = client
+
+    def _k(self, *parts: str) -> str:
+        return shared_store.key("trip", *parts)
+
+    def create(self, trip_id: str, meta: Dict[str, Any], payload: bytes) -> bool:
+        now = time.time()
+        full = {"id": trip_id, **meta, "version": 0, "created_ts": now, "updated_ts": now}
+        if not self.client.set(self._k(trip_id, "meta"), pack(full), nx=True):
+            return False
+        self.client.set(self._k(trip_id, "payload"), payload)
+        self.client.sadd(self._k("idx", "all"), trip_id)
+        self.client.sadd(self._k("idx", "user", meta["user_id"]), trip_id)
+        self.client.sadd(self._k("idx", "city", norm_text(meta["city"])), trip_id)
+        return True
+
+    def _length_is(self, trip_id: str, n: int) -> bool:
+        edits = self._k(trip_id, "edits")
+        return not self.client.lrange(edits, n, n) and (n == 0 or bool(self.client.lrange(edits, n - 1, n - 1)))
+
+    def append(self, trip_id: str, delta: bytes, expected_version: Optional[int] = None) -> int:
+        raw = self.client.get(self._k(trip_id, "meta"))
+        if raw is None:
+            raise KeyError(trip_id)
+        if expected_version is not None:
+            claimed = self.client.set(self._k(trip_id, "claim", str(expected_version + 1)), b"1",
+                                      ex=EDIT_CLAIM_TTL_S, nx=True)
+            if not claimed or not self._length_is(trip_id, expected_version):
+                raise VersionConflict(trip_id, expected_version, self.version(trip_id) or 0)
+        version = self.client.rpush(self._k(trip_id, "edits"), delta)
+        meta = unpack(raw)
+        meta.update(version=max(version, meta.get("version", 0)), updated_ts=time.time())
+        self.client.set(self._k(trip_id, "meta"), pack(meta))
+        return version
+
+    def get(self, trip_id: str) -> Optional[Tuple[Dict[str, Any], bytes, List[bytes]]]:
+        raw = self.client.get(self._k(trip_id, "meta"))
+        payload = self.client.get(self._k(trip_id, "payload"))
+        if raw is None or payload is None:
+            return None
+        deltas = self.client.lrange(self._k(trip_id, "edits"), 0, -1)
+        meta = unpack(raw)
+        meta["version"] = len(deltas)
+        return meta, payload, deltas
+
+    def version(self, trip_id: str) -> Optional[int]:
+        raw = self.client.get(self._k(trip_id, "meta"))
+        return unpack(raw).get("version", 0) if raw is not None else None
+
+    def since(self, trip_id: str, version: int) -> List[Tuple[int, bytes]]:
+        deltas = self.client.lrange(self._k(trip_id, "edits"), version, -1)
+        return [(v, d) for v, d in enumerate(deltas, start=version + 1)]
+
+    def query(self, user_id: Optional[str] = None, city: Optional[str] = None,
+              start_from: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        ids = self.client.smembers(self._k("idx", "all"))
+        if user_id is not None:
+            ids &= self.client.smembers(self._k("idx", "user", user_id))
+        if city:
+            ids &= self.client.smembers(self._k("idx", "city", norm_text(city)))
+        metas = []
+        for tid in ids:
+            raw = self.client.get(self._k(tid.decode("utf-8") if isinstance(tid, bytes) else tid, "meta"))
+            if raw is not None:
+                metas.append(unpack(raw))
+        # Revérifie la ville : l'ancien index rangeait les villes non latines sous la même clé ""
+        metas = [m for m in metas
+                 if (not city or norm_text(m["city"]) == norm_text(city))
+                 and (not start_from or m["start_date"] >= start_from)]
+        metas.sort(key=lambda m: (m["start_date"], m["updated_ts"]), reverse=True)
+        return metas[:limit]
+
+TRIP_BACKENDS = {
+    "sqlite": lambda: SQLiteTripBackend(TRIP_STORE_PATH),
+    "memory": MemoryTripBackend,
+    "shared": lambda: SharedTripBackend(shared_store.SHARED),
+}
+
+# =================== Store ===================
+class TripStore:
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def save(self, itin: Dict[str, Any], user_id: str = "") -> Optional[str]:
+        """Enregistre un nouveau voyage ; renvoie son identifiant court."""
+        if not self.enabled:
+            return None
+        meta, blob = trip_meta(itin, user_id), pack(_persistable(itin))
+        for _ in range(5):
+            trip_id = new_trip_id()
+            if self.backend.create(trip_id, meta, blob):
+                REGISTRY.inc("trips_saved_total")
+                return trip_id
+        raise RuntimeError("Could not allocate a unique trip id")
+
+    def apply_edits(self, trip_id: str, base_version: int, ops: List[Dict[str, Any]],
+                    attempts: int = 5) -> int:
+        """
+        Ajoute le patch `ops`, construit sur `base_version` ; renvoie la nouvelle version.
+        Deltas concurrents sans recouvrement : le patch est rejoué après eux (rebase).
+        Recouvrement (mêmes stops, ou liste réordonnée dont on utilise les index) : EditConflict.
+        """
+        if not self.enabled or not ops:
+            return base_version
+        blob, base = pack(ops), base_version
+        for _ in range(max(1, attempts)):
+            try:
+                version = self.backend.append(trip_id, blob, expected_version=base)
+            except VersionConflict as e:
+                theirs = self.edits_since(trip_id, base)
+                paths = conflicts(ops, [op for _, delta in theirs for op in delta])
+                if paths:
+                    REGISTRY.inc("trip_edit_conflicts_total")
+                    raise EditConflict(trip_id, theirs[-1][0] if theirs else e.current, paths)
+                REGISTRY.inc("trip_edits_rebased_total")
+                base = theirs[-1][0] if theirs else e.current
+                continue
+            REGISTRY.inc("trip_edits_total")
+            REGISTRY.inc("trip_edit_ops_total", len(ops))
+            logger.info("Trip patch saved", extra={"usage": {"trip_id": trip_id, "version": version,
+                                                             "base": base_version, "ops": len(ops)}})
+            return version
+        raise EditConflict(trip_id, base, [])
+
+    def version(self, trip_id: str) -> Optional[int]:
+        """Dernière version (lecture d'une ligne, sans rejouer les deltas)."""
+        if not self.enabled or not trip_id:
+            return None
+        return self.backend.version(trip_id)
+
+    def edits_since(self, trip_id: str, version: int) -> List[Tuple[int, List[Dict[str, Any]]]]:
+        """Deltas postérieurs à `version`, dans l'ordre : [(version, ops), ...]."""
+        if not self.enabled or not trip_id:
+            return []
+        return [(v, unpack(delta)) for v, delta in self.backend.since(trip_id, version)]
+
+    def load(self, trip_id: str) -> Optional[Dict[str, Any]]:
+        """{"meta": {...}, "itinerary": {...}} avec toutes les modifications appliquées."""
+        if not self.enabled or not trip_id:
+            return None
+        row = self.backend.get(trip_id)
+        if row is None:
+            return None
+        meta, payload, deltas = row
+        itin = unpack(payload)
+        for delta in deltas:
+            itin = apply_patch(itin, unpack(delta), in_place=True)
+        return {"meta": meta, "itinerary": _persistable(itin)}
+
+    def list_trips(self, user_id: Optional[str] = None, city: Optional[str] = None,
+                   start_from: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        if not self.enabled or (city and not norm_text(city)):
+            return []  # ville sans lettre ni chiffre : pas de clé, pas de correspondance
+        return self.backend.query(user_id=user_id, city=city, start_from=start_from, limit=limit)
+
+def _default_store() -> TripStore:
+    if TRIP_STORE_BACKEND == "sqlite" and not TRIP_STORE_PATH:
+        return TripStore(None)
+    factory = TRIP_BACKENDS.get(TRIP_STORE_BACKEND)
+    if factory is None:
+        logger.warning("Unknown TRIP_STORE_BACKEND=%s, trips are not persisted", TRIP_STORE_BACKEND)
+        return TripStore(None)
+    try:
+        return TripStore(factory())
+    except (sqlite3.Error, ValueError) as e:
+        logger.warning("Trip store disabled: %s", e)
+        return TripStore(None)
+
+TRIP_STORE = _default_store()
+# Backend mémoire : les voyages restent dans le process
+register_memory_reporter("trip_store", lambda: getattr(TRIP_STORE.backend, "_trips", None))
@@ -0,0 +1,95 @@
+# src/Utils/aio.py
+"""
+Boucle asyncio unique du process (thread de fond) et adaptateur synchrone.
+
+Le cœur (chaîne LLM, planner, images) est asynchrone ; Streamlit et les scripts
+restent synchrones et passent par run_sync(), seul point de passage :
+
+    payload = run_sync(agenerate_itinerary_payload(city, interests))
+
+Les contextvars de l'appelant (request_context, trip_scope, spans) suivent la
+coroutine. Le client HTTP partagé (httpx.AsyncClient, pool de connexions borné)
+sert aux appels Wikipedia/Wikidata.
+
+    AIO_HTTP_MAX_CONNECTIONS=32
+"""
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Optional
+
+import httpx
+
+from src.Utils.tracing import span
+
+AIO_HTTP_MAX_CONNECTIONS = int(os.getenv("AIO_HTTP_MAX_CONNECTIONS", "32"))
+AIO_HTTP_TIMEOUT_S = float(os.getenv("AIO_HTTP_TIMEOUT_S", "6"))
+
+_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_http: Optional[httpx.AsyncClient] = None
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Boucle de fond, démarrée au premier appel."""
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="aio-loop", daemon=True)
+            _thread.start()
+        return _loop
+
+def in_loop() -> bool:
+    return _thread is not None and threading.current_thread() is _thread
+
+def submit(coro: Awaitable[Any], context: Optional[contextvars.Context] = None) -> Future:
+    """Planifie `coro` sur la boucle depuis n'importe quel thread ; renvoie un concurrent Future."""
+    loop = get_loop()
+    ctx = context if context is not None else contextvars.copy_context()
+    out: Future = Future()
+
+    def _start() -> None:
+        if not out.set_running_or_notify_cancel():
+            coro.close()
+            return
+        # la Task copie le contexte courant (celui de l'appelant) à sa création
+        task = loop.create_task(coro)
+
+        def _done(t: asyncio.Task) -> None:
+            if t.cancelled():
+                out.set_exception(asyncio.CancelledError())
+            elif t.exception() is not None:
+                out.set_exception(t.exception())
+            else:
+                out.set_result(t.result())
+        task.add_done_callback(_done)
+
+    loop.call_soon_threadsafe(_start, context=ctx)
+    return out
+
+def run_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Adaptateur synchrone : exécute `coro` sur la boucle et attend le résultat."""
+    if in_loop():
+        coro.close()
+        raise RuntimeError("run_sync() called from the event loop; await the coroutine instead")
+    return submit(coro).result(timeout)
+
+def http_client() -> httpx.AsyncClient:
+    """Client HTTP partagé (à utiliser depuis la boucle)."""
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            timeout=AIO_HTTP_TIMEOUT_S,
+            limits=httpx.Limits(max_connections=AIO_HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=AIO_HTTP_MAX_CONNECTIONS),
+            headers={"User-Agent": "ai-trip-planner/1.0"},
+        )
+    return _http
+
+async def traced_sleep(seconds: float) -> None:
+    """Sommeil de backoff (tenacity asynchrone), visible dans les traces."""
+    with span("chain.backoff", seconds=round(seconds, 3)):
+        await asyncio.sleep(seconds)
@@ -0,0 +1,244 @@
+# src/Utils/bounded_cache.py
+"""
+Cache en mémoire borné, commun à l'app et aux chaînes : nombre d'entrées et octets
+plafonnés, TTL, éviction LRU, admission TinyLFU optionnelle, statistiques et
+second niveau enfichable (tout KV `get -> (valeur, ts) | None, set, delete` :
+SQLiteStore, SharedKVStore).
+
+    CACHE_<NOM>_MAX_ENTRIES / CACHE_<NOM>_MAX_BYTES / CACHE_<NOM>_TTL_S / CACHE_<NOM>_POLICY=lru|tinylfu
+
+(cache_from_env, NOM en majuscules, ex. CACHE_EXPORTS_MAX_BYTES). Métriques :
+cache_requests_total{cache,result=hit|miss}, cache_evictions_total{cache,reason},
+cache_bytes{cache}, cache_entries{cache}.
+
+TinyLFU : un esquisse count-min (compteurs 4 bits, vieillis par moitié) estime la
+fréquence des clés ; quand le cache est plein, une nouvelle clé n'entre que si elle
+est plus fréquente que la victime LRU. Un balayage de clés vues une seule fois
+(ex. prewarm) ne chasse donc pas les entrées populaires.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from src.Utils.memprof import deep_sizeof, register_memory_reporter
+from src.Utils.metrics import REGISTRY
+
+LRU = "lru"
+TINYLFU = "tinylfu"
+
+def default_sizer(value: Any) -> int:
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    return deep_sizeof(value)
+
+# =================== Esquisse de fréquence ===================
+class FrequencySketch:
+    """Count-min à 4 lignes, compteurs saturés à 15, divisés par deux tous les 10 x largeur ajouts."""
+
+    DEPTH = 4
+
+    def __init__(self, width: int = 1024):
+        w = 64
+        while w < width:
+            w <<= 1
+        self.width = w
+        self._mask = w - 1
+        self._rows = [bytearray(w) for _ in range(self.DEPTH)]
+        self._added = 0
+        self._reset_at = 10 * w
+
+    def _slots(self, key: Hashable):
+        h = hash(key)
+        for i in range(self.DEPTH):
+            h = (h * 0x9E3779B1 + i) & 0xFFFFFFFFFFFFFFFF
+            yield i, (h ^ (h >> 29)) & self._mask
+
+    def add(self, key: Hashable) -> None:
+        for i, j in self._slots(key):
+            if self._rows[i][j] < 15:
+                self._rows[i][j] += 1
+        self._added += 1
+        if self._added >= self._reset_at:
+            # vieillissement : les clés populaires d'hier ne bloquent pas celles d'aujourd'hui
+            for row in self._rows:
+                for j in range(self.width):
+                    row[j] >>= 1
+            self._added //= 2
+
+    def estimate(self, key: Hashable) -> int:
+        return min(self._rows[i][j] for i, j in self._slots(key))
+
+# =================== Cache ===================
+class BoundedCache:
+    """
+    LRU thread-safe borné en entrées (`max_entries`) et en octets (`max_bytes`, taille
+    estimée par `sizer`) ; 0 = pas de limite sur cet axe. Les valeurs sont rendues telles
+    quelles : ranger des octets sérialisés si l'appelant peut les modifier.
+    `store` : second niveau lu sur un raté (puis promu en mémoire) et écrit à chaque set.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, max_bytes: int = 0, ttl_s: float = 0,
+                 policy: str = LRU, sizer: Callable[[Any], int] = default_sizer, store: Any = None,
+                 encode: Optional[Callable[[Any], Any]] = None, decode: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl_s = float(ttl_s or 0)
+        self.policy = policy if policy in (LRU, TINYLFU) else LRU
+        self.sizer = sizer
+        self.store = store
+        self.encode = encode or (lambda v: v)
+        self.decode = decode or (lambda v: v)
+        self._lock = threading.Lock()
+        self._data: OrderedDict = OrderedDict()  # clé -> (valeur, taille, ts)
+        self._bytes = 0
+        self._sketch = FrequencySketch(self.max_entries or 1024) if self.policy == TINYLFU else None
+        self._stats = {"hits": 0, "misses": 0, "store_hits": 0, "evictions": 0, "expired": 0, "rejected": 0}
+        CACHES[name] = self
+        register_memory_reporter(f"cache:{name}", lambda: self._data)
+
+    # ---------- API ----------
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            if self._sketch is not None:
+                self._sketch.add(key)
+            entry = self._data.get(key)
+            if entry is not None and self.ttl_s and now - entry[2] > self.ttl_s:
+                self._remove(key, "expired")
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+                self._stats["hits"] += 1
+                REGISTRY.inc("cache_requests_total", cache=self.name, result="hit")
+                return entry[0]
+        if self.store is not None:
+            row = self.store.get(self._store_key(key))
+            if row is not None:
+                raw, ts = row
+                if not self.ttl_s or now - ts <= self.ttl_s:
+                    value = self.decode(raw)
+                    with self._lock:
+                        self._stats["store_hits"] += 1
+                        self._insert(key, value, ts)
+                    REGISTRY.inc("cache_requests_total", cache=self.name, result="store_hit")
+                    return value
+        with self._lock:
+            self._stats["misses"] += 1
+        REGISTRY.inc("cache_requests_total", cache=self.name, result="miss")
+        return default
+
+    def set(self, key: Hashable, value: Any) -> bool:
+        """Range `value` ; False si la politique d'admission l'a refusée (le second niveau est écrit quand même)."""
+        if self.store is not None:
+            self.store.set(self._store_key(key), self.encode(value))
+        with self._lock:
+            if self._sketch is not None and key not in self._data:
+                self._sketch.add(key)
+            return self._insert(key, value, time.time())
+
+    def get_or_set(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = fn()
+            self.set(key, value)
+        return value
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key, None)
+        if self.store is not None:
+            self.store.delete(self._store_key(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self._publish()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and not (self.ttl_s and time.time() - entry[2] > self.ttl_s)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            lookups = s["hits"] + s["store_hits"] + s["misses"]
+            s.update(entries=len(self._data), bytes=self._bytes, max_entries=self.max_entries,
+                     max_bytes=self.max_bytes, policy=self.policy,
+                     hit_rate=round((s["hits"] + s["store_hits"]) / lookups, 4) if lookups else 0.0)
+            return s
+
+    # ---------- interne (sous verrou) ----------
+    @staticmethod
+    def _store_key(key: Hashable) -> str:
+        return key if isinstance(key, str) else repr(key)
+
+    def _insert(self, key: Hashable, value: Any, ts: float) -> bool:
+        size = self.sizer(value) + sys.getsizeof(key)
+        if self.max_bytes and size > self.max_bytes:
+            self._stats["rejected"] += 1
+            REGISTRY.inc("cache_evictions_total", cache=self.name, reason="too_large")
+            return False
+        if key in self._data:
+            self._remove(key, None)
+        elif self._sketch is not None and self._full(size) and self._data:
+            victim = next(iter(self._data))
+            if self._sketch.estimate(key) <= self._sketch.estimate(victim):
+                self._stats["rejected"] += 1
+                REGISTRY.inc("cache_evictions_total", cache=self.name, reason="rejected")
+                return False
+        self._data[key] = (value, size, ts)
+        self._bytes += size
+        while self._data and self._full(0):
+            oldest = next(iter(self._data))
+            expired = self.ttl_s and time.time() - self._data[oldest][2] > self.ttl_s
+            self._remove(oldest, "expired" if expired else "evicted")
+        self._publish()
+        return True
+
+    def _full(self, incoming: int) -> bool:
+        n = len(self._data) + (1 if incoming else 0)
+        return bool((self.max_entries and n > self.max_entries)
+                    or (self.max_bytes and self._bytes + incoming > self.max_bytes))
+
+    def _remove(self, key: Hashable, reason: Optional[str]) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+        if reason:
+            self._stats["evictions" if reason == "evicted" else reason] += 1
+            REGISTRY.inc("cache_evictions_total", cache=self.name, reason=reason)
+            self._publish()
+
+    def _publish(self) -> None:
+        REGISTRY.set_gauge("cache_bytes", self._bytes, cache=self.name)
+        REGISTRY.set_gauge("cache_entries", len(self._data), cache=self.name)
+
+_MISSING = object()
+
+# Tous les caches du process, par nom (statistiques, page mémoire)
+CACHES: Dict[str, BoundedCache] = {}
+
+def cache_from_env(name: str, max_entries: int = 1024, max_bytes: int = 0, ttl_s: float = 0,
+                   policy: str = LRU, **kwargs: Any) -> BoundedCache:
+    """BoundedCache dont les limites par défaut se surchargent par CACHE_<NOM>_*."""
+    prefix = "CACHE_" + name.upper().replace("-", "_").replace(".", "_") + "_"
+    return BoundedCache(
+        name,
+        max_entries=int(os.getenv(prefix + "MAX_ENTRIES", str(max_entries))),
+        max_bytes=int(os.getenv(prefix + "MAX_BYTES", str(max_bytes))),
+        ttl_s=float(os.getenv(prefix + "TTL_S", str(ttl_s))),
+        policy=os.getenv(prefix + "POLICY", policy).lower(),
+        **kwargs,
+    )
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: c.stats() for name, c in sorted(CACHES.items())}
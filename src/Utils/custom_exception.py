@@ -1,16 +1,116 @@
 import sys
+from types import TracebackType
+from typing import Optional, Dict
+
+# Catégories d'erreur (utilisées par la politique de retry et les métriques)
+VALIDATION = "validation"      # entrée utilisateur invalide
+PARSE = "parse"                # sortie LLM non exploitable (OutputParseError uniquement)
+RATE_LIMIT = "rate_limit"      # 429 côté fournisseur
+TIMEOUT = "timeout"
+UPSTREAM = "upstream"          # fournisseur indisponible (5xx, connexion)
+CLIENT = "client"              # requête refusée (auth, 4xx) : inutile de réessayer
+CANCELLED = "cancelled"        # travail annulé (session fermée)
+INTERNAL = "internal"
+
+RETRYABLE_CATEGORIES = frozenset({PARSE, RATE_LIMIT, TIMEOUT, UPSTREAM})
+
+# Noms de classes (SDK groq/httpx/requests) -> catégorie ; évite d'importer les SDK ici
+_NAME_TO_CATEGORY = {
+    "RateLimitError": RATE_LIMIT,
+    "APITimeoutError": TIMEOUT,
+    "TimeoutException": TIMEOUT,
+    "Timeout": TIMEOUT,
+    "TimeoutError": TIMEOUT,
+    "APIConnectionError": UPSTREAM,
+    "InternalServerError": UPSTREAM,
+    "ConnectionError": UPSTREAM,
+    "AuthenticationError": CLIENT,
+    "PermissionDeniedError": CLIENT,
+    "BadRequestError": CLIENT,
+    "NotFoundError": CLIENT,
+    "OutputParseError": PARSE,
+    "JobCancelled": CANCELLED,
+    "CancelledError": CANCELLED,
+}
+
+_category_by_type: Dict[type, str] = {}
+
+class OutputParseError(ValueError):
+    """
+    Sortie LLM invalide (JSON illisible, forme inattendue). Levée seulement là où la sortie
+    est décodée : une KeyError/AttributeError ailleurs est un bug (INTERNAL, pas de retry).
+    """
+
+def _classify_type(cls: type) -> str:
+    for base in cls.__mro__:
+        cat = _NAME_TO_CATEGORY.get(base.__name__)
+        if cat:
+            return cat
+    if issubclass(cls, (ValueError, TypeError)):
+        return VALIDATION
+    return INTERNAL
+
+def classify_error(exc: Optional[BaseException]) -> str:
+    """Catégorie d'une exception quelconque (mémoïsée par type, sans formatage)."""
+    if exc is None:
+        return INTERNAL
+    if isinstance(exc, CustomException):
+        return exc.category
+    cls = type(exc)
+    cat = _category_by_type.get(cls)
+    if cat is None:
+        cat = _category_by_type[cls] = _classify_type(cls)
+    return cat
+
+def is_retryable(exc: BaseException) -> bool:
+    """Prédicat pour tenacity.retry_if_exception."""
+    return classify_error(exc) in RETRYABLE_CATEGORIES
 
 class CustomException(Exception):
-    def __init__(self, message: str, error_detail: Exception = None):
-        self.error_message = self.get_detailed_error_message(message, error_detail)
-        super().__init__(self.error_message)
+    """
+    Exception applicative à coût de construction minimal : seule une référence au
+    traceback est gardée, le message détaillé (fichier/ligne) est formaté au premier str().
+    """
+
+    def __init__(self, message: str, error_detail: Exception = None,
+                 code: Optional[str] = None, category: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.error_detail = error_detail
+        self.category = category or classify_error(error_detail)
+        self._code = code
+        self._tb: Optional[TracebackType] = (
+            error_detail.__traceback__ if error_detail is not None else sys.exc_info()[2]
+        )
+        self._error_message: Optional[str] = None
+
+    @property
+    def code(self) -> str:
+        """Code stable pour métriques/logs, ex. "upstream.APIConnectionError"."""
+        if self._code is None:
+            self._code = f"{self.category}.{type(self.error_detail).__name__ if self.error_detail else 'error'}"
+        return self._code
+
+    @property
+    def retryable(self) -> bool:
+        return self.category in RETRYABLE_CATEGORIES
+
+    @property
+    def error_message(self) -> str:
+        if self._error_message is None:
+            self._error_message = self.format_message(self.message, self.error_detail, self._tb)
+        return self._error_message
 
     @staticmethod
-    def get_detailed_error_message(message, error_detail):
-        _, _, exc_tb = sys.exc_info()
+    def format_message(message, error_detail, exc_tb: Optional[TracebackType]) -> str:
         file_name = exc_tb.tb_frame.f_code.co_filename if exc_tb else "Unknown File"
         line_number = exc_tb.tb_lineno if exc_tb else "Unknown Line"
         return f"{message} | Error: {error_detail} | File: {file_name} | Line: {line_number}"
 
+    @staticmethod
+    def get_detailed_error_message(message, error_detail):
+        """Compat : formatage immédiat depuis sys.exc_info()."""
+        return CustomException.format_message(message, error_detail, sys.exc_info()[2])
+
     def __str__(self):
-        return self.error_message
\ No newline at end of file
+        return self.error_message
@@ -1,19 +1,108 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import sys
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Iterator
 
-LOGS_DIR = "logs"
-os.makedirs(LOGS_DIR,exist_ok=True)
+LOGS_DIR = os.getenv("LOGS_DIR", "logs")
+os.makedirs(LOGS_DIR, exist_ok=True)
 
-LOG_FILE = os.path.join(LOGS_DIR, f"log_{datetime.now().strftime('%Y-%m-%d')}.log")
+# Fichier courant ; TimedRotatingFileHandler le renomme en app.log.YYYY-MM-DD à minuit
+LOG_FILE = os.path.join(LOGS_DIR, "app.log")
+LOG_BACKUP_DAYS = int(os.getenv("LOG_BACKUP_DAYS", "14"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_TO_STDOUT = os.getenv("LOG_TO_STDOUT", "1") not in {"0", "false", "no"}
 
-logging.basicConfig(
-    filename=LOG_FILE,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+# Champs structurés passés via logger.info(..., extra={...}) ou request_context()
+STRUCTURED_FIELDS = ("request_id", "city", "days", "latency_s", "prompt_tokens",
+                     "completion_tokens", "error_code", "llm", "usage")
+
+# =================== Contexte de requête ===================
+_request_fields: ContextVar[Dict[str, Any]] = ContextVar("log_request_fields", default={})
+
+@contextmanager
+def request_context(request_id: Optional[str] = None, **fields: Any) -> Iterator[str]:
+    """Attache request_id (+ city, days...) à tous les logs émis dans le bloc (request_id hérité si imbriqué)."""
+    current = _request_fields.get()
+    rid = request_id or current.get("request_id") or uuid.uuid4().hex[:12]
+    token = _request_fields.set({**current, "request_id": rid, **fields})
+    try:
+        yield rid
+    finally:
+        _request_fields.reset(token)
+
+class ContextFilter(logging.Filter):
+    """Copie le contexte de requête sur le record (dans le thread appelant, avant la file)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for k, v in _request_fields.get().items():
+            if not hasattr(record, k):
+                setattr(record, k, v)
+        return True
+
+# =================== Formatage JSON ===================
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par record, lisible telle quelle par Filebeat/Logstash."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        doc: Dict[str, Any] = {
+            "@timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for k in STRUCTURED_FIELDS:
+            v = getattr(record, k, None)
+            if v is not None:
+                doc[k] = v
+        if record.exc_info:
+            doc["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+# =================== Mise en place (file + listener) ===================
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def _setup() -> None:
+    """
+    Les threads de requête ne font que queue.put() ; un QueueListener écrit sur disque/stdout.
+    Idempotent : le module peut être ré-importé par Streamlit.
+    """
+    global _listener
+    root = logging.getLogger()
+    if _listener is not None or any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers):
+        return
+
+    fmt = JsonFormatter()
+    file_handler = logging.handlers.TimedRotatingFileHandler(
+        LOG_FILE, when="midnight", backupCount=LOG_BACKUP_DAYS, encoding="utf-8", utc=True
+    )
+    file_handler.setFormatter(fmt)
+    sinks = [file_handler]
+    if LOG_TO_STDOUT:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(fmt)
+        sinks.append(stream_handler)
+
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(q)
+    queue_handler.addFilter(ContextFilter())
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(q, *sinks, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+_setup()
 
 def get_logger(name):
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    return logger
\ No newline at end of file
+    logger.setLevel(LOG_LEVEL)
+    return logger
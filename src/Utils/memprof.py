@@ -0,0 +1,198 @@
+# src/Utils/memprof.py
+"""
+Empreinte mémoire : taille profonde de ce qu'une session Streamlit garde (itinéraire,
+images, exports, DataFrames, état des widgets), caches en mémoire du process, et
+instantanés tracemalloc regroupés par zone du code.
+
+    MEMORY_PROFILE=on         affiche l'expander « 🧠 Memory » (app.py) et démarre tracemalloc
+    MEMORY_PROFILE_FRAMES=1   profondeur des tracebacks gardés par tracemalloc
+
+tracemalloc ralentit les allocations (~x1.5 à x2) : à activer pour un diagnostic, pas en
+continu. Benchmark reproductible (N sessions, plafond par session) :
+benchmarks/bench_memory.py.
+"""
+import gc
+import os
+import sys
+import tracemalloc
+import types
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+MEMORY_PROFILE = os.getenv("MEMORY_PROFILE", "off").lower() in ("1", "on", "true", "yes")
+MEMORY_PROFILE_FRAMES = int(os.getenv("MEMORY_PROFILE_FRAMES", "1"))
+
+# Objets partagés par tout le process (code, types) : jamais comptés dans une session
+_SKIP = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+         types.CodeType, types.FrameType)
+
+# =================== Taille profonde ===================
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    Octets retenus par `obj` et ce qu'il référence (conteneurs, __dict__/__slots__).
+    DataFrame / ndarray : taille des données (memory_usage(deep=True) / nbytes).
+    `seen` permet de ne pas compter deux fois un objet partagé entre plusieurs appels.
+    """
+    seen = seen if seen is not None else set()
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SKIP):
+            continue
+        seen.add(id(o))
+        usage = getattr(o, "memory_usage", None)
+        if callable(usage) and hasattr(o, "index"):          # pandas.DataFrame / Series
+            n = usage(index=True, deep=True)
+            total += int(n.sum() if hasattr(n, "sum") else n)
+            continue
+        if hasattr(o, "nbytes") and hasattr(o, "dtype"):     # numpy.ndarray (données comprises)
+            total += sys.getsizeof(o)
+            continue
+        total += sys.getsizeof(o)
+        if isinstance(o, (str, bytes, bytearray, int, float, bool)) or o is None:
+            continue
+        if isinstance(o, Mapping):
+            for k, v in list(o.items()):
+                stack.append(k)
+                stack.append(v)
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(list(o))
+        else:
+            d = getattr(o, "__dict__", None)
+            if d is not None:
+                stack.append(d)
+            for slot in getattr(type(o), "__slots__", ()):
+                if hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return total
+
+# =================== Par session ===================
+# Clés de l'itinéraire qui ne sont pas le contenu du voyage
+_EXPORT_KEYS = ("markdown",)
+
+def _category(key: str, value: Any) -> str:
+    name = type(value).__name__
+    if name == "TravelPlanner":
+        return "planner"
+    if name == "DataFrame":
+        return "dataframes"
+    if key.startswith("export") or isinstance(value, (bytes, bytearray)):
+        return "exports"
+    return "other"
+
+def session_footprint(values: Mapping[str, Any], whole: Any = None) -> Dict[str, int]:
+    """
+    Octets par catégorie pour l'état d'une session :
+      itinerary   voyage (jours, sections, POIs, usage), hors exports
+      exports     Markdown mémorisé, octets d'export gardés en session
+      planner     TravelPlanner (historique `messages` compris)
+      dataframes  DataFrames gardés en session
+      other       autres valeurs de st.session_state
+      widgets     reste de `whole` (SessionState complet : valeurs des widgets sans clé,
+                  lignes du data_editor...), si fourni
+    Un objet partagé n'est compté qu'une fois, dans la première catégorie qui le voit.
+    """
+    seen: Set[int] = set()
+    out = {"itinerary": 0, "exports": 0, "planner": 0, "dataframes": 0, "other": 0}
+    itin = values.get("itinerary")
+    if isinstance(itin, dict):
+        for k in _EXPORT_KEYS:
+            out["exports"] += deep_sizeof(itin.get(k), seen)
+        out["itinerary"] += deep_sizeof(itin, seen)
+    for k, v in values.items():
+        if k == "itinerary":
+            continue
+        out[_category(k, v)] += deep_sizeof(v, seen)
+    if whole is not None:
+        out["widgets"] = deep_sizeof(whole, seen)
+    out["total"] = sum(out.values())
+    return out
+
+# =================== Caches du process ===================
+MEMORY_REPORTERS: Dict[str, Callable[[], Any]] = {}
+
+def register_memory_reporter(name: str, fn: Callable[[], Any]) -> None:
+    """`fn()` renvoie l'objet (ou la liste d'objets) dont la taille profonde est rapportée sous `name`."""
+    MEMORY_REPORTERS[name] = fn
+
+def cache_footprint() -> Dict[str, int]:
+    """Octets par cache enregistré (trip store mémoire, store partagé mémoire, spéculations...)."""
+    out = {}
+    for name, fn in sorted(MEMORY_REPORTERS.items()):
+        try:
+            out[name] = deep_sizeof(fn())
+        except Exception:
+            out[name] = -1
+    return out
+
+# =================== tracemalloc ===================
+# Zones de code : préfixe de chemin (relatif au repo ou au paquet installé) -> zone
+_AREAS = (
+    ("src/Chains", "src/Chains"), ("src/Core", "src/Core"), ("src/Utils", "src/Utils"),
+    ("app.py", "app.py"), ("pandas", "pandas"), ("numpy", "numpy"), ("streamlit", "streamlit"),
+    ("pyarrow", "pyarrow"), ("langchain", "langchain"), ("pydantic", "pydantic"), ("httpx", "httpx"),
+    ("groq", "groq"),
+)
+
+def area_of(filename: str) -> str:
+    path = filename.replace(os.sep, "/")
+    for needle, area in _AREAS:
+        if f"/{needle}" in path or path.startswith(needle):
+            return area
+    return "other"
+
+def start_tracing(frames: int = MEMORY_PROFILE_FRAMES) -> bool:
+    """Démarre tracemalloc s'il ne tourne pas ; True s'il tourne."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, frames))
+    return True
+
+def take_snapshot() -> Optional[tracemalloc.Snapshot]:
+    if not tracemalloc.is_tracing():
+        return None
+    gc.collect()
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+
+_BASELINE: Optional[tracemalloc.Snapshot] = None
+
+def set_baseline() -> Optional[tracemalloc.Snapshot]:
+    """Instantané de référence du process, pour les différences by_area/top_lines suivantes."""
+    global _BASELINE
+    _BASELINE = take_snapshot()
+    return _BASELINE
+
+def baseline() -> Optional[tracemalloc.Snapshot]:
+    return _BASELINE
+
+def by_area(snapshot: tracemalloc.Snapshot, base: Optional[tracemalloc.Snapshot] = None) -> List[Tuple[str, int, int]]:
+    """[(zone, octets, nb de blocs)] triés par taille ; avec `base` : différence depuis `base`."""
+    agg: Dict[str, List[int]] = {}
+    if base is None:
+        stats = [(s.traceback[0].filename, s.size, s.count) for s in snapshot.statistics("filename")]
+    else:
+        stats = [(s.traceback[0].filename, s.size_diff, s.count_diff)
+                 for s in snapshot.compare_to(base, "filename")]
+    for filename, size, count in stats:
+        a = agg.setdefault(area_of(filename), [0, 0])
+        a[0] += size
+        a[1] += count
+    return sorted(((k, v[0], v[1]) for k, v in agg.items()), key=lambda x: -x[1])
+
+def top_lines(snapshot: tracemalloc.Snapshot, limit: int = 10,
+              base: Optional[tracemalloc.Snapshot] = None) -> List[Tuple[str, int]]:
+    """[("fichier:ligne", octets)] des plus gros sites d'allocation (ou de croissance depuis `base`)."""
+    if base is None:
+        stats = [(s.traceback[0], s.size) for s in snapshot.statistics("lineno")[:limit]]
+    else:
+        stats = [(s.traceback[0], s.size_diff) for s in snapshot.compare_to(base, "lineno")[:limit]]
+    return [(f"{fr.filename}:{fr.lineno}", size) for fr, size in stats]
+
+def fmt_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024.0
+    return f"{n:.1f} GB"
@@ -0,0 +1,243 @@
+# src/Utils/metrics.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, List, Iterator, Callable
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Prix USD par million de tokens (entrée, sortie) — surchargeables via LLM_PRICE_<MODEL>="in,out"
+MODEL_PRICES_USD_PER_M: Dict[str, tuple] = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+}
+
+def _price(model: str) -> tuple:
+    env = os.getenv("LLM_PRICE_" + (model or "").upper().replace("-", "_").replace(".", "_"))
+    if env:
+        try:
+            i, o = (float(x) for x in env.split(","))
+            return i, o
+        except ValueError:
+            pass
+    return MODEL_PRICES_USD_PER_M.get(model, (0.0, 0.0))
+
+def estimate_cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    p_in, p_out = _price(model)
+    return (prompt_tokens * p_in + completion_tokens * p_out) / 1_000_000
+
+# =================== Callback LangChain ===================
+class TokenUsageHandler(BaseCallbackHandler):
+    """Récupère modèle + tokens de chaque appel LLM (llm_output ou usage_metadata)."""
+
+    run_inline = True  # en async : exécuté dans la boucle, sans passer par un thread d'exécuteur
+
+    def __init__(self):
+        self.model: str = ""
+        self.prompt_tokens: int = 0
+        self.completion_tokens: int = 0
+
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        out = response.llm_output or {}
+        usage = out.get("token_usage") or {}
+        self.model = out.get("model_name") or self.model
+        if usage:
+            self.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+            self.completion_tokens += int(usage.get("completion_tokens") or 0)
+            return
+        for gens in response.generations or []:
+            for g in gens:
+                meta = getattr(getattr(g, "message", None), "usage_metadata", None) or {}
+                self.prompt_tokens += int(meta.get("input_tokens") or 0)
+                self.completion_tokens += int(meta.get("output_tokens") or 0)
+
+# =================== Agrégation par voyage ===================
+class TripUsage:
+    """Cumul des appels LLM d'un voyage (un create_itinerary)."""
+
+    def __init__(self, city: str = "", days: int = 0):
+        self.city = city
+        self.days = days
+        self.calls: List[Dict[str, Any]] = []
+        self.retries: int = 0
+        self.started = time.perf_counter()
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self.calls.append(record)
+
+    def summary(self) -> Dict[str, Any]:
+        prompt = sum(c["prompt_tokens"] for c in self.calls)
+        completion = sum(c["completion_tokens"] for c in self.calls)
+        return {
+            "city": self.city,
+            "days": self.days,
+            "llm_calls": len(self.calls),
+            "cache_hits": sum(1 for c in self.calls if c["cache"] == "hit"),
+            "retries": self.retries,
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "cost_usd": round(sum(c["cost_usd"] for c in self.calls), 6),
+            "llm_latency_s": round(sum(c["latency_s"] for c in self.calls), 3),
+            "wall_s": round(time.perf_counter() - self.started, 3),
+            "models": sorted({c["model"] for c in self.calls if c["model"]}),
+        }
+
+_current_trip: ContextVar[Optional[TripUsage]] = ContextVar("current_trip", default=None)
+
+@contextmanager
+def trip_scope(city: str = "", days: int = 0) -> Iterator[TripUsage]:
+    """Active un TripUsage pour tous les appels LLM faits dans le bloc."""
+    usage = TripUsage(city, days)
+    token = _current_trip.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_trip.reset(token)
+        REGISTRY.observe_trip(usage.summary())
+
+def current_trip() -> Optional[TripUsage]:
+    return _current_trip.get()
+
+# =================== Registre process ===================
+class MetricsRegistry:
+    """Compteurs cumulés et jauges du process, exposés au format texte Prometheus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[tuple, float] = {}
+        self._gauges: Dict[tuple, float] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def gauge_add(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    @contextmanager
+    def inflight(self, name: str = "inflight_requests", **labels: str) -> Iterator[None]:
+        """Jauge des traitements en cours (métrique d'autoscaling par pod)."""
+        self.gauge_add(name, 1, **labels)
+        try:
+            yield
+        finally:
+            self.gauge_add(name, -1, **labels)
+
+    def observe_call(self, record: Dict[str, Any]) -> None:
+        lbl = {"model": record["model"] or "unknown", "status": record["status"], "cache": record["cache"]}
+        self.inc("llm_calls_total", **lbl)
+        self.inc("llm_latency_seconds_sum", record["latency_s"], model=lbl["model"])
+        self.inc("llm_latency_seconds_count", model=lbl["model"])
+        self.inc("llm_prompt_tokens_total", record["prompt_tokens"], model=lbl["model"])
+        self.inc("llm_completion_tokens_total", record["completion_tokens"], model=lbl["model"])
+        self.inc("llm_cost_usd_total", record["cost_usd"], model=lbl["model"])
+
+    def observe_retry(self) -> None:
+        self.inc("llm_retries_total")
+
+    def observe_trip(self, summary: Dict[str, Any]) -> None:
+        self.inc("trips_total")
+        self.inc("trip_days_total", summary["days"])
+        self.inc("trip_cost_usd_total", summary["cost_usd"])
+        self.inc("trip_wall_seconds_sum", summary["wall_s"])
+        self.inc("trip_wall_seconds_count")
+
+    def snapshot(self) -> Dict[tuple, float]:
+        with self._lock:
+            return {**self._counters, **self._gauges}
+
+    def render_prometheus(self) -> str:
+        t = os.times()
+        lines = [f"process_cpu_seconds_total {t.user + t.system:g}"]
+        for (name, labels), value in sorted(self.snapshot().items()):
+            lbl = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{name}{{{lbl}}} {value:g}" if lbl else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+def record_llm_call(model: str, prompt_tokens: int, completion_tokens: int, latency_s: float,
+                    status: str = "ok", cache: str = "miss") -> Dict[str, Any]:
+    """Enregistre un appel LLM dans le registre et dans le voyage courant."""
+    record = {
+        "model": model,
+        "prompt_tokens": int(prompt_tokens),
+        "completion_tokens": int(completion_tokens),
+        "latency_s": round(latency_s, 4),
+        "cost_usd": estimate_cost_usd(model, prompt_tokens, completion_tokens),
+        "status": status,
+        "cache": cache,
+    }
+    REGISTRY.observe_call(record)
+    trip = current_trip()
+    if trip is not None:
+        trip.add(record)
+    return record
+
+def record_retry(retry_state=None) -> None:
+    """Hook tenacity before_sleep."""
+    REGISTRY.observe_retry()
+    trip = current_trip()
+    if trip is not None:
+        trip.retries += 1
+
+# =================== Santé ===================
+# Vérifications de /readyz (store partagé, stockage...) : nom -> callable renvoyant True si prêt
+READINESS_CHECKS: Dict[str, Callable[[], bool]] = {}
+
+def register_readiness_check(name: str, check: Callable[[], bool]) -> None:
+    READINESS_CHECKS[name] = check
+
+def readiness() -> Dict[str, bool]:
+    out = {}
+    for name, check in list(READINESS_CHECKS.items()):
+        try:
+            out[name] = bool(check())
+        except Exception:
+            out[name] = False
+    return out
+
+# =================== Endpoints /metrics, /healthz, /readyz ===================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def _send(self, code: int, body: str, ctype: str = "text/plain; charset=utf-8") -> None:
+        data = body.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            self._send(200, REGISTRY.render_prometheus(), "text/plain; version=0.0.4")
+        elif path == "/healthz":
+            # Liveness : le process répond
+            self._send(200, "ok\n")
+        elif path == "/readyz":
+            # Readiness : dépendances joignables, sinon le pod sort du Service
+            checks = readiness()
+            ok = all(checks.values())
+            lines = [f"{name} {'ok' if v else 'fail'}" for name, v in sorted(checks.items())]
+            self._send(200 if ok else 503, "\n".join(lines + ["ready" if ok else "not ready"]) + "\n")
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):  # pas de bruit sur stderr
+        pass
+
+def start_metrics_server(port: Optional[int] = None, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Démarre /metrics, /healthz et /readyz dans un thread démon (port: METRICS_PORT, défaut 9108)."""
+    port = int(port if port is not None else os.getenv("METRICS_PORT", "9108"))
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,141 @@
+# src/Utils/rate_limit.py
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Optional
+from src.Utils import shared_store
+
+class RateLimiter:
+    """
+    Seau à jetons thread-safe : `rate` jetons/s, capacité `burst`.
+    acquire() bloque jusqu'à disponibilité (ou timeout) et renvoie True/False.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        return self._take(tokens) == 0.0
+
+    def _take(self, tokens: float) -> float:
+        """Prend les jetons si possible (0.0), sinon renvoie l'attente nécessaire."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """acquire() pour la boucle asyncio : attend sans bloquer le thread."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            await asyncio.sleep(wait)
+
+    @classmethod
+    def per_minute(cls, rpm: float, burst: Optional[float] = None) -> "RateLimiter":
+        return cls(rpm / 60.0, burst if burst is not None else max(1.0, rpm / 60.0))
+
+class SharedRateLimiter:
+    """
+    Même interface, état dans le store partagé (tous les pods consomment le même quota).
+    Fenêtres fixes : `burst` jetons par fenêtre de burst/rate secondes (INCR + EXPIRE),
+    soit le même débit moyen que le seau à jetons.
+    """
+
+    def __init__(self, client: Any, name: str, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.client = client
+        self.name = name
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.window = self.burst / self.rate
+
+    def _slot(self, now: float) -> tuple:
+        idx = int(now // self.window)
+        return shared_store.key("ratelimit", self.name, str(idx)), (idx + 1) * self.window - now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        k, _ = self._slot(time.time())
+        used = self.client.incr(k, int(tokens))
+        if used == int(tokens):
+            self.client.expire(k, int(self.window) + 1)
+        return used <= self.burst
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.try_acquire(tokens):
+                return True
+            _, wait = self._slot(time.time())
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(max(wait, 0.01))
+
+    async def aacquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.try_acquire(tokens):
+                return True
+            _, wait = self._slot(time.time())
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            await asyncio.sleep(max(wait, 0.01))
+
+    @classmethod
+    def per_minute(cls, client: Any, name: str, rpm: float, burst: Optional[float] = None) -> "SharedRateLimiter":
+        return cls(client, name, rpm / 60.0, burst if burst is not None else max(1.0, rpm / 60.0))
+
+def _llm_limiter(rpm: float, burst: Optional[float] = None):
+    if shared_store.SHARED is not None:
+        return SharedRateLimiter.per_minute(shared_store.SHARED, "llm", rpm, burst)
+    return RateLimiter.per_minute(rpm, burst)
+
+# Limiteur des appels LLM (LLM_RPM requêtes/minute, défaut 30) : par process, ou commun
+# à tous les pods si SHARED_STORE_URL est défini
+LLM_RATE_LIMITER = _llm_limiter(float(os.getenv("LLM_RPM", "30")), burst=float(os.getenv("LLM_BURST", "5")))
+
+def set_llm_rate_limit(rpm: float, burst: Optional[float] = None):
+    """Remplace le limiteur LLM (batchs, tests)."""
+    global LLM_RATE_LIMITER
+    LLM_RATE_LIMITER = _llm_limiter(rpm, burst)
+    return LLM_RATE_LIMITER
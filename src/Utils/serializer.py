@@ -0,0 +1,136 @@
+# src/Utils/serializer.py
+"""
+Sérialisation des itinéraires : codec interchangeable + schéma versionné.
+
+    SERIALIZER=auto|orjson|msgpack|json   (auto : orjson s'il est installé, sinon json)
+
+pack()/unpack() encadrent le corps d'un en-tête de 3 octets (marqueur, codec, version
+du schéma) : un blob se relit quel que soit le codec courant, et les anciens blobs
+(texte JSON sans en-tête, version 0) passent par les migrations.
+orjson et ormsgpack/msgpack sont optionnels ; le module stdlib json reste le repli.
+"""
+import json
+import os
+from typing import Any, Callable, Dict, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ormsgpack as msgpack_impl
+except ImportError:
+    try:
+        import msgpack as msgpack_impl
+    except ImportError:
+        msgpack_impl = None
+
+SERIALIZER = os.getenv("SERIALIZER", "auto").lower()
+SCHEMA_VERSION = 1
+MAGIC = 0xA7  # ne peut pas commencer un texte JSON
+
+# =================== Codecs ===================
+class JsonCodec:
+    name, tag = "json", b"j"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+    def canonical(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=str).encode("utf-8")
+
+    def pretty(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=2, default=str).encode("utf-8")
+
+class OrjsonCodec(JsonCodec):
+    name, tag = "orjson", b"o"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+    def canonical(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS)
+
+    def pretty(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2)
+
+class MsgpackCodec(JsonCodec):
+    """Binaire compact pour les caches ; canonical/pretty restent du JSON (exports lisibles)."""
+    name, tag = "msgpack", b"m"
+
+    def dumps(self, obj: Any) -> bytes:
+        return msgpack_impl.packb(obj, default=str)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack_impl.unpackb(data)
+
+def available_codecs() -> Dict[str, JsonCodec]:
+    codecs = {"json": JsonCodec()}
+    if orjson is not None:
+        codecs["orjson"] = OrjsonCodec()
+    if msgpack_impl is not None:
+        codecs["msgpack"] = MsgpackCodec()
+    return codecs
+
+_CODECS = available_codecs()
+_BY_TAG = {c.tag: c for c in _CODECS.values()}
+
+def get_codec(name: Optional[str] = None) -> JsonCodec:
+    name = (name or SERIALIZER).lower()
+    if name == "auto":
+        return _CODECS.get("orjson") or _CODECS["json"]
+    return _CODECS.get(name) or _CODECS["json"]
+
+CODEC = get_codec()
+
+# =================== Schéma versionné ===================
+def _v0_to_v1(payload: Any) -> Any:
+    """v0 = texte JSON sans en-tête ; v1 garantit les clés de base d'un payload de jour."""
+    if isinstance(payload, dict) and ("sections" in payload or "pois" in payload):
+        payload.setdefault("language_code", "fr")
+        payload.setdefault("sections", {})
+        payload.setdefault("pois", [])
+        payload.setdefault("maps", {})
+    return payload
+
+MIGRATIONS: Dict[int, Callable[[Any], Any]] = {0: _v0_to_v1}
+
+def migrate(obj: Any, version: int) -> Any:
+    while version < SCHEMA_VERSION:
+        obj = MIGRATIONS[version](obj)
+        version += 1
+    return obj
+
+def pack(obj: Any, codec: Optional[JsonCodec] = None) -> bytes:
+    codec = codec or CODEC
+    return bytes((MAGIC,)) + codec.tag + bytes((SCHEMA_VERSION,)) + codec.dumps(obj)
+
+def unpack(blob: Union[bytes, str]) -> Any:
+    if isinstance(blob, str):
+        return migrate(json.loads(blob), 0)
+    if not blob or blob[0] != MAGIC:
+        return migrate(json.loads(blob), 0)
+    codec = _BY_TAG.get(blob[1:2])
+    if codec is None:
+        raise ValueError(f"Unknown serializer tag {blob[1:2]!r} (codec not installed?)")
+    return migrate(codec.loads(blob[3:]), blob[2])
+
+# =================== Exports / empreintes ===================
+def canonical(obj: Any) -> bytes:
+    """JSON compact à clés triées : base des empreintes (digests, versions)."""
+    return CODEC.canonical(obj)
+
+# Clés de rendu/session, pas du contenu du voyage
+_EXPORT_OMIT = {"markdown", "images"}
+
+def export_json(itin: Dict[str, Any]) -> bytes:
+    """Export JSON indenté, avec la version du schéma ; Markdown mémorisé et images résolues omis."""
+    doc = {"schema_version": SCHEMA_VERSION, **{k: v for k, v in itin.items() if k not in _EXPORT_OMIT}}
+    return CODEC.pretty(doc)
@@ -0,0 +1,226 @@
+# src/Utils/shared_store.py
+"""
+Store partagé entre pods (compatible Redis) pour le mode multi-réplicas.
+
+    SHARED_STORE_URL=redis://redis:6379/0   # Redis/Valkey/KeyDB... (paquet `redis` requis)
+    SHARED_STORE_URL=memory://              # remplaçant en mémoire (tests, un seul process)
+    SHARED_STORE_URL=                       # défaut : pas de store partagé, tout reste local au pod
+
+Seul un sous-ensemble de l'API redis-py est utilisé (get/set/delete/incr/expire/
+rpush/lrange/sadd/smembers/ping) ; MemoryRedis l'implémente pour les tests.
+"""
+import functools
+import hashlib
+import inspect
+import os
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from src.Utils.bounded_cache import cache_from_env
+from src.Utils.logger import get_logger
+from src.Utils.memprof import register_memory_reporter
+from src.Utils.metrics import register_readiness_check
+from src.Utils.serializer import pack, unpack
+
+logger = get_logger(__name__)
+
+SHARED_STORE_URL = os.getenv("SHARED_STORE_URL", "")
+SHARED_KEY_PREFIX = os.getenv("SHARED_KEY_PREFIX", "trip-planner:")
+
+# =================== Remplaçant en mémoire ===================
+class MemoryRedis:
+    """Sous-ensemble thread-safe de redis.Redis (valeurs bytes, expiration paresseuse)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = {}
+        self._expiry: Dict[str, float] = {}
+
+    def _alive(self, key: str) -> bool:
+        exp = self._expiry.get(key)
+        if exp is not None and exp <= time.time():
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+        return key in self._data
+
+    @staticmethod
+    def _b(value: Union[bytes, str, int, float]) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+    def ping(self) -> bool:
+        return True
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._data[key] if self._alive(key) else None
+
+    def set(self, key: str, value: Any, ex: Optional[float] = None, nx: bool = False) -> Optional[bool]:
+        with self._lock:
+            if nx and self._alive(key):
+                return None
+            self._data[key] = self._b(value)
+            self._expiry.pop(key, None)
+            if ex:
+                self._expiry[key] = time.time() + ex
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            n = sum(1 for k in keys if self._alive(k))
+            for k in keys:
+                self._data.pop(k, None)
+                self._expiry.pop(k, None)
+            return n
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            value = int(self._data[key]) + amount if self._alive(key) else amount
+            self._data[key] = self._b(value)
+            return value
+
+    def expire(self, key: str, seconds: float) -> bool:
+        with self._lock:
+            if not self._alive(key):
+                return False
+            self._expiry[key] = time.time() + seconds
+            return True
+
+    def rpush(self, key: str, *values: Any) -> int:
+        with self._lock:
+            lst = self._data[key] if self._alive(key) else []
+            lst.extend(self._b(v) for v in values)
+            self._data[key] = lst
+            return len(lst)
+
+    def lrange(self, key: str, start: int, end: int) -> List[bytes]:
+        with self._lock:
+            lst = self._data[key] if self._alive(key) else []
+            return list(lst[start:] if end == -1 else lst[start:end + 1])
+
+    def sadd(self, key: str, *members: Any) -> int:
+        with self._lock:
+            s = self._data[key] if self._alive(key) else set()
+            before = len(s)
+            s.update(self._b(m) for m in members)
+            self._data[key] = s
+            return len(s) - before
+
+    def smembers(self, key: str) -> set:
+        with self._lock:
+            return set(self._data[key]) if self._alive(key) else set()
+
+# =================== Connexion ===================
+def connect(url: str) -> Optional[Any]:
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return MemoryRedis()
+    try:
+        import redis
+    except ImportError:
+        logger.warning("SHARED_STORE_URL is set but the 'redis' package is not installed; using local state")
+        return None
+    return redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+
+SHARED = connect(SHARED_STORE_URL)
+
+def key(*parts: str) -> str:
+    return SHARED_KEY_PREFIX + ":".join(parts)
+
+def ping(client: Any = None) -> bool:
+    client = client if client is not None else SHARED
+    if client is None:
+        return True  # mode local : rien à vérifier
+    try:
+        return bool(client.ping())
+    except Exception:
+        return False
+
+# =================== KV avec horodatage (caches) ===================
+class SharedKVStore:
+    """Même interface que itinerary_cache.SQLiteStore : get -> (valeur, ts), set, delete."""
+
+    def __init__(self, client: Any, namespace: str, ttl_s: Optional[int] = None):
+        self.client = client
+        self.namespace = namespace
+        self.ttl_s = ttl_s
+
+    def get(self, k: str) -> Optional[Tuple[bytes, float]]:
+        raw = self.client.get(key(self.namespace, k))
+        if raw is None:
+            return None
+        return raw[8:], struct.unpack("<d", raw[:8])[0]
+
+    def set(self, k: str, value: Union[bytes, str]) -> None:
+        value = value.encode("utf-8") if isinstance(value, str) else value
+        self.client.set(key(self.namespace, k), struct.pack("<d", time.time()) + value, ex=self.ttl_s or None)
+
+    def delete(self, k: str) -> None:
+        self.client.delete(key(self.namespace, k))
+
+# =================== Mémoïsation partagée ===================
+_MISSING = b"\x00none"
+
+def shared_memoize(namespace: str, ttl_s: int = 3600, client: Any = None) -> Callable:
+    """
+    Mémoïse une fonction pure (arguments sérialisables) sur deux niveaux : un cache local
+    borné (CACHE_MEMO_<NAMESPACE>_MAX_ENTRIES, défaut 2048 ; _MAX_BYTES, défaut 4 Mo),
+    puis le store partagé s'il est configuré, pour que tous les pods profitent du même cache.
+    Les résultats None sont mémorisés aussi (pas de nouvelle requête réseau).
+    Fonctionne aussi sur les fonctions `async def`.
+    """
+    local = cache_from_env(f"memo_{namespace}", max_entries=2048, max_bytes=4 * 1024 * 1024, ttl_s=ttl_s)
+
+    def lookup(args, kwargs) -> Tuple[Any, str, Any]:
+        digest = hashlib.sha1(repr((args, sorted(kwargs.items()))).encode("utf-8")).hexdigest()
+        k = key("memo", namespace, digest)
+        raw = local.get(k)
+        c = client if client is not None else SHARED
+        if raw is None and c is not None:
+            try:
+                raw = c.get(k)
+            except Exception:
+                raw = None
+            if raw is not None:
+                local.set(k, raw)
+        return c, k, raw
+
+    def store(c: Any, k: str, result: Any) -> None:
+        raw = _MISSING if result is None else pack(result)
+        local.set(k, raw)
+        if c is None:
+            return
+        try:
+            c.set(k, raw, ex=ttl_s)
+        except Exception as e:
+            logger.warning("Shared memo write failed (%s): %s", namespace, e)
+
+    def deco(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                c, k, raw = lookup(args, kwargs)
+                if raw is not None:
+                    return None if raw == _MISSING else unpack(raw)
+                result = await fn(*args, **kwargs)
+                store(c, k, result)
+                return result
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            c, k, raw = lookup(args, kwargs)
+            if raw is not None:
+                return None if raw == _MISSING else unpack(raw)
+            result = fn(*args, **kwargs)
+            store(c, k, result)
+            return result
+        return wrapper
+    return deco
+
+if SHARED is not None:
+    register_readiness_check("shared_store", ping)
+if isinstance(SHARED, MemoryRedis):
+    register_memory_reporter("shared_store", lambda: SHARED._data)
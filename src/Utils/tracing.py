@@ -0,0 +1,214 @@
+# src/Utils/tracing.py
+"""
+Traces légères façon OpenTelemetry (sans dépendance) :
+
+    with span("planner.create_itinerary", city=city) as sp:
+        sp.set_attribute("days", 3)
+
+La décision d'échantillonnage est prise sur le span racine (TRACE_SAMPLE_RATE, 0..1)
+et héritée par les enfants ; un span non échantillonné ne coûte qu'un test.
+Export : TRACE_EXPORTER=file (JSON lines, TRACE_FILE) | otlp (OTLP/HTTP JSON vers
+TRACE_OTLP_ENDPOINT) | none.
+"""
+import atexit
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List, Iterator, Callable
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "file").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(os.getenv("LOGS_DIR", "logs"), "traces.jsonl"))
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "ai-trip-planner")
+
+# =================== Spans ===================
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_unix_nano": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+class _NoopSpan:
+    __slots__ = ()
+    trace_id = span_id = parent_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+# None = pas de trace en cours ; NOOP_SPAN = trace en cours mais non échantillonnée
+_current: ContextVar[Any] = ContextVar("current_span", default=None)
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    parent = _current.get()
+    if parent is None:
+        sampled = TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE
+        if not sampled:
+            token = _current.set(NOOP_SPAN)
+            try:
+                yield NOOP_SPAN
+            finally:
+                _current.reset(token)
+            return
+        sp = Span(name, f"{random.getrandbits(128):032x}", None, attributes)
+    elif parent is NOOP_SPAN:
+        yield NOOP_SPAN
+        return
+    else:
+        sp = Span(name, parent.trace_id, parent.span_id, attributes)
+
+    token = _current.set(sp)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.status = "error"
+        sp.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        sp.end_ns = time.time_ns()
+        _exporter.submit(sp)
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Décorateur : un span par appel (nom par défaut = module.fonction)."""
+    def deco(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+def current_span() -> Any:
+    return _current.get() or NOOP_SPAN
+
+# =================== Export (thread de fond, par lots) ===================
+class BatchExporter:
+    def __init__(self, kind: str, max_batch: int = 256, interval_s: float = 2.0):
+        self.kind = kind
+        self.max_batch = max_batch
+        self.interval_s = interval_s
+        self._q: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, sp: Span) -> None:
+        if self.kind == "none":
+            return
+        if self._thread is None:
+            self._start()
+        self._q.put(sp)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.interval_s
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self.export(batch)
+                except Exception:
+                    pass  # l'export ne doit jamais casser l'app
+
+    def export(self, batch: List[Span]) -> None:
+        if self.kind == "otlp":
+            body = json.dumps(_to_otlp(batch), default=str).encode("utf-8")
+            req = urllib.request.Request(TRACE_OTLP_ENDPOINT, data=body,
+                                         headers={"Content-Type": "application/json"})
+            urllib.request.urlopen(req, timeout=3).close()
+            return
+        os.makedirs(os.path.dirname(TRACE_FILE) or ".", exist_ok=True)
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            for sp in batch:
+                f.write(json.dumps(sp.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+    def shutdown(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._q.put(None)
+            self._thread.join(timeout=5)
+
+def _otlp_value(v: Any) -> Dict[str, Any]:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+def _to_otlp(batch: List[Span]) -> Dict[str, Any]:
+    spans = [{
+        "traceId": sp.trace_id,
+        "spanId": sp.span_id,
+        **({"parentSpanId": sp.parent_id} if sp.parent_id else {}),
+        "name": sp.name,
+        "kind": 1,
+        "startTimeUnixNano": str(sp.start_ns),
+        "endTimeUnixNano": str(sp.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in sp.attributes.items()],
+        "status": {"code": 2 if sp.status == "error" else 1},
+    } for sp in batch]
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "src.Utils.tracing"}, "spans": spans}],
+    }]}
+
+_exporter = BatchExporter(TRACE_EXPORTER)